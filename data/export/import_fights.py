@@ -4,8 +4,12 @@ Import fight data from JSON to database
 """
 
 import json
+import sys
 from pathlib import Path
-from tinydb import TinyDB
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from services.fight_store import open_fight_store
 
 def import_fights_from_json():
     """Import fights from JSON to database"""
@@ -20,12 +24,13 @@ def import_fights_from_json():
         fights = json.load(f)
     
     # Import to database
-    db = TinyDB('data/fights.db')
+    db = open_fight_store(Path('data/fights.db'))
     fights_table = db.table('fights')
     
     # Clear existing data and import
     fights_table.truncate()
     fights_table.insert_multiple(fights)
+    db.close()
     
     print(f"Imported {len(fights)} fights to database")
 
@@ -28,7 +28,7 @@ from models import (
     AnalysisResult, PlayerBuild, CompositionAnalysis, 
     CounterRecommendation
 )
-from parser import RealEVTCParser
+from parser import RealEVTCParser, named_boon_stats
 from role_detector import (
     estimate_role_from_profession, 
     detect_role_advanced, 
@@ -314,9 +314,7 @@ async def recalculate_counter(
     
     # Update fight record with confirmed context if fight_id provided
     if fight_id:
-        counter_service = get_counter_service()
-        Fight = Query()
-        counter_service.fights_table.update({'context_confirmed': new_context}, Fight.fight_id == fight_id)
+        get_counter_service().confirm_fight_context(fight_id, new_context)
         logger.info(f"Updated fight {fight_id} with confirmed context: {new_context}")
     
     # Recalculate counter with new context
@@ -893,11 +891,12 @@ def convert_parsed_log_to_players_data(parsed_log) -> dict:
             'damage_out': damage,
             'damage_in': getattr(player, 'damage_taken', 0) or 0,
             'dps': damage // duration_sec,
-            'down_contrib': downs,
-            'down_contrib_per_sec': round(downs / duration_sec, 2) if downs else 0,
+            'down_contrib': player.down_contrib,
+            'down_contrib_per_sec': round(player.down_contrib / duration_sec, 2) if player.down_contrib else 0,
             'damage_ratio': round(damage / max(getattr(player, 'damage_taken', 1) or 1, 1), 2),
             # Combat stats
             'kills': player.kills or 0,
+            'kill_participation': player.kill_participation,
             'deaths': player.deaths or 0,
             'downs': downs,
             'cc_out': getattr(player, 'cc_out', 0) or 0,
@@ -913,9 +912,9 @@ def convert_parsed_log_to_players_data(parsed_log) -> dict:
             'cleanses_per_sec': round((getattr(player, 'cleanses', 0) or 0) / duration_sec, 2),
             'resurrects': getattr(player, 'resurrects', 0) or 0,
             'barrier': getattr(player, 'barrier_out', 0) or 0,
-            # Boon generation
-            'boon_gen': {},
-            'boon_uptime': {},
+            # Boon generation (interval engine in the parser)
+            'boon_gen': named_boon_stats(player.boon_generation),
+            'boon_uptime': named_boon_stats(player.boon_uptime),
             # Meta
             'is_commander': False,
             'role': estimate_role_from_profession(player.elite_spec or player.profession),
@@ -1052,6 +1051,19 @@ def convert_parsed_log_to_players_data(parsed_log) -> dict:
         },
         # Auto-detect fight context based on squad size
         'context_detected': 'zerg' if len(allies) >= 25 else ('guild_raid' if len(allies) >= 10 else 'roam'),
+        # Separate fights inside the log, split at combat lulls
+        'engagements': [
+            {
+                'start_sec': engagement.start_second,
+                'duration_sec': engagement.duration_ms // 1000,
+                'ally_count': int((~engagement.is_enemy).sum()),
+                'enemy_count': int(engagement.is_enemy.sum()),
+                'composition': engagement.composition(enemies=False),
+                'enemy_composition': engagement.composition(enemies=True),
+                'stats': engagement.squad(),
+            }
+            for engagement in parsed_log.engagements
+        ],
     }
 
 
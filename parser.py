@@ -5,15 +5,25 @@ Parses arcdps .evtc/.zevtc/.zip files to extract exact player builds
 Binary format based on: https://www.deltaconnected.com/arcdps/evtc/README.txt
 """
 
+import copy
+import hashlib
+import json
 import struct
 import zipfile
 import io
+import mmap
 import os
-from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Optional, Tuple, BinaryIO
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from dataclasses import dataclass, field, asdict, replace
+from typing import Any, List, Dict, Optional, Set, Tuple, BinaryIO, Iterable, Union
 from datetime import datetime
 from enum import IntEnum
 from pathlib import Path
+
+import numpy as np
+
 from logger import get_logger
 
 # Setup logger
@@ -23,6 +33,10 @@ from models import (
     AnalysisResult, PlayerBuild, CompositionAnalysis
 )
 
+# Bump whenever parsing changes what a ParsedLog contains: cached parse
+# results (services/parse_cache.py) are keyed by this version
+PARSER_VERSION = "10"
+
 
 # =============================================================================
 # GW2 GAME DATA - Profession & Elite Spec IDs
@@ -225,9 +239,13 @@ BOON_IDS = {
     1187: "Quickness",
     26980: "Resistance",
     30328: "Alacrity",
-    33330: "Stability",
+    1122: "Stability",
+    5974: "Superspeed",
 }
 
+# Boons that stack in intensity (uptime/generation are average stacks, not %)
+INTENSITY_BOON_IDS = {740, 1122}
+
 # Condition skill IDs
 CONDITION_IDS = {
     720: "Blind",
@@ -285,11 +303,108 @@ class IFF(IntEnum):
     UNKNOWN = 2
 
 
+# =============================================================================
+# EVENT RECORD LAYOUTS (NumPy structured dtypes)
+# =============================================================================
+
+# Revision 1 cbtevent - 64 bytes, same layout as '<QQQiiIIHHHHBBBBBBBBBBBBBBBB'
+EVENT_DTYPE_REV1 = np.dtype([
+    ('time', '<u8'),
+    ('src_agent', '<u8'),
+    ('dst_agent', '<u8'),
+    ('value', '<i4'),
+    ('buff_dmg', '<i4'),
+    ('overstack_value', '<u4'),
+    ('skill_id', '<u4'),
+    ('src_instid', '<u2'),
+    ('dst_instid', '<u2'),
+    ('src_master_instid', '<u2'),
+    ('dst_master_instid', '<u2'),
+    ('iff', 'u1'),
+    ('buff', 'u1'),
+    ('result', 'u1'),
+    ('is_activation', 'u1'),
+    ('is_buffremove', 'u1'),
+    ('is_ninety', 'u1'),
+    ('is_fifty', 'u1'),
+    ('is_moving', 'u1'),
+    ('is_statechange', 'u1'),
+    ('is_flanking', 'u1'),
+    ('is_shields', 'u1'),
+    ('is_offcycle', 'u1'),
+    ('pad61', 'u1'),
+    ('pad62', 'u1'),
+    ('pad63', 'u1'),
+    ('pad64', 'u1'),
+])
+
+# Revision 0 cbtevent - 64 bytes, 16-bit skill ids and iss/skar offsets
+EVENT_DTYPE_REV0 = np.dtype([
+    ('time', '<u8'),
+    ('src_agent', '<u8'),
+    ('dst_agent', '<u8'),
+    ('value', '<i4'),
+    ('buff_dmg', '<i4'),
+    ('overstack_value', '<u2'),
+    ('skill_id', '<u2'),
+    ('src_instid', '<u2'),
+    ('dst_instid', '<u2'),
+    ('src_master_instid', '<u2'),
+    ('iss_skar', 'V9'),
+    ('iff', 'u1'),
+    ('buff', 'u1'),
+    ('result', 'u1'),
+    ('is_activation', 'u1'),
+    ('is_buffremove', 'u1'),
+    ('is_ninety', 'u1'),
+    ('is_fifty', 'u1'),
+    ('is_moving', 'u1'),
+    ('is_statechange', 'u1'),
+    ('is_flanking', 'u1'),
+    ('is_shields', 'u1'),
+    ('is_offcycle', 'u1'),
+    ('pad64', 'u1'),
+])
+
+EVENT_SIZE = EVENT_DTYPE_REV1.itemsize  # 64 bytes for both revisions
+EVENT_STRUCT_REV1 = struct.Struct('<QQQiiIIHHHHBBBBBBBBBBBBBBBB')  # struct decoder, same layout
+AGENT_SIZE = 96
+SKILL_SIZE = 68
+ARCHIVE_READ_SIZE = 1 << 20  # Decompression step when filling the reusable buffer
+
+# Sorted lookup tables for vectorized membership tests
+BOON_ID_ARRAY = np.array(sorted(BOON_IDS), dtype=np.uint32)
+CONDITION_ID_ARRAY = np.array(sorted(CONDITION_IDS), dtype=np.uint32)
+ROLE_BUFF_IDS = np.union1d(BOON_ID_ARRAY, CONDITION_ID_ARRAY)  # applications counted for role detection
+
+
+def decode_event_block(buffer, revision: int) -> np.ndarray:
+    """
+    Decode a raw cbtevent block into a structured array in one call.
+    
+    Revision 1 data is viewed in place (zero-copy). Revision 0 records are
+    widened into the revision 1 layout so downstream code sees one dtype.
+    A trailing partial record is ignored, like the struct decoder does.
+    """
+    dtype = EVENT_DTYPE_REV1 if revision >= 1 else EVENT_DTYPE_REV0
+    count = len(buffer) // dtype.itemsize
+    events = np.frombuffer(buffer, dtype=dtype, count=count)
+    
+    if revision >= 1:
+        return events
+    
+    widened = np.zeros(count, dtype=EVENT_DTYPE_REV1)
+    for name in EVENT_DTYPE_REV1.names:
+        if name in EVENT_DTYPE_REV0.names:
+            widened[name] = events[name]
+    return widened
+
+
 # =============================================================================
 # DATA CLASSES
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class EVTCHeader:
     """EVTC file header"""
     magic: str
@@ -303,7 +418,7 @@ class EVTCHeader:
         return self.arcdps_build
 
 
-@dataclass
+@dataclass(slots=True)
 class EVTCAgent:
     """Agent (player, NPC, or gadget) from EVTC"""
     address: int
@@ -363,14 +478,14 @@ class EVTCAgent:
         return "N/A"
 
 
-@dataclass
+@dataclass(slots=True)
 class EVTCSkill:
     """Skill definition from EVTC"""
     id: int
     name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class CombatEvent:
     """Combat event from EVTC"""
     time: int
@@ -402,7 +517,7 @@ class CombatEvent:
     pad64: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class ParsedPlayer:
     """Fully parsed player data"""
     character_name: str
@@ -412,6 +527,7 @@ class ParsedPlayer:
     subgroup: int
     team_id: int
     is_enemy: bool
+    side_confidence: float = 0.0  # 0-1, how well team/squad data and damage links support is_enemy
     
     # Stats
     toughness: int = 0
@@ -433,13 +549,19 @@ class ParsedPlayer:
     cc_out: int = 0  # Crowd control dealt
     barrier_out: int = 0  # Barrier applied
     resurrects: int = 0  # Allies resurrected
+    down_contrib: int = 0  # Damage to opponents in the attribution window before they went down
+    kill_participation: int = 0  # Opponent deaths with a hit from this player in the window before
     
     # Build detection
     weapons_used: List[str] = field(default_factory=list)
-    skills_used: List[int] = field(default_factory=list)
+    skills_used: Set[int] = field(default_factory=set)
     boons_applied: Dict[int, int] = field(default_factory=dict)
     conditions_applied: Dict[int, int] = field(default_factory=dict)
     
+    # Boon state (interval engine): % for duration boons, stacks for intensity boons
+    boon_uptime: Dict[int, float] = field(default_factory=dict)
+    boon_generation: Dict[int, float] = field(default_factory=dict)
+    
     # Derived
     estimated_role: str = "Unknown"
     estimated_build: str = ""
@@ -450,6 +572,175 @@ class ParsedPlayer:
         return f"{self.character_name} ({self.account_name})"
 
 
+@dataclass
+class CombatTimeline:
+    """
+    Per-second combat series for every player of a log.
+    values[series, row, second] follows TIMELINE_SERIES for the first axis and
+    `players` (agent table order, allies and enemies) for the second; bucket i
+    covers [start_time + i * 1000, start_time + (i + 1) * 1000) in log time.
+    """
+    start_time: int
+    players: List[str]
+    is_enemy: np.ndarray
+    values: np.ndarray
+    
+    @property
+    def seconds(self) -> int:
+        return self.values.shape[2]
+    
+    def series(self, name: str) -> np.ndarray:
+        """(player, second) array of one series"""
+        return self.values[TIMELINE_SERIES.index(name)]
+    
+    def player(self, name: str) -> Dict[str, np.ndarray]:
+        """Every series of one player, by character name"""
+        row = self.players.index(name)
+        return {series: self.values[i, row] for i, series in enumerate(TIMELINE_SERIES)}
+    
+    def squad(self, enemies: bool = False) -> Dict[str, np.ndarray]:
+        """Every series summed over allies (or enemies)"""
+        rows = self.is_enemy if enemies else ~self.is_enemy
+        totals = self.values[:, rows].sum(axis=1, dtype=np.int64)
+        return {series: totals[i] for i, series in enumerate(TIMELINE_SERIES)}
+
+
+@dataclass
+class SkillBreakdown:
+    """
+    Per-player, per-skill combat stats of a log, one row per (player, skill) pair.
+    values[row] follows SKILL_STAT_FIELDS; `slots` index `players` (agent table
+    order, allies and enemies) and names come from the log's skill table.
+    Strips aren't broken down: a remove event carries the removed boon, not the
+    skill that removed it.
+    """
+    players: List[str]
+    is_enemy: np.ndarray
+    slots: np.ndarray
+    skill_ids: np.ndarray
+    values: np.ndarray
+    skill_names: Dict[int, str]
+    
+    def skill_name(self, skill_id: int) -> str:
+        """Name from the skill table, then the boon/condition tables"""
+        return (self.skill_names.get(skill_id) or BOON_IDS.get(skill_id) or CONDITION_IDS.get(skill_id)
+                or f"Skill {skill_id}")
+    
+    def _table(self, skill_ids: np.ndarray, values: np.ndarray) -> List[Dict[str, Any]]:
+        """Rows as dicts, most damage first"""
+        order = np.argsort(-values[:, SKILL_STAT_FIELDS.index('damage')], kind='stable')
+        return [
+            {'skill_id': skill_id, 'name': self.skill_name(skill_id),
+             **dict(zip(SKILL_STAT_FIELDS, row))}
+            for skill_id, row in zip(skill_ids[order].tolist(), values[order].tolist())
+        ]
+    
+    def player(self, name: str) -> List[Dict[str, Any]]:
+        """Skills of one player, by character name"""
+        rows = np.flatnonzero(self.slots == self.players.index(name))
+        return self._table(self.skill_ids[rows], self.values[rows])
+    
+    def squad(self, enemies: bool = False) -> List[Dict[str, Any]]:
+        """Skills summed over allies (or enemies)"""
+        rows = np.flatnonzero(self.is_enemy[self.slots] == enemies)
+        skill_ids, group = np.unique(self.skill_ids[rows], return_inverse=True)
+        totals = np.zeros((skill_ids.size, len(SKILL_STAT_FIELDS)), dtype=np.int64)
+        np.add.at(totals, group, self.values[rows])
+        return self._table(skill_ids, totals)
+
+
+@dataclass
+class Engagement:
+    """
+    One fight inside a log: a stretch of activity between combat lulls.
+    Covers timeline buckets [start_second, end_second); `slots` are the timeline
+    rows of the players active in it and totals[series, i] their summed series.
+    """
+    start_second: int
+    end_second: int
+    start_time: int
+    slots: np.ndarray
+    players: List[str]
+    specs: List[str]
+    is_enemy: np.ndarray
+    totals: np.ndarray
+    
+    @property
+    def duration_ms(self) -> int:
+        return (self.end_second - self.start_second) * TIMELINE_BUCKET_MS
+    
+    @property
+    def end_time(self) -> int:
+        return self.start_time + self.duration_ms
+    
+    def composition(self, enemies: bool = True) -> Dict[str, int]:
+        """Spec counts of the active enemies (or allies)"""
+        counts: Dict[str, int] = {}
+        for spec, enemy in zip(self.specs, self.is_enemy.tolist()):
+            if enemy == enemies:
+                counts[spec] = counts.get(spec, 0) + 1
+        return counts
+    
+    def squad(self, enemies: bool = False) -> Dict[str, int]:
+        """Every series summed over the active allies (or enemies)"""
+        rows = self.is_enemy if enemies else ~self.is_enemy
+        totals = self.totals[:, rows].sum(axis=1)
+        return {series: int(totals[i]) for i, series in enumerate(TIMELINE_SERIES)}
+    
+    def player(self, name: str) -> Dict[str, int]:
+        """Every series of one active player, by character name"""
+        i = self.players.index(name)
+        return {series: int(self.totals[s, i]) for s, series in enumerate(TIMELINE_SERIES)}
+
+
+@dataclass
+class MovementTracks:
+    """
+    Downsampled player positions of a log, for stacking and spread analysis.
+    positions[row, bucket] is the (x, y, z) of `players[row]` (agent table order,
+    allies and enemies) at the end of bucket i, which covers
+    [start_time + i * resolution_ms, start_time + (i + 1) * resolution_ms);
+    NaN before a player's first sample. speeds[row, bucket] is the velocity magnitude.
+    """
+    start_time: int
+    resolution_ms: int
+    players: List[str]
+    is_enemy: np.ndarray
+    positions: np.ndarray
+    speeds: np.ndarray
+    
+    @property
+    def buckets(self) -> int:
+        return self.positions.shape[1]
+    
+    @property
+    def nbytes(self) -> int:
+        return self.positions.nbytes + self.speeds.nbytes
+    
+    def player(self, name: str) -> np.ndarray:
+        """(bucket, 3) positions of one player, by character name"""
+        return self.positions[self.players.index(name)]
+    
+    def centroid(self, enemies: bool = False) -> np.ndarray:
+        """(bucket, 3) mean position of the allies (or enemies) with a sample, NaN when none has"""
+        positions = self.positions[self.is_enemy if enemies else ~self.is_enemy]
+        sampled = ~np.isnan(positions[..., 0])
+        count = sampled.sum(axis=0)[:, None]
+        total = np.where(sampled[..., None], positions, 0).sum(axis=0, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (total / count).astype(np.float32)
+    
+    def spread(self, enemies: bool = False) -> np.ndarray:
+        """(bucket,) root mean square horizontal distance to the centroid"""
+        positions = self.positions[self.is_enemy if enemies else ~self.is_enemy, :, :2]
+        offsets = positions - self.centroid(enemies)[None, :, :2]
+        squared = (offsets * offsets).sum(axis=2)
+        sampled = ~np.isnan(squared)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(sampled, squared, 0).sum(axis=0, dtype=np.float64) / sampled.sum(axis=0)
+        return np.sqrt(mean).astype(np.float32)
+
+
 @dataclass 
 class ParsedLog:
     """Fully parsed EVTC log"""
@@ -467,6 +758,12 @@ class ParsedLog:
     # POV
     pov_player: Optional[str] = None
     
+    # Per-second series and per-skill stats (numpy/stream decode modes)
+    timeline: Optional[CombatTimeline] = None
+    skill_breakdown: Optional[SkillBreakdown] = None
+    engagements: List[Engagement] = field(default_factory=list)
+    movement: Optional[MovementTracks] = None
+    
     @property
     def duration_seconds(self) -> int:
         return self.duration_ms // 1000
@@ -476,156 +773,1721 @@ class ParsedLog:
         return self.header.is_wvw
 
 
+@dataclass(slots=True)
+class RosterEntry:
+    """A player from the agent table, as seen by a peek (no combat stats)"""
+    character_name: str
+    account_name: str
+    profession: str
+    elite_spec: str
+    subgroup: int = 0
+    team_id: int = 0
+    is_ally: bool = False
+    is_pov: bool = False
+
+
+@dataclass
+class LogRoster:
+    """Header and player roster of a log, read without the combat event pass"""
+    header: EVTCHeader
+    players: List[RosterEntry]
+    skill_count: int = 0
+    map_id: int = 0
+    pov_player: Optional[str] = None
+    statechanges_read: int = 0
+    
+    @property
+    def is_wvw(self) -> bool:
+        return self.header.is_wvw
+    
+    @property
+    def allies(self) -> List[RosterEntry]:
+        return [p for p in self.players if p.is_ally]
+    
+    @property
+    def enemies(self) -> List[RosterEntry]:
+        return [p for p in self.players if not p.is_ally]
+    
+    def spec_counts(self, enemies: bool = True) -> Dict[str, int]:
+        """Composition preview: elite spec (or core profession) -> player count"""
+        counts: Dict[str, int] = {}
+        for player in (self.enemies if enemies else self.allies):
+            spec = player.elite_spec or player.profession
+            counts[spec] = counts.get(spec, 0) + 1
+        return counts
+    
+    @property
+    def fingerprint(self) -> str:
+        """
+        Roster-based dedup key: same arcdps build, map, POV and player table.
+        Like CounterService fingerprints it includes the perspective, so the
+        same fight recorded by two squad members gives two different keys.
+        """
+        rows = sorted(
+            f"{p.account_name}|{p.character_name}|{p.elite_spec or p.profession}|{p.subgroup}"
+            for p in self.players
+        )
+        key = f"{self.header.arcdps_build}|{self.map_id}|{self.pov_player}|" + ";".join(rows)
+        return hashlib.md5(key.encode()).hexdigest()[:16]
+
+
 # =============================================================================
-# EVTC PARSER
+# AGENT INDEX (sorted-array joins)
 # =============================================================================
 
-class EVTCParser:
+# Instance-id keys pack (instid, time); arcdps times are ms since boot, far below 2**48
+INSTID_TIME_BITS = 48
+INSTID_TIME_MASK = np.uint64((1 << INSTID_TIME_BITS) - 1)
+
+
+class AgentIndex:
     """
-    Real EVTC binary parser
-    Extracts exact player builds from arcdps logs
+    Sorted-array index over the agent table, joining whole event columns to agent rows.
+    
+    Addresses are unique for the whole log: one searchsorted over the sorted
+    addresses maps a column to rows. Instance ids are only unique while an
+    agent is aware (arcdps hands a freed id to the next agent), so they resolve
+    through (instid, first_aware) range starts and only match an agent whose
+    awareness window contains the event time.
     """
     
-    def __init__(self):
-        self.agents: Dict[int, EVTCAgent] = {}
-        self.agents_by_instid: Dict[int, EVTCAgent] = {}
-        self.skills: Dict[int, EVTCSkill] = {}
-        self.events: List[CombatEvent] = []
-        self.header: Optional[EVTCHeader] = None
-        
-    def parse_file(self, filepath: str) -> ParsedLog:
-        """Parse an EVTC file (supports .evtc, .zevtc, .zip)"""
-        path = Path(filepath)
-        
-        if path.suffix.lower() in ['.zip', '.zevtc']:
-            return self._parse_zip(filepath)
-        else:
-            with open(filepath, 'rb') as f:
-                return self._parse_stream(f)
+    def __init__(self, agents: List[EVTCAgent]):
+        self.agents = agents
+        n_agents = len(agents)
+        
+        addresses = np.fromiter((a.address for a in agents), dtype=np.uint64, count=n_agents)
+        self._order = np.argsort(addresses, kind='stable')
+        self._sorted_addresses = addresses[self._order]
+        
+        # Awareness ranges sorted by (instid, first_aware), filled by set_awareness()
+        self._range_starts = np.empty(0, dtype=np.uint64)
+        self._range_ends = np.empty(0, dtype=np.uint64)
+        self._range_rows = np.empty(0, dtype=np.int64)
     
-    def parse_bytes(self, data: bytes, filename: str = "") -> ParsedLog:
-        """Parse EVTC from bytes"""
-        if filename.lower().endswith('.zip'):
-            return self._parse_zip_bytes(data)
-        elif filename.lower().endswith('.zevtc'):
-            # .zevtc files are zlib compressed, not zip
-            return self._parse_zevtc_bytes(data)
-        else:
-            # Check if data starts with EVTC header or is compressed
-            if data[:4] == b'EVTC':
-                return self._parse_stream(io.BytesIO(data))
-            else:
-                # Try zlib decompression
-                try:
-                    import zlib
-                    decompressed = zlib.decompress(data)
-                    return self._parse_stream(io.BytesIO(decompressed))
-                except:
-                    return self._parse_stream(io.BytesIO(data))
+    def rows(self, addresses: np.ndarray) -> np.ndarray:
+        """Map an address column to agent rows, -1 if unknown"""
+        if not self.agents:
+            return np.full(addresses.shape, -1, dtype=np.int64)
+        
+        pos = np.searchsorted(self._sorted_addresses, addresses)
+        pos = np.minimum(pos, self._sorted_addresses.size - 1)
+        found = self._sorted_addresses[pos] == addresses
+        return np.where(found, self._order[pos], -1).astype(np.int64)
     
-    def _parse_zip(self, filepath: str) -> ParsedLog:
-        """Parse a zipped EVTC file"""
-        with zipfile.ZipFile(filepath, 'r') as zf:
-            # Get the first .evtc file in the archive
-            for name in zf.namelist():
-                if name.endswith('.evtc') or not name.endswith('.zip'):
-                    with zf.open(name) as f:
-                        return self._parse_stream(io.BytesIO(f.read()))
-            
-            # Fallback: try first file
-            if zf.namelist():
-                with zf.open(zf.namelist()[0]) as f:
-                    return self._parse_stream(io.BytesIO(f.read()))
-        
-        raise ValueError("No EVTC file found in archive")
+    @staticmethod
+    def _instid_keys(instids: np.ndarray, times: np.ndarray) -> np.ndarray:
+        keys = np.asarray(instids, dtype=np.uint64) << np.uint64(INSTID_TIME_BITS)
+        return keys | (np.asarray(times, dtype=np.uint64) & INSTID_TIME_MASK)
     
-    def _parse_zip_bytes(self, data: bytes) -> ParsedLog:
-        """Parse a zipped EVTC from bytes"""
-        with zipfile.ZipFile(io.BytesIO(data), 'r') as zf:
-            for name in zf.namelist():
-                if name.endswith('.evtc') or not name.endswith('.zip'):
-                    with zf.open(name) as f:
-                        return self._parse_stream(io.BytesIO(f.read()))
+    def set_awareness(self, instids: np.ndarray, first_aware: np.ndarray, last_aware: np.ndarray):
+        """Per-row instance id and awareness window; rows with instid 0 were never seen"""
+        rows = np.flatnonzero(np.asarray(instids) != 0)
+        starts = self._instid_keys(instids[rows], first_aware[rows])
+        order = np.argsort(starts, kind='stable')
+        
+        self._range_starts = starts[order]
+        self._range_ends = self._instid_keys(instids[rows], last_aware[rows])[order]
+        self._range_rows = rows[order].astype(np.int64)
+    
+    def rows_by_instid(self, instids: np.ndarray, times: np.ndarray) -> np.ndarray:
+        """Map (instid, time) columns to the agent row aware at that time, -1 if none"""
+        keys = self._instid_keys(instids, times)
+        if self._range_starts.size == 0:
+            return np.full(keys.shape, -1, dtype=np.int64)
+        
+        # Latest range starting at or before the event, same instid and not yet ended
+        pos = np.searchsorted(self._range_starts, keys, side='right') - 1
+        clipped = np.maximum(pos, 0)
+        found = (pos >= 0) & (keys <= self._range_ends[clipped]) & (np.asarray(instids) != 0)
+        found &= (self._range_starts[clipped] >> np.uint64(INSTID_TIME_BITS)) == keys >> np.uint64(INSTID_TIME_BITS)
+        return np.where(found, self._range_rows[clipped], -1)
+    
+    def agent_at(self, instid: int, time: int) -> Optional[EVTCAgent]:
+        """The agent holding an instance id at a given time"""
+        row = int(self.rows_by_instid(np.array([instid]), np.array([time]))[0])
+        return self.agents[row] if row >= 0 else None
+
+
+# =============================================================================
+# EVENT AGGREGATION (columnar, chunked)
+# =============================================================================
+
+# Statechanges whose last occurrence is kept as log metadata
+TRACKED_STATECHANGES = (
+    StateChange.POINT_OF_VIEW,
+    StateChange.MAP_ID,
+    StateChange.SQUAD_COMBAT_START,
+    StateChange.SQUAD_COMBAT_END,
+)
+
+# Per-agent integer counters filled by EventAggregator
+COUNTER_FIELDS = (
+    'damage_dealt', 'damage_taken', 'deaths', 'downs', 'kills',
+    'cc_out', 'boon_strips', 'cleanses', 'barrier_out',
+)
+
+DEFAULT_CHUNK_EVENTS = 65536  # 4 MB of raw events per chunk
+
+
+@dataclass(frozen=True)
+class ParseProfile:
+    """What a parse needs: event categories kept after decoding and outputs computed"""
+    name: str
+    all_statechanges: bool = True  # False keeps only the state changes the aggregator reads
+    buff_events: bool = True       # buff removals and other buffs (boon/condition applications and ticks stay)
+    activations: bool = True       # skill cast start/stop events
+    player_stats: bool = True      # per-skill breakdown and kill attribution (counters always kept)
+    timeline: bool = True          # per-second series
+    boon_stats: bool = True        # boon uptime/generation
+    positions_ms: int = 0          # movement track resolution, 0 skips position/velocity events
+    
+    def event_mask(self, events: np.ndarray) -> Optional[np.ndarray]:
+        """Events to keep from a decoded chunk, None to keep everything"""
+        if self.all_statechanges and self.buff_events and self.activations:
+            return None
+        
+        statechange = events['is_statechange']
+        keep = statechange == 0
+        if not self.activations:
+            keep &= events['is_activation'] == 0
+        if not self.buff_events:
+            # Role detection counts boon/condition applications, so those stay
+            applied = (events['is_buffremove'] == 0) & (events['value'] > 0) & np.isin(events['skill_id'], ROLE_BUFF_IDS)
+            keep &= (events['buff'] == 0) | (events['buff_dmg'] > 0) | applied
+        if self.all_statechanges:
+            return keep | (statechange != 0)
+        keep |= np.isin(statechange, PROFILE_STATECHANGES)
+        if self.positions_ms:
+            keep |= np.isin(statechange, MOVEMENT_STATECHANGES)
+        return keep
+
+
+# State changes every profile keeps
+PROFILE_STATECHANGES = np.array(
+    sorted(TRACKED_STATECHANGES + (StateChange.TEAM_CHANGE, StateChange.CHANGE_DOWN, StateChange.CHANGE_DEAD)),
+    dtype=np.uint8,
+)
+
+# State changes read for movement tracks (ParseProfile.positions_ms)
+MOVEMENT_STATECHANGES = np.array([StateChange.POSITION, StateChange.VELOCITY], dtype=np.uint8)
+POSITION_RESOLUTION_MS = 1000
+
+# Named parse profiles, from cheapest to complete
+PARSE_PROFILES = {
+    # Roster, sides, roles and player totals except strips/cleanses: generate_counter input
+    'composition': ParseProfile('composition', all_statechanges=False, buff_events=False, activations=False,
+                                player_stats=False, timeline=False, boon_stats=False),
+    # Whole-fight player totals (kill counts, rankings): every event, no timeline or boon engine
+    'summary': ParseProfile('summary', timeline=False, boon_stats=False),
+    'full': ParseProfile('full'),
+}
+
+# Boon apply (remove=0) or remove (arcdps is_buffremove: 1 = every stack, 2 = one stack) on a
+# player: record dst holds (or lost) the boon, record src applied or removed it; both are player
+# slots, -1 if not a player. A remove event is the other way round: its src_agent lost the boon
+# and its dst_agent removed it, so the two agents swap places in the record
+BUFF_RECORD_DTYPE = np.dtype([
+    ('time', np.int64), ('src', np.int32), ('dst', np.int32),
+    ('boon', np.int16), ('duration', np.int64), ('remove', np.int8),
+])
+
+# Boon records marking squad combat start/end (in the boon column), where the fight window moves
+BOON_MARK_START = -1
+BOON_MARK_END = -2
+
+# Player -> player damage hit and player down/death, src/dst/slot are player slots
+HIT_RECORD_DTYPE = np.dtype([('time', np.int64), ('src', np.int32), ('dst', np.int32), ('damage', np.int64)])
+STATE_RECORD_DTYPE = np.dtype([('time', np.int64), ('slot', np.int32), ('dead', np.bool_)])
+
+# Damage this long before a down/death counts towards it
+ATTRIBUTION_WINDOW_MS = 10000
+
+# Per-second series recorded for every player (CombatTimeline.values first axis)
+TIMELINE_SERIES = (
+    'damage_out', 'damage_in', 'strips', 'cleanses', 'boons_applied', 'downs', 'deaths',
+)
+TIMELINE_BUCKET_MS = 1000
+
+# Per (player, skill) stats recorded by EventAggregator (SkillBreakdown.values columns)
+SKILL_STAT_FIELDS = ('hits', 'damage', 'crits', 'cc')
+
+
+class EventAggregator:
+    """
+    Accumulates everything the parser needs from the event block, chunk by chunk.
+    
+    Chunks are structured arrays (EVENT_DTYPE_REV1) fed in log order through
+    consume(); what is kept from a chunk once it has been consumed is bounded by
+    the agent table, the boons running at once and the hits of the last
+    attribution window, except for the per-second series, which grow with the
+    fight length.
+    
+    A deferred aggregate (one event range of a parallel parse) keeps its compact
+    boon and attribution records instead, for merge() to fold in after the
+    ranges before it.
+    """
+    
+    def __init__(self, agents: List[EVTCAgent], start_index: int = 0,
+                 profile: ParseProfile = PARSE_PROFILES['full'], timeline_origin: Optional[int] = None,
+                 deferred: bool = False, attribution_window_ms: int = ATTRIBUTION_WINDOW_MS):
+        self.agents = agents
+        self.profile = profile
+        self.deferred = deferred
+        n_agents = len(agents)
+        
+        self.index = AgentIndex(agents)
+        self.is_player = np.fromiter((a.is_player for a in agents), dtype=bool, count=n_agents)
+        
+        self.next_index = start_index
+        
+        # Awareness: first/last combat event per agent (global event indexes)
+        self.first_index = np.full(n_agents, -1, dtype=np.int64)
+        self.first_time = np.zeros(n_agents, dtype=np.uint64)
+        self.first_instid = np.zeros(n_agents, dtype=np.uint16)
+        self.last_index = np.full(n_agents, -1, dtype=np.int64)
+        self.last_time = np.zeros(n_agents, dtype=np.uint64)
+        
+        # Statechanges: kind -> (event index, src_agent, time) of the last occurrence
+        self.statechanges: Dict[int, Tuple[int, int, int]] = {}
+        self.team_index = np.full(n_agents, -1, dtype=np.int64)
+        self.team_id = np.zeros(n_agents, dtype=np.uint64)
+        
+        self.max_time = 0
+        self.combat_min_time: Optional[int] = None
+        self.combat_max_time: Optional[int] = None
+        
+        # Player stats
+        self.counters = {name: np.zeros(n_agents, dtype=np.int64) for name in COUNTER_FIELDS}
+        self.boons_applied = np.zeros((n_agents, BOON_ID_ARRAY.size), dtype=np.int64)
+        self.conditions_applied = np.zeros((n_agents, CONDITION_ID_ARRAY.size), dtype=np.int64)
+        self.skill_keys = np.empty(0, dtype=np.int64)  # sorted (row << 32) | skill_id
+        self.skill_stat_keys = np.empty(0, dtype=np.int64)  # sorted (player slot << 32) | skill_id
+        self.skill_stats = np.zeros((0, len(SKILL_STAT_FIELDS)), dtype=np.int64)
+        
+        # Timeline: (series, player slot, second) counts, grown as later seconds show up
+        self.player_rows = np.flatnonzero(self.is_player)
+        self.player_slot = np.full(n_agents + 1, -1, dtype=np.int64)  # row -> slot, row -1 -> -1
+        self.player_slot[self.player_rows] = np.arange(self.player_rows.size)
+        self.timeline_origin = timeline_origin  # set up front when event ranges are aggregated apart
+        self.timeline_seconds = 0
+        self.timeline = np.zeros((len(TIMELINE_SERIES), self.player_rows.size, 0), dtype=np.int64)
+        
+        # Boon intervals on players (deferred: the boon records, until merged)
+        self.boons = BoonTracker(self.player_rows.size)
+        self.buff_chunks: List[np.ndarray] = []
+        
+        # Kill/down attribution (deferred: the hit and down/death records, until merged)
+        self.attribution = AttributionTracker(self.player_rows.size, attribution_window_ms)
+        self.attribution_chunks: List[Tuple[np.ndarray, np.ndarray]] = []
+        
+        # Damage hits between players (source slot, target slot), the side classification graph
+        self.damage_hits = np.zeros((self.player_rows.size, self.player_rows.size), dtype=np.int64)
+        
+        # Movement: last position (x, y, z) and speed per (player slot, bucket), NaN without a sample
+        self.movement_buckets = 0
+        self.positions = np.full((self.player_rows.size, 0, 3), np.nan, dtype=np.float32)
+        self.speeds = np.full((self.player_rows.size, 0), np.nan, dtype=np.float32)
+    
+    def rows(self, addresses: np.ndarray) -> np.ndarray:
+        """Map an address column to agent rows, -1 if unknown"""
+        return self.index.rows(addresses)
+    
+    def consume(self, events: np.ndarray):
+        """Aggregate the next chunk of events (must follow the previous chunk in log order)"""
+        if events.size == 0:
+            return
+        
+        base = self.next_index
+        self.next_index += events.size
+        
+        # Drop what the profile doesn't need before any per-event work
+        # (stored event indices stay positions in the full log)
+        keep = self.profile.event_mask(events)
+        position = None
+        if keep is not None:
+            position = np.flatnonzero(keep)
+            events = events[position]
+            if events.size == 0:
+                return
+        log_index = (lambda i: base + i) if position is None else (lambda i: base + position[i])
+        
+        src_rows = self.rows(events['src_agent'])
+        dst_rows = self.rows(events['dst_agent'])
+        statechange = events['is_statechange']
+        times = events['time']
+        combat = statechange == 0
+        
+        # Awareness from combat events
+        idx = np.flatnonzero(combat & (src_rows >= 0))
+        if idx.size:
+            rows = src_rows[idx]
+            unique_rows, first = np.unique(rows, return_index=True)
+            _, last_reversed = np.unique(rows[::-1], return_index=True)
+            first_idx = idx[first]
+            last_idx = idx[rows.size - 1 - last_reversed]
             
-            if zf.namelist():
-                with zf.open(zf.namelist()[0]) as f:
-                    return self._parse_stream(io.BytesIO(f.read()))
-        
-        raise ValueError("No EVTC file found in archive")
+            new = self.first_index[unique_rows] < 0
+            new_rows, new_first = unique_rows[new], first_idx[new]
+            self.first_index[new_rows] = log_index(new_first)
+            self.first_time[new_rows] = times[new_first]
+            self.first_instid[new_rows] = events['src_instid'][new_first]
+            self.last_index[unique_rows] = log_index(last_idx)
+            self.last_time[unique_rows] = times[last_idx]
+        
+        # Statechanges (last occurrence wins)
+        for kind in TRACKED_STATECHANGES:
+            idx = np.flatnonzero(statechange == kind)
+            if idx.size:
+                i = idx[-1]
+                self.statechanges[int(kind)] = (int(log_index(i)), int(events['src_agent'][i]), int(times[i]))
+        
+        idx = np.flatnonzero((statechange == StateChange.TEAM_CHANGE) & (src_rows >= 0))
+        if idx.size:
+            idx = idx[::-1]
+            unique_rows, last = np.unique(src_rows[idx], return_index=True)
+            self.team_index[unique_rows] = log_index(idx[last])
+            self.team_id[unique_rows] = events['dst_agent'][idx[last]]
+        
+        self.max_time = max(self.max_time, int(times.max()))
+        combat_times = times[combat]
+        if combat_times.size:
+            low, high = int(combat_times.min()), int(combat_times.max())
+            self.combat_min_time = low if self.combat_min_time is None else min(self.combat_min_time, low)
+            self.combat_max_time = high if self.combat_max_time is None else max(self.combat_max_time, high)
+        
+        if self.timeline_origin is None:
+            self.timeline_origin = self.find_timeline_origin(events)
+        
+        # Player stats (every profile: role detection reads the boon/condition counts)
+        self._consume_player_stats(events, src_rows, dst_rows, combat)
+        if self.profile.positions_ms and self.timeline_origin is not None:
+            self._consume_movement(events, src_rows)
+        
+        # Who damaged whom (player slot -> player slot), real damage only: boon durations,
+        # cast times and barrier also use `value` and would link allies together
+        damage = (combat & (events['is_activation'] == 0) & (events['is_shields'] == 0)
+                  & (((events['buff'] == 0) & (events['value'] > 0)) | ((events['buff'] != 0) & (events['buff_dmg'] > 0))))
+        src_slots = self.player_slot[src_rows[damage]]
+        dst_slots = self.player_slot[dst_rows[damage]]
+        both = (src_slots >= 0) & (dst_slots >= 0)
+        if both.any():
+            n_players = self.player_rows.size
+            pairs = np.bincount(src_slots[both] * n_players + dst_slots[both], minlength=n_players * n_players)
+            self.damage_hits += pairs.reshape(n_players, n_players)
     
-    def _parse_zevtc_bytes(self, data: bytes) -> ParsedLog:
-        """Parse a .zevtc file (zlib compressed EVTC or ZIP)"""
-        import zlib
-        
-        # Check for ZIP signature (PK)
-        if data[:2] == b'PK':
-            return self._parse_zip_bytes(data)
-        
-        # Check for raw EVTC
-        if data[:4] == b'EVTC':
-            return self._parse_stream(io.BytesIO(data))
-        
-        # Try zlib decompression
-        try:
-            decompressed = zlib.decompress(data)
-            return self._parse_stream(io.BytesIO(decompressed))
-        except zlib.error:
-            pass
-        
-        # Last resort: try as raw stream
-        raise ValueError(f"Unable to parse .zevtc file. Unknown format (starts with: {data[:4]})")
+    def _consume_player_stats(self, events: np.ndarray, src_rows: np.ndarray, dst_rows: np.ndarray,
+                              combat: np.ndarray):
+        """Per-player counters, boon/condition counts and skills of a chunk, plus what else the profile asks for"""
+        n_agents = len(self.agents)
+        statechange = events['is_statechange']
+        times = events['time']
+        value = events['value']
+        buff_dmg = events['buff_dmg']
+        buffremove = events['is_buffremove']
+        result = events['result']
+        skill_id = events['skill_id']
+        is_buff = events['buff'] != 0
+        is_boon = np.isin(skill_id, BOON_ID_ARRAY)
+        is_condition = np.isin(skill_id, CONDITION_ID_ARRAY)
+        
+        def count(mask: np.ndarray, rows: np.ndarray) -> np.ndarray:
+            sel = np.flatnonzero(mask & (rows >= 0))
+            return np.bincount(rows[sel], minlength=n_agents)
+        
+        def total(mask: np.ndarray, rows: np.ndarray, weights: np.ndarray) -> np.ndarray:
+            sel = np.flatnonzero(mask & (rows >= 0))
+            return np.bincount(rows[sel], weights=weights[sel], minlength=n_agents).astype(np.int64)
+        
+        # Direct damage and condition damage - filter out impossible values (max 500k per hit)
+        direct = combat & ~is_buff & (value > 0) & (value < 500000)
+        condi = combat & is_buff & (buff_dmg > 0) & (buff_dmg < 500000)
+        taken_direct = combat & ~is_buff & (value > 0)
+        taken_condi = combat & is_buff & (buff_dmg > 0)
+        
+        # is_buffremove: 1 = every stack, 2 = one stack, 3 = manual; src_agent lost the buff and
+        # dst_agent removed it. Strips remove a boon outright, cleanses remove conditions a stack at a time
+        strips = combat & is_buff & (buffremove == 1) & is_boon & (events['dst_agent'] != events['src_agent'])
+        cleanses = combat & is_buff & (buffremove == 2) & is_condition
+        applied = combat & is_buff & (buffremove == 0) & (value > 0)
+        
+        counters = self.counters
+        counters['damage_dealt'] += total(direct, src_rows, value) + total(condi, src_rows, buff_dmg)
+        counters['damage_taken'] += total(taken_direct, dst_rows, value) + total(taken_condi, dst_rows, buff_dmg)
+        counters['deaths'] += count(statechange == StateChange.CHANGE_DEAD, src_rows)
+        counters['downs'] += count(statechange == StateChange.CHANGE_DOWN, src_rows)
+        counters['kills'] += count(combat & (result == 8), src_rows)  # CBTR_KILLINGBLOW
+        counters['cc_out'] += count(combat & (result == 5), src_rows)  # Interrupt
+        counters['boon_strips'] += count(strips, dst_rows)
+        counters['cleanses'] += count(cleanses, dst_rows)
+        counters['barrier_out'] += total(combat & (events['is_shields'] != 0) & (value > 0), src_rows, value)
+        
+        self.boons_applied += self._count_by_skill(applied & is_boon, src_rows, skill_id, BOON_ID_ARRAY)
+        self.conditions_applied += self._count_by_skill(applied & is_condition, src_rows, skill_id, CONDITION_ID_ARRAY)
+        
+        # Per-second series, binned from the same masks
+        src_slots = self.player_slot[src_rows]
+        damage = np.where(is_buff, buff_dmg, value)
+        if self.profile.timeline and self.timeline_origin is not None and self.player_rows.size:
+            dst_slots = self.player_slot[dst_rows]
+            seconds = np.maximum(times.astype(np.int64) - self.timeline_origin, 0) // TIMELINE_BUCKET_MS
+            series = {
+                'damage_out': (direct | condi, src_slots, damage),
+                'damage_in': (taken_direct | taken_condi, dst_slots, damage),
+                'strips': (strips, dst_slots, None),
+                'cleanses': (cleanses, dst_slots, None),
+                'boons_applied': (applied & is_boon, src_slots, None),
+                'downs': (statechange == StateChange.CHANGE_DOWN, src_slots, None),
+                'deaths': (statechange == StateChange.CHANGE_DEAD, src_slots, None),
+            }
+            for i, name in enumerate(TIMELINE_SERIES):
+                mask, slots, weights = series[name]
+                self._bin_series(i, np.flatnonzero(mask & (slots >= 0)), slots, seconds, weights)
+        
+        # Per (player, skill) breakdown: one grouping of the chunk, one bincount per stat
+        interrupts = combat & (result == 5)
+        idx = np.flatnonzero((direct | condi | interrupts) & (src_slots >= 0))
+        if self.profile.player_stats and idx.size:
+            keys, group = np.unique((src_slots[idx] << 32) | skill_id[idx].astype(np.int64), return_inverse=True)
+            hits = direct[idx] | condi[idx]
+            stats = {
+                'hits': hits,
+                'damage': np.where(hits, damage[idx], 0),
+                'crits': direct[idx] & (result[idx] == 1),
+                'cc': interrupts[idx],
+            }
+            values = np.stack([np.bincount(group, weights=stats[name], minlength=keys.size)
+                               for name in SKILL_STAT_FIELDS], axis=1)
+            self._add_skill_stats(keys, values.astype(np.int64))
+        
+        # Boon events on players for uptime/generation: on a remove the player losing the boon
+        # is the event's src_agent (record dst) and the remover its dst_agent (record src);
+        # squad combat start/end move the fight window
+        dst_player = self.player_slot[dst_rows]
+        applies = combat & is_buff & is_boon & (buffremove == 0) & (value > 0) & (dst_player >= 0)
+        removes = combat & is_buff & is_boon & ((buffremove == 1) | (buffremove == 2)) & (src_slots >= 0)
+        starts = statechange == StateChange.SQUAD_COMBAT_START
+        marks = starts | (statechange == StateChange.SQUAD_COMBAT_END)
+        idx = np.flatnonzero(applies | removes | marks)
+        if self.profile.boon_stats and idx.size:
+            removed = removes[idx]
+            records = np.empty(idx.size, dtype=BUFF_RECORD_DTYPE)
+            records['time'] = times[idx]
+            records['src'] = np.where(removed, dst_player[idx], src_slots[idx])
+            records['dst'] = np.where(removed, src_slots[idx], dst_player[idx])
+            records['boon'] = np.where(marks[idx], np.where(starts[idx], BOON_MARK_START, BOON_MARK_END),
+                                       np.searchsorted(BOON_ID_ARRAY, skill_id[idx]))
+            records['duration'] = np.maximum(value[idx], 0)
+            records['remove'] = np.where(removed, buffremove[idx], 0)
+            self._add_boon_records(records)
+        
+        # Player -> player hits (real damage) and player downs/deaths for attribution
+        if self.profile.player_stats:
+            dst_slots = self.player_slot[dst_rows]
+            idx = np.flatnonzero((direct | condi) & (events['is_activation'] == 0) & (events['is_shields'] == 0)
+                                 & (src_slots >= 0) & (dst_slots >= 0))
+            hits = np.empty(idx.size, dtype=HIT_RECORD_DTYPE)
+            hits['time'] = times[idx]
+            hits['src'] = src_slots[idx]
+            hits['dst'] = dst_slots[idx]
+            hits['damage'] = damage[idx]
+            down_or_dead = (statechange == StateChange.CHANGE_DOWN) | (statechange == StateChange.CHANGE_DEAD)
+            idx = np.flatnonzero(down_or_dead & (src_slots >= 0))
+            states = np.empty(idx.size, dtype=STATE_RECORD_DTYPE)
+            states['time'] = times[idx]
+            states['slot'] = src_slots[idx]
+            states['dead'] = statechange[idx] == StateChange.CHANGE_DEAD
+            if hits.size or states.size:
+                self._add_attribution_records(hits, states)
+        
+        # Skills used, as a sorted set of (row, skill) keys
+        idx = np.flatnonzero(combat & (src_rows >= 0))
+        if idx.size:
+            keys = (src_rows[idx] << 32) | skill_id[idx].astype(np.int64)
+            self.skill_keys = np.union1d(self.skill_keys, keys)
     
-    def _parse_stream(self, stream: BinaryIO) -> ParsedLog:
-        """Parse EVTC from a binary stream"""
-        # Reset state
-        self.agents = {}
-        self.agents_by_instid = {}
-        self.skills = {}
-        self.events = []
-        
-        # Parse header
-        self.header = self._parse_header(stream)
-        
-        # Parse agents
-        agent_count = struct.unpack('<I', stream.read(4))[0]
-        for _ in range(agent_count):
-            agent = self._parse_agent(stream)
-            self.agents[agent.address] = agent
-        
-        # Parse skills
-        skill_count = struct.unpack('<I', stream.read(4))[0]
-        for _ in range(skill_count):
-            skill = self._parse_skill(stream)
-            self.skills[skill.id] = skill
-        
-        # Parse combat events
-        while True:
-            event = self._parse_event(stream)
-            if event is None:
-                break
-            self.events.append(event)
-        
-        # Process events to build agent data
-        self._process_events()
-        
-        # Build parsed result
-        return self._build_result()
+    def _add_boon_records(self, records: np.ndarray):
+        """Fold boon records in, or keep them for the merge when deferred"""
+        if self.deferred:
+            self.buff_chunks.append(records)
+        else:
+            self.boons.consume(records)
     
-    def _parse_header(self, stream: BinaryIO) -> EVTCHeader:
-        """Parse EVTC header"""
-        magic = stream.read(4).decode('ascii', errors='ignore')
-        
-        if magic != 'EVTC':
-            raise ValueError(f"Invalid EVTC magic: {magic}")
+    def _add_attribution_records(self, hits: np.ndarray, states: np.ndarray):
+        """Fold hit and down/death records in, or keep them for the merge when deferred"""
+        if self.deferred:
+            self.attribution_chunks.append((hits, states))
+        else:
+            self.attribution.consume(hits, states)
+    
+    def _consume_movement(self, events: np.ndarray, src_rows: np.ndarray):
+        """
+        Downsample the position/velocity events of players in a chunk.
         
-        arcdps_build = stream.read(8).decode('ascii', errors='ignore').rstrip('\x00')
-        revision = struct.unpack('<B', stream.read(1))[0]
+        Position events carry x/y as two float32 in dst_agent and z as a float32
+        in value, velocity events the same for the velocity vector. The last
+        sample of a player in a bucket wins.
+        """
+        statechange = events['is_statechange']
+        slots = self.player_slot[src_rows]
+        buckets = np.maximum(events['time'].astype(np.int64) - self.timeline_origin, 0) // self.profile.positions_ms
         
-        # Boss ID is always 2 bytes (uint16)
-        boss_id = struct.unpack('<H', stream.read(2))[0]
+        for kind in MOVEMENT_STATECHANGES:
+            idx = np.flatnonzero((statechange == kind) & (slots >= 0))
+            if not idx.size:
+                continue
+            
+            # Last sample per (slot, bucket)
+            keys = slots[idx] * (int(buckets[idx].max()) + 1) + buckets[idx]
+            _, last = np.unique(keys[::-1], return_index=True)
+            idx = idx[idx.size - 1 - last]
+            self._grow_movement(int(buckets[idx].max()) + 1)
+            
+            xyz = np.empty((idx.size, 3), dtype=np.float32)
+            xyz[:, :2] = np.ascontiguousarray(events['dst_agent'][idx]).view('<f4').reshape(-1, 2)
+            xyz[:, 2] = np.ascontiguousarray(events['value'][idx]).view('<f4')
+            if kind == StateChange.POSITION:
+                self.positions[slots[idx], buckets[idx]] = xyz
+            else:
+                self.speeds[slots[idx], buckets[idx]] = np.sqrt((xyz * xyz).sum(axis=1))
+    
+    def _grow_movement(self, buckets: int):
+        """Make room for `buckets` movement samples per player, growing geometrically"""
+        self.movement_buckets = max(self.movement_buckets, buckets)
+        if buckets <= self.speeds.shape[1]:
+            return
+        size = max(buckets, 2 * self.speeds.shape[1])
+        positions = np.full((self.player_rows.size, size, 3), np.nan, dtype=np.float32)
+        speeds = np.full((self.player_rows.size, size), np.nan, dtype=np.float32)
+        positions[:, :self.positions.shape[1]] = self.positions
+        speeds[:, :self.speeds.shape[1]] = self.speeds
+        self.positions, self.speeds = positions, speeds
+    
+    def _add_skill_stats(self, keys: np.ndarray, values: np.ndarray):
+        """Add (player, skill) rows for sorted unique keys to the running breakdown"""
+        merged = np.union1d(self.skill_stat_keys, keys)
+        stats = np.zeros((merged.size, len(SKILL_STAT_FIELDS)), dtype=np.int64)
+        stats[np.searchsorted(merged, self.skill_stat_keys)] = self.skill_stats
+        stats[np.searchsorted(merged, keys)] += values
+        self.skill_stat_keys, self.skill_stats = merged, stats
+    
+    @staticmethod
+    def find_timeline_origin(events: np.ndarray) -> Optional[int]:
+        """Squad combat start, else the first combat event time, else None"""
+        statechange = events['is_statechange']
+        start = np.flatnonzero(statechange == StateChange.SQUAD_COMBAT_START)
+        if start.size:
+            return int(events['time'][start[0]])
+        combat_times = events['time'][statechange == 0]
+        return int(combat_times.min()) if combat_times.size else None
+    
+    def _grow_timeline(self, seconds: int):
+        """Make room for `seconds` buckets, growing geometrically for amortized O(1) appends"""
+        if seconds <= self.timeline.shape[2]:
+            return
+        grown = np.zeros(self.timeline.shape[:2] + (max(seconds, 2 * self.timeline.shape[2]),), dtype=np.int64)
+        grown[:, :, :self.timeline.shape[2]] = self.timeline
+        self.timeline = grown
+    
+    def _bin_series(self, series: int, sel: np.ndarray, slots: np.ndarray,
+                    seconds: np.ndarray, weights: Optional[np.ndarray]):
+        """Add the selected events of a chunk to one timeline series, binned per second"""
+        if not sel.size:
+            return
+        
+        sec = seconds[sel]
+        low, high = int(sec.min()), int(sec.max())
+        width = high - low + 1
+        self._grow_timeline(high + 1)
+        self.timeline_seconds = max(self.timeline_seconds, high + 1)
+        
+        n_slots = self.player_rows.size
+        keys = slots[sel] * width + (sec - low)
+        binned = np.bincount(keys, weights=None if weights is None else weights[sel],
+                             minlength=n_slots * width)
+        self.timeline[series, :, low:high + 1] += binned.reshape(n_slots, width).astype(np.int64)
+    
+    def merge(self, other: "EventAggregator"):
+        """
+        Fold in the aggregate of the events that directly follow this one's.
         
-        # Skip padding byte for alignment (revision 1+)
-        if revision >= 1:
+        Both sides must share the agent table, profile and timeline origin, and
+        `other` must be deferred so its boon and attribution records can be folded
+        in after this aggregate's. Merging the partial aggregates of consecutive event ranges in
+        log order gives the same result as consuming every range with one aggregator.
+        """
+        if (self.timeline_origin is not None and other.timeline_origin is not None
+                and self.timeline_origin != other.timeline_origin):
+            raise ValueError("Cannot merge aggregates with different timeline origins")
+        if not other.deferred:
+            raise ValueError("Only deferred aggregates can be merged in")
+        self.next_index = max(self.next_index, other.next_index)
+        
+        # Awareness: earliest first event, latest last event
+        take = (other.first_index >= 0) & ((self.first_index < 0) | (other.first_index < self.first_index))
+        self.first_index[take] = other.first_index[take]
+        self.first_time[take] = other.first_time[take]
+        self.first_instid[take] = other.first_instid[take]
+        take = other.last_index > self.last_index
+        self.last_index[take] = other.last_index[take]
+        self.last_time[take] = other.last_time[take]
+        
+        # Statechanges and teams: last occurrence wins
+        for kind, entry in other.statechanges.items():
+            if kind not in self.statechanges or entry[0] > self.statechanges[kind][0]:
+                self.statechanges[kind] = entry
+        take = other.team_index > self.team_index
+        self.team_index[take] = other.team_index[take]
+        self.team_id[take] = other.team_id[take]
+        
+        self.max_time = max(self.max_time, other.max_time)
+        if other.combat_min_time is not None:
+            if self.combat_min_time is None:
+                self.combat_min_time, self.combat_max_time = other.combat_min_time, other.combat_max_time
+            else:
+                self.combat_min_time = min(self.combat_min_time, other.combat_min_time)
+                self.combat_max_time = max(self.combat_max_time, other.combat_max_time)
+        
+        # Additive stats
+        for name in COUNTER_FIELDS:
+            self.counters[name] += other.counters[name]
+        self.boons_applied += other.boons_applied
+        self.conditions_applied += other.conditions_applied
+        self.damage_hits += other.damage_hits
+        self.skill_keys = np.union1d(self.skill_keys, other.skill_keys)
+        self._add_skill_stats(other.skill_stat_keys, other.skill_stats)
+        for records in other.buff_chunks:
+            self._add_boon_records(records)
+        for hits, states in other.attribution_chunks:
+            self._add_attribution_records(hits, states)
+        
+        if self.timeline_origin is None:
+            self.timeline_origin = other.timeline_origin
+        seconds = other.timeline_seconds
+        if seconds:
+            self._grow_timeline(seconds)
+            self.timeline[:, :, :seconds] += other.timeline[:, :, :seconds]
+            self.timeline_seconds = max(self.timeline_seconds, seconds)
+        
+        # Movement: the later range's samples win
+        buckets = other.movement_buckets
+        if buckets:
+            self._grow_movement(buckets)
+            sampled = ~np.isnan(other.positions[:, :buckets, 0])
+            self.positions[:, :buckets][sampled] = other.positions[:, :buckets][sampled]
+            sampled = ~np.isnan(other.speeds[:, :buckets])
+            self.speeds[:, :buckets][sampled] = other.speeds[:, :buckets][sampled]
+    
+    def boon_stats(self, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Boon uptime and generated time over the fight (see BoonTracker.finalize)"""
+        return self.boons.finalize(start, end)
+    
+    def timeline_values(self) -> np.ndarray:
+        """Final (series, player slot, second) array, int32 when every value fits"""
+        values = self.timeline[:, :, :self.timeline_seconds]
+        if values.size == 0 or values.max() <= np.iinfo(np.int32).max:
+            return values.astype(np.int32)
+        return values.copy()
+    
+    def movement_values(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Final (player slot, bucket, 3) positions and (player slot, bucket) speeds.
+        Buckets without a sample repeat the previous one, NaN before the first.
+        """
+        return (_forward_fill(self.positions[:, :self.movement_buckets]),
+                _forward_fill(self.speeds[:, :self.movement_buckets]))
+    
+    def _count_by_skill(self, mask: np.ndarray, rows: np.ndarray, skill_id: np.ndarray,
+                        id_array: np.ndarray) -> np.ndarray:
+        """Dense (agent row x skill) counts of masked events for the skills in id_array"""
+        n_agents = len(self.agents)
+        sel = np.flatnonzero(mask & (rows >= 0))
+        column = np.searchsorted(id_array, skill_id[sel])
+        counts = np.bincount(rows[sel] * id_array.size + column, minlength=n_agents * id_array.size)
+        return counts.reshape(n_agents, id_array.size)
+    
+    def skills_used_by_row(self) -> Dict[int, Set[int]]:
+        """Set of skills used per agent row"""
+        rows = (self.skill_keys >> 32).tolist()
+        skills = (self.skill_keys & 0xFFFFFFFF).tolist()
+        skills_used: Dict[int, Set[int]] = {}
+        for row, skill in zip(rows, skills):
+            skills_used.setdefault(row, set()).add(skill)
+        return skills_used
+    
+    @staticmethod
+    def applied_by_row(counts: np.ndarray, id_array: np.ndarray) -> Dict[int, Dict[int, int]]:
+        """Turn a dense (agent row x skill) count matrix into {row: {skill_id: count}}"""
+        applied: Dict[int, Dict[int, int]] = {}
+        for row, column in zip(*np.nonzero(counts)):
+            applied.setdefault(int(row), {})[int(id_array[column])] = int(counts[row, column])
+        return applied
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """Replace NaN samples along axis 1 with the last sample before them"""
+    sampled = ~np.isnan(values if values.ndim == 2 else values[..., 0])
+    source = np.where(sampled, np.arange(values.shape[1]), 0)
+    np.maximum.accumulate(source, axis=1, out=source)
+    return values[np.arange(values.shape[0])[:, None], source]
+
+
+# =============================================================================
+# BOON UPTIME & GENERATION (interval engine)
+# =============================================================================
+
+BOON_IS_INTENSITY = np.isin(BOON_ID_ARRAY, list(INTENSITY_BOON_IDS))
+
+# Boon intervals still running between two chunks, key is target * n_boons + boon
+PENDING_BOON_DTYPE = np.dtype([('src', np.int32), ('key', np.int64), ('begin', np.int64), ('finish', np.int64)])
+
+
+def _group_cummax(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """Running maximum of values restarting at every new group (groups sorted ascending)"""
+    if values.size == 0:
+        return values
+    low = values.min()
+    span = int(values.max() - low) + 1
+    shifted = (values - low) + groups * span
+    return np.maximum.accumulate(shifted) - groups * span + low
+
+
+def _group_ids(keys: np.ndarray) -> np.ndarray:
+    """Ordinal of each run of equal keys in a sorted key array"""
+    if keys.size == 0:
+        return keys.astype(np.int64)
+    return np.concatenate(([0], np.cumsum(keys[1:] != keys[:-1]))).astype(np.int64)
+
+
+def _union_length(keys: np.ndarray, begin: np.ndarray, finish: np.ndarray, size: int) -> np.ndarray:
+    """Covered time per key of the union of the [begin, finish) intervals"""
+    order = np.lexsort((begin, keys))
+    key_sorted = keys[order]
+    begin, finish = begin[order], finish[order]
+    group = _group_ids(key_sorted)
+    reach = _group_cummax(finish, group)
+    previous = np.empty_like(reach)
+    previous[1:] = reach[:-1]
+    first = np.ones(order.size, dtype=bool)
+    first[1:] = group[1:] != group[:-1]
+    previous[first] = begin[first]
+    covered = np.maximum(finish - np.maximum(begin, previous), 0)
+    return np.bincount(key_sorted, weights=covered, minlength=size).astype(np.int64)
+
+
+class BoonTracker:
+    """
+    Boon intervals on players, folded from apply/remove records chunk by chunk.
+    
+    Duration boons queue per (source, target, boon): each application starts when
+    the previous one from the same source ends. Intensity boons are independent
+    stacks. A remove of every stack on (target, boon) cuts the intervals running
+    at that time; a single-stack remove of an intensity boon ends the stack whose
+    remaining time is closest to the removed duration.
+    
+    Between chunks only the intervals still running are kept, each duration queue
+    as one interval (its queued applications are back to back). Finished intervals
+    are added to generated and stack time as they end, and duration boon coverage
+    is counted up to the latest record time, so memory follows the number of boons
+    running at once rather than the length of the fight.
+    """
+    
+    def __init__(self, n_players: int, start: int = 0):
+        self.n_players = n_players
+        self.start = start
+        self.frontier = start  # coverage is counted up to here
+        self.pending = np.empty(0, dtype=PENDING_BOON_DTYPE)
+        n_keys = n_players * BOON_ID_ARRAY.size
+        self.covered = np.zeros(n_keys, dtype=np.int64)  # (target, boon) union of duration boons
+        self.stack_time = np.zeros(n_keys, dtype=np.int64)  # (target, boon) sum of interval lengths
+        self.generated = np.zeros(n_players * n_keys, dtype=np.int64)  # (source, target, boon)
+        # (time, state) at the last squad combat end, the fight end unless combat starts again
+        self.at_end: Optional[Tuple[int, "BoonTracker"]] = None
+    
+    def consume(self, records: np.ndarray):
+        """Fold the next BUFF_RECORD_DTYPE records (in log order) in"""
+        begin = 0
+        for mark in np.flatnonzero(records['boon'] < 0).tolist():
+            self._fold(records[begin:mark])
+            time = int(records['time'][mark])
+            if records['boon'][mark] == BOON_MARK_START:
+                self._restart(time)
+            else:
+                self.at_end = (time, self._copy())
+            begin = mark + 1
+        self._fold(records[begin:])
+    
+    def finalize(self, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Uptime and generated time per boon, running intervals cut at `end`.
+        The state at the last squad combat end is used when `end` is that time.
+        
+        Returns:
+            uptime: (player, boon) float64 - % of the fight for duration boons,
+                average stacks for intensity boons
+            generated: (source player, target player, boon) int64 - ms of boon given
+        """
+        state = self.at_end[1] if self.at_end is not None and self.at_end[0] == end else self
+        state = state._copy()
+        pending = state.pending
+        finish = np.minimum(pending['finish'], end)
+        begin = np.minimum(pending['begin'], finish)
+        covered_begin = np.maximum(begin, state.frontier)
+        inside = ~BOON_IS_INTENSITY[pending['key'] % BOON_ID_ARRAY.size] & (finish > covered_begin)
+        state.covered += _union_length(pending['key'][inside], covered_begin[inside], finish[inside],
+                                       state.covered.size)
+        state._add_finished(pending['src'], pending['key'], finish - begin)
+        
+        n_players, n_boons = self.n_players, BOON_ID_ARRAY.size
+        fight = max(end - start, 1)
+        stacks = state.stack_time.reshape(n_players, n_boons)
+        covered = state.covered.reshape(n_players, n_boons)
+        uptime = np.where(BOON_IS_INTENSITY, stacks / fight, covered / fight * 100)
+        return uptime, state.generated.reshape(n_players, n_players, n_boons)
+    
+    def _copy(self) -> "BoonTracker":
+        state = copy.copy(self)
+        for name in ('pending', 'covered', 'stack_time', 'generated'):
+            setattr(state, name, getattr(self, name).copy())
+        state.at_end = None
+        return state
+    
+    def _restart(self, time: int):
+        """Squad combat (re)starts: count from `time` on, keeping the boons still running"""
+        self.start = self.frontier = time
+        for totals in (self.covered, self.stack_time, self.generated):
+            totals[:] = 0
+        pending = self.pending[self.pending['finish'] > time]
+        pending['begin'] = np.maximum(pending['begin'], time)
+        self.pending = pending
+    
+    def _add_finished(self, src: np.ndarray, key: np.ndarray, length: np.ndarray):
+        """Add the length of finished intervals to stack and generated time"""
+        n_keys = self.stack_time.size
+        self.stack_time += np.bincount(key, weights=length, minlength=n_keys).astype(np.int64)
+        given = src >= 0
+        self.generated += np.bincount(src[given].astype(np.int64) * n_keys + key[given], weights=length[given],
+                                      minlength=self.generated.size).astype(np.int64)
+    
+    def _fold(self, records: np.ndarray):
+        """Fold records without squad combat marks in, up to their latest time"""
+        if records.size == 0:
+            return
+        n_boons = BOON_ID_ARRAY.size
+        t = np.maximum(records['time'].astype(np.int64), self.start)
+        key = records['dst'].astype(np.int64) * n_boons + records['boon']
+        kind = records['remove']
+        
+        # Every remove-all as one sorted (target/boon, time) key
+        base = int(t.min()) - 1
+        span = int(t.max()) - base + 1
+        removal = np.sort(key[kind == 1] * span + (t[kind == 1] - base))
+        
+        # Running intervals come first, as if applied before any of the records
+        pending, applied = self.pending, kind == 0
+        src = np.concatenate((pending['src'], records['src'][applied]))
+        app_key = np.concatenate((pending['key'], key[applied]))
+        app_time = np.concatenate((np.zeros(pending.size, dtype=np.int64), t[applied] - base))
+        begin = np.concatenate((pending['begin'], t[applied]))
+        duration = np.concatenate((pending['finish'] - pending['begin'], records['duration'][applied]))
+        
+        # Next remove-all on the same target/boon; its index also names the "epoch"
+        # between two removals, which is where queued durations restart
+        nxt = np.searchsorted(removal, app_key * span + app_time, side='right')
+        cut = np.full(src.size, np.iinfo(np.int64).max, dtype=np.int64)
+        has_next = nxt < removal.size
+        same = np.zeros(src.size, dtype=bool)
+        same[has_next] = removal[nxt[has_next]] // span == app_key[has_next]
+        cut[same] = removal[nxt[same]] % span + base
+        finish = begin + duration
+        
+        # Queue duration boons: end_i = C_i + max_{j<=i}(t_j - C_{j-1}) within a chain
+        intensity = BOON_IS_INTENSITY[app_key % n_boons]
+        order = np.flatnonzero(~intensity)
+        order = order[np.lexsort((app_time[order], nxt[order], app_key[order], src[order]))]
+        if order.size:
+            chain_src, chain_key, epoch = src[order], app_key[order], nxt[order]
+            change = (chain_src[1:] != chain_src[:-1]) | (chain_key[1:] != chain_key[:-1]) | (epoch[1:] != epoch[:-1])
+            chain = np.concatenate(([0], np.cumsum(change))).astype(np.int64)
+            total = np.cumsum(duration[order])
+            chain_end = total + _group_cummax(begin[order] - (total - duration[order]), chain)
+            finish[order] = chain_end
+            begin[order] = chain_end - duration[order]
+        finish = np.minimum(finish, cut)
+        begin = np.minimum(begin, finish)
+        
+        # Single-stack removes of intensity boons, in log order
+        single = np.flatnonzero((kind == 2) & BOON_IS_INTENSITY[records['boon']])
+        if single.size:
+            stacks = np.flatnonzero(intensity)
+            stacks = stacks[np.argsort(app_key[stacks], kind='stable')]
+            low = np.searchsorted(app_key[stacks], key[single], side='left')
+            high = np.searchsorted(app_key[stacks], key[single], side='right')
+            for i, lo, hi in zip(single.tolist(), low.tolist(), high.tolist()):
+                rows = stacks[lo:hi]
+                time = t[i]
+                running = rows[(begin[rows] <= time) & (finish[rows] > time)]
+                if running.size:
+                    remaining = finish[running] - time
+                    finish[running[np.argmin(np.abs(remaining - records['duration'][i]))]] = time
+        
+        # Coverage of duration boons from the last frontier up to the latest record
+        frontier = max(self.frontier, int(t.max()))
+        covered_begin = np.maximum(begin, self.frontier)
+        covered_finish = np.minimum(finish, frontier)
+        inside = ~intensity & (covered_finish > covered_begin)
+        self.covered += _union_length(app_key[inside], covered_begin[inside], covered_finish[inside],
+                                      self.covered.size)
+        self.frontier = frontier
+        
+        done = finish <= frontier
+        self._add_finished(src[done], app_key[done], finish[done] - begin[done])
+        
+        # Still running: every intensity stack, and one interval per duration queue
+        stacks = np.flatnonzero(~done & intensity)
+        queues = np.flatnonzero(~done & ~intensity)
+        queue_keys = (src[queues].astype(np.int64) + 1) * self.covered.size + app_key[queues]
+        _, first, queue = np.unique(queue_keys, return_index=True, return_inverse=True)
+        queue_begin = np.full(first.size, np.iinfo(np.int64).max, dtype=np.int64)
+        queue_finish = np.zeros(first.size, dtype=np.int64)
+        np.minimum.at(queue_begin, queue, begin[queues])
+        np.maximum.at(queue_finish, queue, finish[queues])
+        
+        pending = np.empty(stacks.size + first.size, dtype=PENDING_BOON_DTYPE)
+        pending['src'] = np.concatenate((src[stacks], src[queues[first]]))
+        pending['key'] = np.concatenate((app_key[stacks], app_key[queues[first]]))
+        pending['begin'] = np.concatenate((begin[stacks], queue_begin))
+        pending['finish'] = np.concatenate((finish[stacks], queue_finish))
+        self.pending = pending
+
+
+def compute_boon_stats(records: np.ndarray, n_players: int, start: int,
+                       end: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Uptime and generated time per boon from a whole fight's apply/remove records
+    (see BoonTracker.finalize for the arrays returned).
+    """
+    tracker = BoonTracker(n_players, start)
+    tracker.consume(records)
+    return tracker.finalize(start, end)
+
+
+def boon_generation(generated: np.ndarray, subgroups: np.ndarray, allies: np.ndarray,
+                    start: int, end: int) -> np.ndarray:
+    """
+    Outgoing generation per (player, boon), like dps.report group generation:
+    boon time given to the other members of the player's subgroup, averaged over
+    them and the fight (% for duration boons, stacks for intensity boons).
+    Players without a subgroup are measured against every other ally.
+    """
+    n_players = generated.shape[0]
+    fight = max(end - start, 1)
+    same_group = (subgroups[:, None] == subgroups[None, :]) & (subgroups[:, None] > 0)
+    # Subgroups only exist in the recording squad, so their members are allies by definition
+    targets = np.where((subgroups > 0)[:, None], same_group, allies[None, :])
+    targets[np.arange(n_players), np.arange(n_players)] = False
+    
+    counts = targets.sum(axis=1)
+    given = np.einsum('stb,st->sb', generated, targets.astype(np.int64))
+    scale = np.where(BOON_IS_INTENSITY, 1.0, 100.0)
+    return np.where(counts[:, None] > 0, given / (np.maximum(counts, 1)[:, None] * fight) * scale, 0.0)
+
+
+def named_boon_stats(values: Dict[int, float]) -> Dict[str, float]:
+    """{boon_id: value} -> {'quickness': value, ...} (dps.report-style keys)"""
+    return {BOON_IDS[boon_id].lower(): value for boon_id, value in values.items() if boon_id in BOON_IDS}
+
+
+# =============================================================================
+# SIDE CLASSIFICATION (damage graph)
+# =============================================================================
+
+SIDE_ALLY = 1
+SIDE_ENEMY = -1
+
+
+def classify_sides(damage: np.ndarray, seeds: np.ndarray,
+                   max_iterations: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split players into two sides from a player x player damage adjacency.
+    
+    Damage links opponents, so a player belongs on the other side from whoever
+    they hit or were hit by. Seeds come from team and squad data and stay fixed;
+    every other player repeatedly takes the opposite of the hit-weighted average
+    side of their neighbours, which two-colours each part of the graph reachable
+    from a seed in a handful of matrix products.
+    
+    Args:
+        damage: (P, P) damage hits from row player to column player
+        seeds: (P,) SIDE_ALLY, SIDE_ENEMY or 0 when unknown
+        max_iterations: Cap on propagation rounds
+    
+    Returns:
+        is_enemy: (P,) bool; players with no seed and no path to one are allies
+        confidence: (P,) 0-1; for seeded players how well their damage links
+            agree with the seed (1 without links), for the rest the strength
+            of the propagated side
+    """
+    weights = (damage + damage.T).astype(np.float64)
+    seeds = seeds.astype(np.float64)
+    seeded = seeds != 0
+    side = seeds.copy()
+    
+    for _ in range(max_iterations):
+        evidence = weights @ np.abs(side)
+        propagated = np.divide(-(weights @ side), evidence, out=np.zeros_like(side), where=evidence > 0)
+        updated = np.where(seeded, seeds, propagated)
+        if np.allclose(updated, side):
+            break
+        side = updated
+    
+    is_enemy = side < 0
+    evidence = weights @ np.abs(side)
+    opposed = np.divide(-(weights @ side), evidence, out=np.zeros_like(side), where=evidence > 0)
+    agreement = np.where(evidence > 0, opposed * np.where(is_enemy, -1.0, 1.0), 1.0)
+    confidence = np.where(seeded, (1 + agreement) / 2, np.abs(side))
+    return is_enemy, np.clip(confidence, 0.0, 1.0)
+
+
+# =============================================================================
+# KILL & DOWN ATTRIBUTION (time-windowed joins)
+# =============================================================================
+
+class AttributionTracker:
+    """
+    Kill/down attribution, folded from hit and down/death records chunk by chunk.
+    
+    Hits are kept only while they can still fall inside the window of a later
+    down/death, so about window_ms of hits is held at any time. A down/death is
+    credited once the next chunk is in (hits logged just after it at the same
+    time still count) or at the end, every attacker in its window at once.
+    Credit is summed per (attacker, victim) pair because sides are only known
+    once the whole log has been read.
+    """
+    
+    def __init__(self, n_players: int, window_ms: int = ATTRIBUTION_WINDOW_MS):
+        self.window_ms = window_ms
+        self.latest = 0
+        self.hits = np.empty(0, dtype=HIT_RECORD_DTYPE)
+        self.states = np.empty(0, dtype=STATE_RECORD_DTYPE)  # not credited yet
+        self.down_damage = np.zeros((n_players, n_players), dtype=np.int64)
+        self.kills = np.zeros((n_players, n_players), dtype=np.int64)
+    
+    def consume(self, hits: np.ndarray, states: np.ndarray):
+        """Fold the next HIT_RECORD_DTYPE and STATE_RECORD_DTYPE records (in log order) in"""
+        self.hits = np.concatenate((self.hits, hits))
+        for records in (hits, states):
+            if records.size:
+                self.latest = max(self.latest, int(records['time'].max()))
+        self._credit(self.states)
+        self.states = states
+        
+        # Neither the waiting downs/deaths nor later ones reach further back than this
+        oldest = min(self.latest, int(states['time'].min())) if states.size else self.latest
+        self.hits = self.hits[self.hits['time'] >= oldest - self.window_ms]
+    
+    def finalize(self, is_enemy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Credit per player, hits between players on the same side ignored.
+        
+        Args:
+            is_enemy: (P,) side of every player slot
+        
+        Returns:
+            down_contrib: (P,) damage dealt inside the windows before downs
+            kill_participation: (P,) deaths with at least one hit from the player inside the window
+        """
+        self._credit(self.states)
+        self.states = np.empty(0, dtype=STATE_RECORD_DTYPE)
+        opponents = is_enemy[:, None] != is_enemy[None, :]
+        return (self.down_damage * opponents).sum(axis=1), (self.kills * opponents).sum(axis=1)
+    
+    def _credit(self, states: np.ndarray):
+        """
+        Credit downs/deaths from the hits held.
+        
+        Hits are sorted once by (target, time); each down/death then finds its
+        window [time - window_ms, time] on that target with two searchsorted calls,
+        and the windows are expanded and summed per pair without a Python loop.
+        """
+        hits = self.hits
+        if not hits.size or not states.size:
+            return
+        n_players = self.kills.shape[0]
+        
+        # One sorted key per hit: target block, then time within it
+        hits = hits[np.lexsort((hits['time'], hits['dst']))]
+        base = min(int(hits['time'].min()), int(states['time'].min()) - self.window_ms)
+        span = max(int(hits['time'].max()), int(states['time'].max())) - base + 1
+        keys = hits['dst'].astype(np.int64) * span + (hits['time'] - base)
+        state_keys = states['slot'].astype(np.int64) * span + (states['time'] - base)
+        low = np.searchsorted(keys, state_keys - self.window_ms, side='left')
+        high = np.searchsorted(keys, state_keys, side='right')
+        
+        # Expand the [low, high) windows into hit indices, remembering their state
+        lengths = high - low
+        owner = np.repeat(np.arange(states.size), lengths)
+        idx = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(low, lengths)
+        pair = hits['src'][idx].astype(np.int64) * n_players + states['slot'][owner]
+        dead = states['dead'][owner]
+        
+        n_pairs = n_players * n_players
+        self.down_damage += np.bincount(pair[~dead], weights=hits['damage'][idx][~dead],
+                                        minlength=n_pairs).astype(np.int64).reshape(n_players, n_players)
+        participants = np.unique(owner[dead] * n_pairs + pair[dead])
+        self.kills += np.bincount(participants % n_pairs, minlength=n_pairs).reshape(n_players, n_players)
+
+
+def attribute_downs_and_kills(hits: np.ndarray, states: np.ndarray, is_enemy: np.ndarray,
+                              window_ms: int = ATTRIBUTION_WINDOW_MS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Credit every player who hit an opponent shortly before it went down or died,
+    from a whole fight's records (see AttributionTracker.finalize for the arrays returned).
+    """
+    tracker = AttributionTracker(is_enemy.size, window_ms)
+    tracker.consume(hits, states)
+    return tracker.finalize(is_enemy)
+
+
+# =============================================================================
+# ENGAGEMENT SEGMENTATION (from the per-second timeline)
+# =============================================================================
+
+# Seconds without player damage that separate two engagements
+LULL_SECONDS = 20
+# Shorter bursts of activity (a stray hit, a lone roamer) are not engagements
+MIN_ENGAGEMENT_SECONDS = 10
+# Series whose per-second total measures combat activity
+ACTIVITY_SERIES = ('damage_out', 'damage_in')
+
+
+def segment_engagements(timeline: CombatTimeline, specs: List[str], lull_seconds: int = LULL_SECONDS,
+                        min_seconds: int = MIN_ENGAGEMENT_SECONDS) -> List[Engagement]:
+    """
+    Split a log into engagements at combat lulls.
+    
+    Activity is the total player damage (dealt and taken) per timeline second;
+    a run of at least `lull_seconds` inactive seconds ends an engagement.
+    Per-engagement totals come from one cumulative sum over the timeline,
+    and players count as present when any of their series is non-zero.
+    
+    Args:
+        timeline: Per-second series of the log
+        specs: Elite spec (or profession) per timeline row
+        lull_seconds: Minimum gap between engagements
+        min_seconds: Engagements shorter than this are dropped
+    """
+    values = timeline.values.astype(np.int64)
+    activity = sum(values[TIMELINE_SERIES.index(name)] for name in ACTIVITY_SERIES)
+    active = np.flatnonzero(activity.sum(axis=0) if values.shape[1] else np.zeros(values.shape[2]))
+    if not active.size:
+        return []
+    
+    breaks = np.flatnonzero(np.diff(active) > lull_seconds)
+    starts = active[np.concatenate(([0], breaks + 1))]
+    ends = active[np.concatenate((breaks, [active.size - 1]))] + 1
+    keep = ends - starts >= min_seconds
+    starts, ends = starts[keep], ends[keep]
+    
+    # (series, player, engagement) totals from prefix sums
+    prefix = np.concatenate((np.zeros(values.shape[:2] + (1,), dtype=np.int64), values.cumsum(axis=2)), axis=2)
+    totals = prefix[:, :, ends] - prefix[:, :, starts]
+    present = totals.any(axis=0)
+    
+    engagements = []
+    for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        slots = np.flatnonzero(present[:, i])
+        engagements.append(Engagement(
+            start_second=start,
+            end_second=end,
+            start_time=timeline.start_time + start * TIMELINE_BUCKET_MS,
+            slots=slots,
+            players=[timeline.players[slot] for slot in slots.tolist()],
+            specs=[specs[slot] for slot in slots.tolist()],
+            is_enemy=timeline.is_enemy[slots],
+            totals=totals[:, slots, i],
+        ))
+    return engagements
+
+
+# =============================================================================
+# EVTC PARSER
+# =============================================================================
+
+# Peek mode: state changes read for teams/POV/map, and a hard cap on events scanned
+PEEK_STATECHANGES = 256
+PEEK_MAX_EVENTS = 4096
+PEEK_BLOCK_EVENTS = 256
+
+# Intra-file parallelism: only event blocks at least this large are split across processes
+PARALLEL_MIN_EVENTS = 1_000_000
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (its affinity mask where the OS has one)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _aggregate_shared_range(task: Tuple[str, int, int, int, List[EVTCAgent], ParseProfile, Optional[int], int]
+                            ) -> EventAggregator:
+    """Worker: aggregate one event range of a shared-memory event block"""
+    name, revision, start, stop, agents, profile, timeline_origin, chunk_size = task
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        aggregator = EventAggregator(agents, start_index=start // EVENT_SIZE, profile=profile,
+                                     timeline_origin=timeline_origin, deferred=True)
+        chunk_bytes = chunk_size * EVENT_SIZE
+        for offset in range(start, stop, chunk_bytes):
+            aggregator.consume(decode_event_block(block.buf[offset:min(offset + chunk_bytes, stop)], revision))
+        return aggregator
+    finally:
+        block.close()
+
+
+class ZlibStreamReader(io.RawIOBase):
+    """
+    Read-only file object that inflates zlib data on demand.
+    Lets the header, agent, skill and event decoders run while the archive
+    is still being decompressed, without ever holding the whole inflated log.
+    """
+    
+    def __init__(self, data, step: int = 1 << 16):
+        self._source = memoryview(data)
+        self._pos = 0
+        self._step = step
+        self._inflater = zlib.decompressobj()
+        self._pending = bytearray()
+        self._eof = False
+        # Inflate the first block now so invalid data fails fast with zlib.error
+        self._fill(1)
+    
+    def readable(self) -> bool:
+        return True
+    
+    def _fill(self, size: int):
+        """Inflate until at least size bytes are pending (or the input is exhausted)"""
+        while not self._eof and (size < 0 or len(self._pending) < size):
+            chunk = self._source[self._pos:self._pos + self._step]
+            self._pos += len(chunk)
+            if chunk:
+                self._pending += self._inflater.decompress(chunk)
+            else:
+                self._pending += self._inflater.flush()
+                self._eof = True
+    
+    def close(self):
+        # Release the source view so an underlying mmap can be closed
+        if not self.closed:
+            self._source.release()
+        super().close()
+    
+    def read(self, size: int = -1) -> bytes:
+        self._fill(size)
+        if size < 0 or size >= len(self._pending):
+            data = bytes(self._pending)
+            self._pending.clear()
+            return data
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+
+class EVTCParser:
+    """
+    Real EVTC binary parser
+    Extracts exact player builds from arcdps logs
+    """
+    
+    DECODE_MODES = ("numpy", "stream", "struct")
+    
+    def __init__(self, decode_mode: str = "numpy", chunk_size: int = DEFAULT_CHUNK_EVENTS,
+                 profile: str = "full", workers: Optional[int] = 1, attribution_window_ms: int = ATTRIBUTION_WINDOW_MS,
+                 position_resolution_ms: Optional[int] = None):
+        """
+        Args:
+            decode_mode: "numpy" decodes the event block into a structured array
+                in one call and aggregates on columns; "stream" does the same in
+                fixed-size chunks without keeping the event block in memory;
+                "struct" is the reference decoder that builds one CombatEvent per record
+            chunk_size: Number of events per chunk in "stream" mode
+            profile: Name in PARSE_PROFILES. Cheaper profiles drop event classes
+                right after decoding and skip the outputs they don't need;
+                the "struct" decoder always does a full parse
+            workers: Processes aggregating one log (None: one per available CPU),
+                capped at available_cpus(). Event blocks of at least
+                PARALLEL_MIN_EVENTS events are split into equal ranges in shared
+                memory and the partial aggregates merged; "struct" ignores it.
+                Off by default: with one CPU it only adds the copy to shared
+                memory, so check scripts/benchmark_parallel_parse.py on the
+                target machine before turning it on
+            attribution_window_ms: Damage this long before a down/death is
+                credited to it (down_contrib, kill_participation)
+            position_resolution_ms: Collect player position/velocity events into
+                ParsedLog.movement at this resolution; None skips them.
+                "struct" ignores it
+        """
+        if decode_mode not in self.DECODE_MODES:
+            raise ValueError(f"Unknown decode mode: {decode_mode}")
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+        if profile not in PARSE_PROFILES:
+            raise ValueError(f"Unknown parse profile: {profile}")
+        if workers is not None and workers <= 0:
+            raise ValueError(f"workers must be positive, got {workers}")
+        if attribution_window_ms < 0:
+            raise ValueError(f"attribution_window_ms can't be negative, got {attribution_window_ms}")
+        if position_resolution_ms is not None and position_resolution_ms <= 0:
+            raise ValueError(f"position_resolution_ms must be positive, got {position_resolution_ms}")
+        
+        self.decode_mode = decode_mode
+        self.chunk_size = chunk_size
+        self.profile = PARSE_PROFILES[profile]
+        if position_resolution_ms is not None:
+            self.profile = replace(self.profile, positions_ms=position_resolution_ms)
+        self.workers = workers
+        self.attribution_window_ms = attribution_window_ms
+        self.agents: Dict[int, EVTCAgent] = {}
+        self.agent_index: Optional[AgentIndex] = None  # address and (instid, time) joins
+        self.skills: Dict[int, EVTCSkill] = {}
+        self.events: List[CombatEvent] = []
+        self.event_array: Optional[np.ndarray] = None
+        self.header: Optional[EVTCHeader] = None
+        
+        # Reusable decompression buffer for archive members
+        self._buffer = bytearray()
+    
+    def parse_file(self, filepath: str) -> ParsedLog:
+        """Parse an EVTC file (supports .evtc, .zevtc, .zip)"""
+        path = Path(filepath)
+        
+        if path.suffix.lower() in ['.zip', '.zevtc'] and zipfile.is_zipfile(filepath):
+            return self._parse_zip(filepath)
+        else:
+            return self._parse_mapped(filepath)
+    
+    def parse_bytes(self, data: bytes, filename: str = "") -> ParsedLog:
+        """Parse EVTC from bytes"""
+        if filename.lower().endswith('.zip'):
+            return self._parse_zip_bytes(data)
+        elif filename.lower().endswith('.zevtc'):
+            # .zevtc files are zlib compressed, not zip
+            return self._parse_zevtc_bytes(data)
+        else:
+            # Check if data starts with EVTC header or is compressed
+            if data[:4] == b'EVTC':
+                return self._parse_buffer(data)
+            else:
+                # Try zlib decompression
+                try:
+                    return self._parse_zlib(data)
+                except:
+                    return self._parse_buffer(data)
+    
+    def peek_file(self, filepath: str, max_statechanges: int = PEEK_STATECHANGES) -> LogRoster:
+        """
+        Read only the header, agent/skill tables and the leading state changes
+        of a log file. Compressed logs are inflated just far enough to reach them.
+        """
+        if Path(filepath).suffix.lower() in ['.zip', '.zevtc'] and zipfile.is_zipfile(filepath):
+            with zipfile.ZipFile(filepath, 'r') as zf:
+                with zf.open(self._pick_archive_member(zf)) as f:
+                    return self._peek_stream(f, max_statechanges)
+        
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"Empty EVTC file: {filepath}")
+            
+            if f.read(4) == b'EVTC':
+                f.seek(0)
+                return self._peek_stream(f, max_statechanges)
+            
+            # zlib-compressed .zevtc
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with ZlibStreamReader(mapped) as reader:
+                    return self._peek_stream(reader, max_statechanges)
+    
+    def peek_bytes(self, data: bytes, filename: str = "",
+                   max_statechanges: int = PEEK_STATECHANGES) -> LogRoster:
+        """Peek counterpart of parse_bytes (raw, zlib or zipped EVTC)"""
+        if data[:2] == b'PK':
+            with zipfile.ZipFile(io.BytesIO(data), 'r') as zf:
+                with zf.open(self._pick_archive_member(zf)) as f:
+                    return self._peek_stream(f, max_statechanges)
+        
+        if data[:4] == b'EVTC':
+            return self._peek_stream(io.BytesIO(data), max_statechanges)
+        
+        try:
+            reader = ZlibStreamReader(data)
+        except zlib.error:
+            raise ValueError(f"Unable to peek {filename or 'log'}. Unknown format (starts with: {data[:4]})")
+        with reader:
+            return self._peek_stream(reader, max_statechanges)
+    
+    def _peek_stream(self, stream: BinaryIO, max_statechanges: int) -> LogRoster:
+        """Build a LogRoster from the tables and at most max_statechanges leading state changes"""
+        self._parse_tables(stream)
+        self._pov_agent = None
+        self._map_id = 0
+        
+        # arcdps writes team/POV/map state changes at the start of the event block
+        read = 0
+        scanned = 0
+        while read < max_statechanges and scanned < PEEK_MAX_EVENTS:
+            block = stream.read(PEEK_BLOCK_EVENTS * EVENT_SIZE)
+            usable = len(block) - len(block) % EVENT_SIZE
+            if not usable:
+                break
+            
+            events = decode_event_block(block[:usable], self.header.revision)
+            scanned += events.size
+            states = events[events['is_statechange'] != 0][:max_statechanges - read]
+            read += states.size
+            
+            for kind, src, dst in zip(states['is_statechange'].tolist(),
+                                      states['src_agent'].tolist(),
+                                      states['dst_agent'].tolist()):
+                if kind == StateChange.POINT_OF_VIEW:
+                    self._pov_agent = src
+                elif kind == StateChange.MAP_ID:
+                    self._map_id = src
+                elif kind == StateChange.TEAM_CHANGE and src in self.agents:
+                    self.agents[src].team_id = dst
+            
+            if usable < PEEK_BLOCK_EVENTS * EVENT_SIZE:
+                break
+        
+        _, allied_agents = self._resolve_allies()
+        
+        players = []
+        for agent in self.agents.values():
+            if not agent.is_player:
+                continue
+            players.append(RosterEntry(
+                character_name=agent.character_name or agent.name,
+                account_name=agent.account_name or "",
+                profession=agent.profession_name,
+                elite_spec=agent.elite_spec_name,
+                subgroup=agent.subgroup,
+                team_id=agent.team_id,
+                is_ally=agent.address in allied_agents,
+                is_pov=agent.address == self._pov_agent,
+            ))
+        
+        pov_name = None
+        if self._pov_agent and self._pov_agent in self.agents:
+            pov_name = self.agents[self._pov_agent].character_name
+        
+        return LogRoster(
+            header=self.header,
+            players=players,
+            skill_count=len(self.skills),
+            map_id=self._map_id,
+            pov_player=pov_name,
+            statechanges_read=read,
+        )
+    
+    def _parse_mapped(self, filepath: str) -> ParsedLog:
+        """Parse an on-disk file through a read-only memory map (no intermediate copies)"""
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"Empty EVTC file: {filepath}")
+            
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                try:
+                    if mapped[:4] == b'EVTC':
+                        return self._parse_buffer(mapped)
+                    # Not raw EVTC: zlib-compressed .zevtc
+                    return self._parse_zevtc_bytes(mapped)
+                finally:
+                    # Columns are views on the mapping, drop them before it closes
+                    self.event_array = None
+    
+    def _pick_archive_member(self, zf: zipfile.ZipFile) -> str:
+        """Get the first .evtc file in the archive"""
+        names = zf.namelist()
+        for name in names:
+            if name.endswith('.evtc') or not name.endswith('.zip'):
+                return name
+        
+        # Fallback: try first file
+        if names:
+            return names[0]
+        
+        raise ValueError("No EVTC file found in archive")
+    
+    def _parse_archive_member(self, zf: zipfile.ZipFile, name: str) -> ParsedLog:
+        """Decompress an archive member once into the reusable buffer and parse it in place"""
+        size = zf.getinfo(name).file_size
+        if len(self._buffer) < size:
+            self._buffer = bytearray(size)
+        
+        view = memoryview(self._buffer)[:size]
+        filled = 0
+        with zf.open(name) as f:
+            while filled < size:
+                read = f.readinto(view[filled:filled + ARCHIVE_READ_SIZE])
+                if not read:
+                    break
+                filled += read
+        
+        try:
+            return self._parse_buffer(view[:filled])
+        finally:
+            # The buffer is reused by the next archive, don't leave columns pointing into it
+            self.event_array = None
+            view.release()
+    
+    def _parse_zip(self, filepath: str) -> ParsedLog:
+        """Parse a zipped EVTC file"""
+        with zipfile.ZipFile(filepath, 'r') as zf:
+            return self._parse_zip_member(zf)
+    
+    def _parse_zip_bytes(self, data: bytes) -> ParsedLog:
+        """Parse a zipped EVTC from bytes"""
+        with zipfile.ZipFile(io.BytesIO(data), 'r') as zf:
+            return self._parse_zip_member(zf)
+    
+    def _parse_zip_member(self, zf: zipfile.ZipFile) -> ParsedLog:
+        """Parse the EVTC member of an open archive"""
+        name = self._pick_archive_member(zf)
+        
+        if self.decode_mode == "stream":
+            # Decompress as we parse, straight from the archive stream
+            with zf.open(name) as f:
+                return self._parse_stream(f)
+        
+        return self._parse_archive_member(zf, name)
+    
+    def _parse_zlib(self, data) -> ParsedLog:
+        """Parse zlib-compressed EVTC, inflating incrementally in stream mode"""
+        if self.decode_mode == "stream":
+            return self._parse_stream(ZlibStreamReader(data))
+        
+        return self._parse_buffer(zlib.decompress(data))
+    
+    def _parse_zevtc_bytes(self, data: bytes) -> ParsedLog:
+        """Parse a .zevtc file (zlib compressed EVTC or ZIP)"""
+        # Check for ZIP signature (PK)
+        if data[:2] == b'PK':
+            return self._parse_zip_bytes(data)
+        
+        # Check for raw EVTC
+        if data[:4] == b'EVTC':
+            return self._parse_buffer(data)
+        
+        # Try zlib decompression
+        try:
+            return self._parse_zlib(data)
+        except zlib.error:
+            pass
+        
+        # Last resort: try as raw stream
+        raise ValueError(f"Unable to parse .zevtc file. Unknown format (starts with: {data[:4]})")
+    
+    def _reset_state(self):
+        """Clear everything left over from a previous parse"""
+        self.agents = {}
+        self.agent_index = None
+        self.skills = {}
+        self.events = []
+        self.event_array = None
+    
+    def _parse_buffer(self, buffer) -> ParsedLog:
+        """
+        Parse EVTC from an in-memory buffer (bytes, bytearray, mmap, memoryview).
+        Agents, skills and events are decoded straight from the buffer; in numpy
+        mode the event columns are a view on it.
+        """
+        if self.decode_mode == "struct":
+            return self._parse_stream(io.BytesIO(buffer))
+        
+        view = memoryview(buffer)
+        self._reset_state()
+        
+        # Parse header (15 bytes, plus one padding byte from revision 1)
+        self.header = self._parse_header(io.BytesIO(view[:16]))
+        offset = 16 if self.header.revision >= 1 else 15
+        
+        # Parse agents
+        agent_count = struct.unpack_from('<I', view, offset)[0]
+        offset += 4
+        for _ in range(agent_count):
+            agent = self._agent_from_record(view[offset:offset + AGENT_SIZE])
+            self.agents[agent.address] = agent
+            offset += AGENT_SIZE
+        
+        # Parse skills
+        skill_count = struct.unpack_from('<I', view, offset)[0]
+        offset += 4
+        for _ in range(skill_count):
+            skill = self._skill_from_record(view[offset:offset + SKILL_SIZE])
+            self.skills[skill.id] = skill
+            offset += SKILL_SIZE
+        
+        # Parse combat events
+        aggregator = self._aggregate_event_view(view[offset:])
+        self._apply_aggregate(aggregator)
+        return self._build_result_from_aggregate(aggregator)
+    
+    def _parse_stream(self, stream: BinaryIO) -> ParsedLog:
+        """Parse EVTC from a binary stream"""
+        self._parse_tables(stream)
+        
+        if self.decode_mode in ("numpy", "stream"):
+            aggregator = self._read_event_columns(stream)
+            self._apply_aggregate(aggregator)
+            return self._build_result_from_aggregate(aggregator)
+        
+        # Parse combat events
+        while True:
+            event = self._parse_event(stream)
+            if event is None:
+                break
+            self.events.append(event)
+        
+        # Process events to build agent data
+        self._process_events()
+        
+        # Build parsed result
+        return self._build_result()
+    
+    def _parse_tables(self, stream: BinaryIO):
+        """Read the header, agent table and skill table (everything before the events)"""
+        self._reset_state()
+        
+        # Parse header
+        self.header = self._parse_header(stream)
+        
+        # Parse agents
+        agent_count = struct.unpack('<I', stream.read(4))[0]
+        for _ in range(agent_count):
+            agent = self._parse_agent(stream)
+            self.agents[agent.address] = agent
+        
+        # Parse skills
+        skill_count = struct.unpack('<I', stream.read(4))[0]
+        for _ in range(skill_count):
+            skill = self._parse_skill(stream)
+            self.skills[skill.id] = skill
+    
+    def _parse_header(self, stream: BinaryIO) -> EVTCHeader:
+        """Parse EVTC header"""
+        magic = stream.read(4).decode('ascii', errors='ignore')
+        
+        if magic != 'EVTC':
+            raise ValueError(f"Invalid EVTC magic: {magic}")
+        
+        arcdps_build = stream.read(8).decode('ascii', errors='ignore').rstrip('\x00')
+        revision = struct.unpack('<B', stream.read(1))[0]
+        
+        # Boss ID is always 2 bytes (uint16)
+        boss_id = struct.unpack('<H', stream.read(2))[0]
+        
+        # Skip padding byte for alignment (revision 1+)
+        if revision >= 1:
             stream.read(1)
         
         is_wvw = boss_id == 1
@@ -640,12 +2502,14 @@ class EVTCParser:
     
     def _parse_agent(self, stream: BinaryIO) -> EVTCAgent:
         """Parse an agent entry"""
-        data = stream.read(96)
-        
+        return self._agent_from_record(stream.read(AGENT_SIZE))
+    
+    def _agent_from_record(self, data) -> EVTCAgent:
+        """Build an agent from its 96-byte record (bytes or memoryview)"""
         address, prof, is_elite = struct.unpack('<QII', data[0:16])
         toughness, concentration, healing = struct.unpack('<hhh', data[16:22])
         hitbox_width, condition, hitbox_height = struct.unpack('<HhH', data[22:28])
-        name_bytes = data[28:92]
+        name_bytes = bytes(data[28:92])
         
         # Parse name - for players it's "character\x00account\x00subgroup\x00"
         name = name_bytes.decode('utf-8', errors='ignore').rstrip('\x00')
@@ -680,46 +2544,40 @@ class EVTCParser:
     
     def _parse_skill(self, stream: BinaryIO) -> EVTCSkill:
         """Parse a skill entry"""
-        skill_id = struct.unpack('<I', stream.read(4))[0]
-        name = stream.read(64).decode('utf-8', errors='ignore').rstrip('\x00')
+        return self._skill_from_record(stream.read(SKILL_SIZE))
+    
+    def _skill_from_record(self, data) -> EVTCSkill:
+        """Build a skill from its 68-byte record (bytes or memoryview)"""
+        skill_id = struct.unpack('<I', data[0:4])[0]
+        name = bytes(data[4:68]).decode('utf-8', errors='ignore').rstrip('\x00')
         
         return EVTCSkill(id=skill_id, name=name)
     
     def _parse_event(self, stream: BinaryIO) -> Optional[CombatEvent]:
         """Parse a combat event"""
+        data = stream.read(EVENT_SIZE)
+        if len(data) < EVENT_SIZE:
+            return None
+        
         if self.header.revision >= 1:
-            # Revision 1 format - 64 bytes
-            data = stream.read(64)
-            if len(data) < 64:
-                return None
-            
-            (time, src_agent, dst_agent, value, buff_dmg, overstack_value,
-             skill_id, src_instid, dst_instid, src_master_instid, dst_master_instid,
-             iff, buff, result, is_activation, is_buffremove, is_ninety, is_fifty,
-             is_moving, is_statechange, is_flanking, is_shields, is_offcycle,
-             pad61, pad62, pad63, pad64) = struct.unpack(
-                '<QQQiiIIHHHHBBBBBBBBBBBBBBBB', data
-            )
-        else:
-            # Revision 0 format - 64 bytes but different structure
-            data = stream.read(64)
-            if len(data) < 64:
-                return None
-            
-            # Simplified parsing for old format
-            (time, src_agent, dst_agent, value, buff_dmg, overstack_value,
-             skill_id, src_instid, dst_instid, src_master_instid) = struct.unpack(
-                '<QQQiiHHHHH', data[0:46]
-            )
-            
-            # Rest of the fields
-            rest = struct.unpack('<14B', data[46:60])
-            iff, buff, result = rest[9], rest[10], rest[11]
-            is_activation, is_buffremove = rest[12], rest[13]
-            is_ninety, is_fifty, is_moving = 0, 0, 0
-            is_statechange, is_flanking, is_shields, is_offcycle = 0, 0, 0, 0
-            dst_master_instid = 0
-            pad61, pad62, pad63, pad64 = 0, 0, 0, 0
+            # Revision 1 format - fields in declaration order
+            return CombatEvent(*EVENT_STRUCT_REV1.unpack(data))
+        
+        # Revision 0 format - 64 bytes but different structure
+        # Simplified parsing for old format
+        (time, src_agent, dst_agent, value, buff_dmg, overstack_value,
+         skill_id, src_instid, dst_instid, src_master_instid) = struct.unpack(
+            '<QQQiiHHHHH', data[0:46]
+        )
+        
+        # Rest of the fields
+        rest = struct.unpack('<14B', data[46:60])
+        iff, buff, result = rest[9], rest[10], rest[11]
+        is_activation, is_buffremove = rest[12], rest[13]
+        is_ninety, is_fifty, is_moving = 0, 0, 0
+        is_statechange, is_flanking, is_shields, is_offcycle = 0, 0, 0, 0
+        dst_master_instid = 0
+        pad61, pad62, pad63, pad64 = 0, 0, 0, 0
         
         return CombatEvent(
             time=time,
@@ -762,12 +2620,19 @@ class EVTCParser:
                 agent = self.agents[event.src_agent]
                 if agent.instance_id == 0:
                     agent.instance_id = event.src_instid
-                    self.agents_by_instid[event.src_instid] = agent
                 
                 if agent.first_aware == 0:
                     agent.first_aware = event.time
                 agent.last_aware = event.time
         
+        agents = list(self.agents.values())
+        self.agent_index = AgentIndex(agents)
+        self.agent_index.set_awareness(
+            np.array([a.instance_id for a in agents], dtype=np.uint16),
+            np.array([a.first_aware for a in agents], dtype=np.uint64),
+            np.array([a.last_aware for a in agents], dtype=np.uint64),
+        )
+        
         # Second pass: process state changes
         pov_agent = None
         map_id = 0
@@ -794,7 +2659,7 @@ class EVTCParser:
         # If no end time from SQUAD_COMBAT_END, use the last event time
         if end_time == 0 and self.events:
             end_time = max(event.time for event in self.events)
-            
+        
         # If still no valid times, try to estimate from combat events
         if end_time == 0 and self.events:
             combat_times = [e.time for e in self.events if e.is_statechange == 0]  # Only combat events
@@ -808,13 +2673,151 @@ class EVTCParser:
         self._start_time = start_time if start_time > 0 else 0
         self._end_time = end_time if end_time > start_time else start_time + 30000  # Fallback: 30s
     
-    def _build_result(self) -> ParsedLog:
-        """Build the final parsed result"""
-        players = []
-        enemies = []
+    def _parallel_workers(self) -> int:
+        """Processes to split one event block across (1: aggregate in this process)"""
+        cpus = available_cpus()
+        return min(self.workers or cpus, cpus)
+    
+    def _read_event_columns(self, stream: BinaryIO) -> EventAggregator:
+        """Decode the event block into columns and aggregate it"""
+        if self._parallel_workers() > 1:
+            # Splitting across processes needs the whole block in memory, but only
+            # blocks past the threshold are read to the end before aggregating
+            threshold = PARALLEL_MIN_EVENTS * EVENT_SIZE
+            block = bytearray(stream.read(threshold))
+            if len(block) >= threshold:
+                while True:
+                    data = stream.read(self.chunk_size * EVENT_SIZE)
+                    if not data:
+                        break
+                    block += data
+            return self._aggregate_event_view(memoryview(block))
+        
+        aggregator = EventAggregator(list(self.agents.values()), profile=self.profile,
+                                     attribution_window_ms=self.attribution_window_ms)
+        revision = self.header.revision
+        
+        if self.decode_mode == "numpy":
+            # Decode the whole event block in one call
+            self.event_array = decode_event_block(stream.read(), revision)
+            aggregator.consume(self.event_array)
+            return aggregator
+        
+        # Streaming: fixed-size chunks, nothing kept once aggregated
+        chunk_bytes = self.chunk_size * EVENT_SIZE
+        pending = b''
+        while True:
+            data = stream.read(chunk_bytes)
+            if not data:
+                break
+            if pending:
+                data = pending + data
+            usable = len(data) - len(data) % EVENT_SIZE
+            pending = data[usable:]
+            if usable:
+                aggregator.consume(decode_event_block(memoryview(data)[:usable], revision))
+        
+        return aggregator
+    
+    def _aggregate_event_view(self, view: memoryview) -> EventAggregator:
+        """Aggregate an in-memory event block, decoding straight from the buffer"""
+        revision = self.header.revision
+        usable = len(view) - len(view) % EVENT_SIZE
+        workers = self._parallel_workers()
+        if workers > 1 and usable // EVENT_SIZE >= PARALLEL_MIN_EVENTS:
+            return self._aggregate_parallel(view[:usable], workers)
+        
+        aggregator = EventAggregator(list(self.agents.values()), profile=self.profile,
+                                     attribution_window_ms=self.attribution_window_ms)
+        
+        if self.decode_mode == "numpy":
+            self.event_array = decode_event_block(view[:usable], revision)
+            aggregator.consume(self.event_array)
+            return aggregator
+        
+        chunk_bytes = self.chunk_size * EVENT_SIZE
+        for start in range(0, usable, chunk_bytes):
+            aggregator.consume(decode_event_block(view[start:min(start + chunk_bytes, usable)], revision))
+        
+        return aggregator
+    
+    def _aggregate_parallel(self, view: memoryview, workers: int) -> EventAggregator:
+        """
+        Aggregate an event block across processes: the block is copied once into
+        shared memory, split into equal record-aligned ranges, and the partial
+        aggregates are merged back in log order.
+        """
+        agents = list(self.agents.values())
+        revision = self.header.revision
+        dtype = EVENT_DTYPE_REV1 if revision >= 1 else EVENT_DTYPE_REV0
+        
+        # Every range bins its timeline from the same origin
+        origin = EventAggregator.find_timeline_origin(np.frombuffer(view, dtype=dtype))
+        aggregator = EventAggregator(agents, profile=self.profile, timeline_origin=origin,
+                                     attribution_window_ms=self.attribution_window_ms)
+        
+        n_events = len(view) // EVENT_SIZE
+        bounds = np.linspace(0, n_events, workers + 1).astype(np.int64) * EVENT_SIZE
+        block = shared_memory.SharedMemory(create=True, size=len(view))
+        try:
+            block.buf[:len(view)] = view
+            tasks = [
+                (block.name, revision, int(start), int(stop), agents, self.profile, origin, self.chunk_size)
+                for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+            ]
+            with ProcessPoolExecutor(max_workers=len(tasks)) as executor:
+                for part in executor.map(_aggregate_shared_range, tasks):
+                    aggregator.merge(part)
+        finally:
+            block.close()
+            block.unlink()
+        
+        return aggregator
+    
+    def _apply_aggregate(self, aggregator: EventAggregator):
+        """Columnar counterpart of _process_events: agent metadata and fight timing"""
+        # First pass results: instance IDs and awareness, in order of first appearance
+        seen = np.flatnonzero(aggregator.first_index >= 0)
+        for row in seen[np.argsort(aggregator.first_index[seen], kind='stable')]:
+            agent = aggregator.agents[row]
+            agent.instance_id = int(aggregator.first_instid[row])
+            agent.first_aware = int(aggregator.first_time[row])
+            agent.last_aware = int(aggregator.last_time[row])
+        self.agent_index = aggregator.index
+        self.agent_index.set_awareness(aggregator.first_instid, aggregator.first_time, aggregator.last_time)
+        
+        # Second pass results: state changes
+        for row in np.flatnonzero(aggregator.team_index >= 0):
+            aggregator.agents[row].team_id = int(aggregator.team_id[row])
+        
+        statechanges = aggregator.statechanges
+        pov = statechanges.get(StateChange.POINT_OF_VIEW)
+        map_change = statechanges.get(StateChange.MAP_ID)
+        start = statechanges.get(StateChange.SQUAD_COMBAT_START)
+        end = statechanges.get(StateChange.SQUAD_COMBAT_END)
+        
+        pov_agent = pov[1] if pov else None
+        map_id = map_change[1] if map_change else 0
+        start_time = start[2] if start else 0
+        end_time = end[2] if end else 0
         
-        # Get POV team and allied agents (same subgroup structure)
-        pov_agent = None
+        # If no end time from SQUAD_COMBAT_END, use the last event time
+        if end_time == 0:
+            end_time = aggregator.max_time
+        
+        # If still no valid times, try to estimate from combat events
+        if end_time == 0 and aggregator.combat_max_time is not None:
+            start_time = aggregator.combat_min_time
+            end_time = aggregator.combat_max_time
+        
+        # Store metadata
+        self._pov_agent = pov_agent
+        self._map_id = map_id
+        self._start_time = start_time if start_time > 0 else 0
+        self._end_time = end_time if end_time > start_time else start_time + 30000  # Fallback: 30s
+    
+    def _resolve_allies(self) -> Tuple[int, set]:
+        """Pick the POV agent and collect allied agent addresses"""
         pov_team = 0
         allied_agents = set()
         
@@ -845,124 +2848,42 @@ class EVTCParser:
                     elif pov_team > 0 and agent.team_id == pov_team:
                         allied_agents.add(agent.address)
         
-        # For WvW: detect enemies by analyzing damage events
-        # Enemies are players who RECEIVED damage from allied agents
-        enemy_agents = set()
-        
-        # Index damage events by agent address for O(1) lookups
-        damage_given = {}  # agent -> set of targets damaged
-        damage_received = {}  # agent -> set of sources that damaged them
-        
-        # Single pass through all events
-        for event in self.events:
-            if event.is_statechange or event.value <= 0:
-                continue
-                
-            # Only consider damage events
-            if event.src_agent in self.agents and event.dst_agent in self.agents:
-                src = self.agents[event.src_agent]
-                dst = self.agents[event.dst_agent]
-                
-                # Only player vs player combat
-                if src.is_player and dst.is_player:
-                    # Index who damaged whom
-                    if src.address not in damage_given:
-                        damage_given[src.address] = set()
-                    damage_given[src.address].add(dst.address)
-                    
-                    if dst.address not in damage_received:
-                        damage_received[dst.address] = set()
-                    damage_received[dst.address].add(src.address)
-        
-        # Identify enemies based on indexed damage patterns
-        if allied_agents:
-            # Any player damaged by allies is an enemy
-            for ally in allied_agents:
-                if ally in damage_given:
-                    enemy_agents.update(damage_given[ally])
-                # Any player who damaged an ally is also an enemy
-                if ally in damage_received:
-                    enemy_agents.update(damage_received[ally])
-                # Early termination if we have enough enemies
-                if len(enemy_agents) > 50:
-                    break
-        elif self._pov_agent:
-            # Use POV agent as sole ally
-            if self._pov_agent in damage_given:
-                enemy_agents.update(damage_given[self._pov_agent])
-            if self._pov_agent in damage_received:
-                enemy_agents.update(damage_received[self._pov_agent])
-        
-        # Fallback 1: if no enemies found, use team-based detection
-        if not enemy_agents and pov_team > 0:
-            for agent in self.agents.values():
-                if agent.is_player and agent.team_id != 0 and agent.team_id != pov_team:
-                    enemy_agents.add(agent.address)
-        
-        # Fallback 2: if still no enemies and allied_agents is empty, 
-        # use POV agent as ally and detect enemies by damage patterns
-        if not enemy_agents and not allied_agents and self._pov_agent:
-            # Add POV agent as the sole ally
-            allied_agents.add(self._pov_agent)
-            
-            # Re-analyze damage events with POV as ally
-            for src, dst, value in damage_events:
-                if src.address == self._pov_agent and dst.address != self._pov_agent:
-                    enemy_agents.add(dst.address)
-                elif dst.address == self._pov_agent and src.address != self._pov_agent:
-                    enemy_agents.add(src.address)
-        
-        # Fallback 3: if still no enemies, treat other players with different team_id
-        if not enemy_agents and pov_team == 0:
-            # When no team info, split players by damage patterns
-            player_agents = [a for a in self.agents.values() if a.is_player]
-            if len(player_agents) > 1:
-                # Use first player as reference
-                ref_agent = player_agents[0]
-                # Check indexed damage events for interactions
-                if ref_agent.address in damage_given:
-                    enemy_agents.update(damage_given[ref_agent.address])
-                if ref_agent.address in damage_received:
-                    enemy_agents.update(damage_received[ref_agent.address])
-        
-        # Process all player agents
-        for agent in self.agents.values():
-            if not agent.is_player:
-                continue
-            
-            # Determine if enemy: either by team_id or by damage analysis
-            is_enemy = False
-            if pov_team != 0 and agent.team_id != pov_team:
-                is_enemy = True
-            elif agent.address in enemy_agents:
-                is_enemy = True
-            
-            # Build parsed player
-            parsed = ParsedPlayer(
-                character_name=agent.character_name or agent.name,
-                account_name=agent.account_name or "",
-                profession=agent.profession_name,
-                elite_spec=agent.elite_spec_name,
-                subgroup=agent.subgroup,
-                team_id=agent.team_id,
-                is_enemy=is_enemy,
-                toughness=agent.toughness,
-                concentration=agent.concentration,
-                healing_power=agent.healing,
-                condition_damage=agent.condition,
-            )
-            
-            # Analyze combat data for this player
-            self._analyze_player_combat(agent, parsed)
-            
-            # Detect role and build
-            self._detect_role_and_build(parsed)
-            
-            if is_enemy:
-                enemies.append(parsed)
-            else:
-                players.append(parsed)
-        
+        return pov_team, allied_agents
+    
+    def _classify_players(self, player_agents: List[EVTCAgent],
+                          damage: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Ally/enemy split of the player agents (slot order): team/squad seeds + damage graph"""
+        pov_team, allied_agents = self._resolve_allies()
+        
+        seeds = np.zeros(len(player_agents), dtype=np.int8)
+        for slot, agent in enumerate(player_agents):
+            if pov_team > 0 and agent.team_id > 0:
+                # Team data decides whenever both sides of the comparison have it
+                seeds[slot] = SIDE_ALLY if agent.team_id == pov_team else SIDE_ENEMY
+            elif agent.address in allied_agents:
+                seeds[slot] = SIDE_ALLY
+        
+        return classify_sides(damage, seeds)
+    
+    def _new_parsed_player(self, agent: EVTCAgent, is_enemy: bool, side_confidence: float) -> ParsedPlayer:
+        """Create the ParsedPlayer shell for a player agent"""
+        return ParsedPlayer(
+            character_name=agent.character_name or agent.name,
+            account_name=agent.account_name or "",
+            profession=agent.profession_name,
+            elite_spec=agent.elite_spec_name,
+            subgroup=agent.subgroup,
+            team_id=agent.team_id,
+            is_enemy=is_enemy,
+            side_confidence=round(side_confidence, 2),
+            toughness=agent.toughness,
+            concentration=agent.concentration,
+            healing_power=agent.healing,
+            condition_damage=agent.condition,
+        )
+    
+    def _finalize_result(self, players: List[ParsedPlayer], enemies: List[ParsedPlayer]) -> ParsedLog:
+        """Assemble the ParsedLog from classified players"""
         # Build skills dict
         skills_dict = {s.id: s.name for s in self.skills.values()}
         
@@ -983,81 +2904,257 @@ class EVTCParser:
             pov_player=pov_name
         )
     
-    def _analyze_player_combat(self, agent: EVTCAgent, parsed: ParsedPlayer):
-        """Analyze combat events for a player"""
+    def _build_result(self) -> ParsedLog:
+        """Build the final parsed result"""
+        players = []
+        enemies = []
+        
+        # Player -> player damage hits, the graph the side classification runs on
+        player_agents = [agent for agent in self.agents.values() if agent.is_player]
+        slot_of = {agent.address: slot for slot, agent in enumerate(player_agents)}
+        damage = np.zeros((len(player_agents), len(player_agents)), dtype=np.int64)
+        for event in self.events:
+            if event.is_statechange or event.is_activation or event.is_shields:
+                continue
+            # Real damage only (boon applications also carry a value)
+            if (event.buff_dmg if event.buff else event.value) <= 0:
+                continue
+            src = slot_of.get(event.src_agent)
+            dst = slot_of.get(event.dst_agent)
+            if src is not None and dst is not None:
+                damage[src, dst] += 1
+        
+        is_enemy, side_confidence = self._classify_players(player_agents, damage)
+        
+        # Build parsed players, then fill all of them in a single pass over the events
+        parsed_by_address = {
+            agent.address: self._new_parsed_player(agent, bool(is_enemy[slot]), float(side_confidence[slot]))
+            for slot, agent in enumerate(player_agents)
+        }
+        self._aggregate_player_combat(parsed_by_address)
+        
+        players_by_slot = list(parsed_by_address.values())
+        self._apply_boon_stats(*compute_boon_stats(
+            self._buff_records_from_events(list(parsed_by_address)), len(players_by_slot),
+            self._start_time, self._end_time,
+        ), players_by_slot)
+        attribution = AttributionTracker(len(players_by_slot), self.attribution_window_ms)
+        attribution.consume(*self._attribution_records_from_events(slot_of))
+        self._apply_attribution(attribution, players_by_slot)
+        
+        for parsed in parsed_by_address.values():
+            # Detect role and build
+            self._detect_role_and_build(parsed)
+            
+            if parsed.is_enemy:
+                enemies.append(parsed)
+            else:
+                players.append(parsed)
+        
+        return self._finalize_result(players, enemies)
+    
+    def _build_result_from_aggregate(self, aggregator: EventAggregator) -> ParsedLog:
+        """Columnar counterpart of _build_result, every player comes from the aggregate"""
+        players = []
+        enemies = []
+        
+        agents = aggregator.agents
+        is_enemy, side_confidence = self._classify_players(
+            [agents[row] for row in aggregator.player_rows], aggregator.damage_hits
+        )
+        
+        counters = aggregator.counters
+        skills_used = aggregator.skills_used_by_row()
+        boons_applied = aggregator.applied_by_row(aggregator.boons_applied, BOON_ID_ARRAY)
+        conditions_applied = aggregator.applied_by_row(aggregator.conditions_applied, CONDITION_ID_ARRAY)
+        timeline_players = []
+        
+        for slot, row in enumerate(aggregator.player_rows):
+            agent = agents[row]
+            parsed = self._new_parsed_player(agent, bool(is_enemy[slot]), float(side_confidence[slot]))
+            for name in COUNTER_FIELDS:
+                setattr(parsed, name, int(counters[name][row]))
+            parsed.skills_used = skills_used.get(row, set())
+            parsed.boons_applied = boons_applied.get(row, {})
+            parsed.conditions_applied = conditions_applied.get(row, {})
+            
+            self._detect_role_and_build(parsed)
+            
+            if parsed.is_enemy:
+                enemies.append(parsed)
+            else:
+                players.append(parsed)
+            timeline_players.append(parsed)
+        
+        if self.profile.boon_stats:
+            self._apply_boon_stats(*aggregator.boon_stats(self._start_time, self._end_time), timeline_players)
+        if self.profile.player_stats:
+            self._apply_attribution(aggregator.attribution, timeline_players)
+        
+        log = self._finalize_result(players, enemies)
+        if self.profile.timeline:
+            log.timeline = CombatTimeline(
+                start_time=aggregator.timeline_origin or 0,
+                players=[p.character_name for p in timeline_players],
+                is_enemy=np.array([p.is_enemy for p in timeline_players], dtype=bool),
+                values=aggregator.timeline_values(),
+            )
+            log.engagements = segment_engagements(
+                log.timeline, [p.elite_spec or p.profession for p in timeline_players]
+            )
+        if self.profile.positions_ms:
+            positions, speeds = aggregator.movement_values()
+            log.movement = MovementTracks(
+                start_time=aggregator.timeline_origin or 0,
+                resolution_ms=self.profile.positions_ms,
+                players=[p.character_name for p in timeline_players],
+                is_enemy=np.array([p.is_enemy for p in timeline_players], dtype=bool),
+                positions=positions,
+                speeds=speeds,
+            )
+        if self.profile.player_stats:
+            log.skill_breakdown = SkillBreakdown(
+                players=[p.character_name for p in timeline_players],
+                is_enemy=np.array([p.is_enemy for p in timeline_players], dtype=bool),
+                slots=aggregator.skill_stat_keys >> 32,
+                skill_ids=aggregator.skill_stat_keys & 0xFFFFFFFF,
+                values=aggregator.skill_stats,
+                skill_names=log.skills,
+            )
+        return log
+    
+    def _buff_records_from_events(self, player_addresses: List[int]) -> np.ndarray:
+        """BUFF_RECORD_DTYPE records from CombatEvent objects (struct decoder)"""
+        slot_of = {address: slot for slot, address in enumerate(player_addresses)}
+        boon_column = {boon_id: column for column, boon_id in enumerate(BOON_ID_ARRAY.tolist())}
+        marks = {StateChange.SQUAD_COMBAT_START: BOON_MARK_START, StateChange.SQUAD_COMBAT_END: BOON_MARK_END}
+        rows = []
+        for e in self.events:
+            if e.is_statechange in marks:
+                rows.append((e.time, -1, -1, marks[e.is_statechange], 0, 0))
+            elif not e.buff or e.is_statechange or e.skill_id not in boon_column:
+                continue
+            elif e.is_buffremove == 0 and e.value > 0 and e.dst_agent in slot_of:
+                rows.append((e.time, slot_of.get(e.src_agent, -1), slot_of[e.dst_agent], boon_column[e.skill_id],
+                             e.value, 0))
+            elif e.is_buffremove in (1, 2) and e.src_agent in slot_of:
+                # The player losing the boon is src_agent (record dst), the remover dst_agent (record src)
+                rows.append((e.time, slot_of.get(e.dst_agent, -1), slot_of[e.src_agent], boon_column[e.skill_id],
+                             max(e.value, 0), e.is_buffremove))
+        return np.array(rows, dtype=BUFF_RECORD_DTYPE)
+    
+    def _attribution_records_from_events(self, slot_of: Dict[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """HIT_RECORD_DTYPE and STATE_RECORD_DTYPE records from CombatEvent objects (struct decoder)"""
+        hits = [
+            (e.time, slot_of[e.src_agent], slot_of[e.dst_agent], e.buff_dmg if e.buff else e.value)
+            for e in self.events
+            if not e.is_statechange and not e.is_activation and not e.is_shields
+            and e.src_agent in slot_of and e.dst_agent in slot_of
+            and 0 < (e.buff_dmg if e.buff else e.value) < 500000
+        ]
+        states = [
+            (e.time, slot_of[e.src_agent], e.is_statechange == StateChange.CHANGE_DEAD)
+            for e in self.events
+            if e.is_statechange in (StateChange.CHANGE_DOWN, StateChange.CHANGE_DEAD) and e.src_agent in slot_of
+        ]
+        return np.array(hits, dtype=HIT_RECORD_DTYPE), np.array(states, dtype=STATE_RECORD_DTYPE)
+    
+    def _apply_attribution(self, attribution: AttributionTracker, players_by_slot: List[ParsedPlayer]):
+        """Fill down contribution and kill participation (players in slot order)"""
+        is_enemy = np.array([p.is_enemy for p in players_by_slot], dtype=bool)
+        down_contrib, kill_participation = attribution.finalize(is_enemy)
+        for player, contrib, kills in zip(players_by_slot, down_contrib.tolist(), kill_participation.tolist()):
+            player.down_contrib = contrib
+            player.kill_participation = kills
+    
+    def _apply_boon_stats(self, uptime: np.ndarray, generated: np.ndarray, players_by_slot: List[ParsedPlayer]):
+        """Fill boon uptime/generation from the boon engine's arrays (players in slot order)"""
+        start, end = self._start_time, self._end_time
+        
+        subgroups = np.array([p.subgroup for p in players_by_slot], dtype=np.int64)
+        allies = np.array([not p.is_enemy for p in players_by_slot], dtype=bool)
+        generation = boon_generation(generated, subgroups, allies, start, end)
+        
+        boon_ids = BOON_ID_ARRAY.tolist()
+        for slot, player in enumerate(players_by_slot):
+            player.boon_uptime = {
+                boon_id: round(value, 2) for boon_id, value in zip(boon_ids, uptime[slot].tolist()) if value > 0
+            }
+            player.boon_generation = {
+                boon_id: round(value, 2) for boon_id, value in zip(boon_ids, generation[slot].tolist()) if value > 0
+            }
+    
+    def _aggregate_player_combat(self, parsed_by_address: Dict[int, ParsedPlayer]):
+        """
+        Analyze combat events for every player in one pass.
+        Each event is routed to its source and destination player accumulators.
+        """
         for event in self.events:
-            # Skip statechanges
+            # Statechanges: deaths/downs
             if event.is_statechange:
-                # Check for deaths/downs
                 if event.is_statechange == StateChange.CHANGE_DEAD:
-                    if event.src_agent == agent.address:
+                    parsed = parsed_by_address.get(event.src_agent)
+                    if parsed is not None:
                         parsed.deaths += 1
                 elif event.is_statechange == StateChange.CHANGE_DOWN:
-                    if event.src_agent == agent.address:
+                    parsed = parsed_by_address.get(event.src_agent)
+                    if parsed is not None:
                         parsed.downs += 1
                 continue
             
-            # Source is this player
-            if event.src_agent == agent.address:
+            # Source player
+            src = parsed_by_address.get(event.src_agent)
+            if src is not None:
                 # Track skills used
-                if event.skill_id not in parsed.skills_used:
-                    parsed.skills_used.append(event.skill_id)
+                src.skills_used.add(event.skill_id)
                 
                 # Direct damage - filter out impossible values (max 500k per hit is very generous)
                 if event.buff == 0 and 0 < event.value < 500000:
-                    parsed.damage_dealt += event.value
+                    src.damage_dealt += event.value
                 
                 # Buff damage (conditions) - same filter
                 if event.buff and 0 < event.buff_dmg < 500000:
-                    parsed.damage_dealt += event.buff_dmg
+                    src.damage_dealt += event.buff_dmg
                 
                 # Buff application (boons/conditions)
                 if event.buff and event.is_buffremove == 0 and event.value > 0:
                     if event.skill_id in BOON_IDS:
-                        parsed.boons_applied[event.skill_id] = \
-                            parsed.boons_applied.get(event.skill_id, 0) + 1
+                        src.boons_applied[event.skill_id] = \
+                            src.boons_applied.get(event.skill_id, 0) + 1
                     elif event.skill_id in CONDITION_IDS:
-                        parsed.conditions_applied[event.skill_id] = \
-                            parsed.conditions_applied.get(event.skill_id, 0) + 1
-                
-                # Boon strip detection (removing boons from enemies)
-                # is_buffremove: 1 = strip, 2 = cleanse, 3 = manual
-                if event.buff and event.is_buffremove == 1:
-                    # Check if target is an enemy
-                    if event.dst_agent != agent.address and event.skill_id in BOON_IDS:
-                        parsed.boon_strips += 1
-                
-                # Cleanse detection (removing conditions from allies)
-                if event.buff and event.is_buffremove == 2:
-                    if event.skill_id in CONDITION_IDS:
-                        parsed.cleanses += 1
+                        src.conditions_applied[event.skill_id] = \
+                            src.conditions_applied.get(event.skill_id, 0) + 1
                 
                 # CC detection (stuns, knockdowns, etc.)
                 # Result codes: 0=normal, 1=crit, 2=glance, 3=block, 4=evade, 5=interrupt, 6=absorb, 7=blind, 8=killingblow, 9=downed
                 if event.result == 5:  # Interrupt
-                    parsed.cc_out += 1
+                    src.cc_out += 1
                 
                 # Kill tracking
                 if event.result == 8:  # CBTR_KILLINGBLOW
-                    parsed.kills += 1
+                    src.kills += 1
                 
-                # Barrier detection - skill ID 51693 is barrier application
-                # Also check for is_shields flag which indicates barrier
+                # Barrier detection - is_shields flag indicates barrier
                 if event.is_shields and event.value > 0:
-                    parsed.barrier_out += event.value
+                    src.barrier_out += event.value
             
-            # Target is this player (damage taken)
-            if event.dst_agent == agent.address:
+            # Destination player (damage taken, and removals it caused)
+            dst = parsed_by_address.get(event.dst_agent)
+            if dst is not None:
                 if event.buff == 0 and event.value > 0:
-                    parsed.damage_taken += event.value
+                    dst.damage_taken += event.value
                 elif event.buff and event.buff_dmg > 0:
-                    parsed.damage_taken += event.buff_dmg
-            
-            # Resurrect detection - statechange CHANGE_UP (3) when target was down
-            if event.is_statechange == 3:  # CHANGE_UP
-                # If this player caused someone to get up (resurrect)
-                if event.src_agent == agent.address:
-                    parsed.resurrects += 1
+                    dst.damage_taken += event.buff_dmg
+                
+                # Boon strip detection: on a remove event src lost the buff and dst removed it
+                if event.buff and event.is_buffremove == 1:
+                    if event.dst_agent != event.src_agent and event.skill_id in BOON_IDS:
+                        dst.boon_strips += 1
+                
+                # Cleanse detection (conditions removed from allies)
+                if event.buff and event.is_buffremove == 2:
+                    if event.skill_id in CONDITION_IDS:
+                        dst.cleanses += 1
     
     def _detect_role_and_build(self, player: ParsedPlayer):
         """Detect player's role and build based on combat data"""
@@ -1137,6 +3234,385 @@ class EVTCParser:
         player.confidence = min(99.0, 50.0 + data_points * 2)
 
 
+# =============================================================================
+# PARSE FARM (bulk ingestion across processes)
+# =============================================================================
+
+# Scalar ParsedPlayer fields kept in compact results
+SUMMARY_PLAYER_FIELDS = (
+    'character_name', 'account_name', 'profession', 'elite_spec', 'subgroup', 'team_id',
+    'is_enemy', 'side_confidence', 'damage_dealt', 'damage_taken', 'healing_done', 'deaths', 'downs', 'kills',
+    'boon_strips', 'cleanses', 'cc_out', 'barrier_out', 'resurrects', 'down_contrib', 'kill_participation',
+    'estimated_role', 'estimated_build', 'confidence',
+)
+
+# A log to parse: a path, raw bytes, or a (filename, bytes) pair
+LogSource = Union[str, os.PathLike, bytes, Tuple[str, bytes]]
+
+
+@dataclass
+class ParseResult:
+    """Compact, picklable outcome of parsing one log (see parse_many)"""
+    index: int
+    source: str
+    ok: bool
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+def summarize_parsed_log(log: ParsedLog) -> Dict[str, Any]:
+    """Reduce a ParsedLog to plain dicts/lists of scalars (no skill table, no skill lists)"""
+    def player_row(player: ParsedPlayer) -> Dict[str, Any]:
+        row = {name: getattr(player, name) for name in SUMMARY_PLAYER_FIELDS}
+        row['boons_applied'] = dict(player.boons_applied)
+        row['boon_uptime'] = dict(player.boon_uptime)
+        row['boon_generation'] = dict(player.boon_generation)
+        return row
+    
+    return {
+        'arcdps_build': log.header.arcdps_build,
+        'revision': log.header.revision,
+        'boss_id': log.header.boss_id,
+        'is_wvw': log.is_wvw,
+        'map_id': log.map_id,
+        'duration_ms': log.duration_ms,
+        'start_time': log.start_time,
+        'end_time': log.end_time,
+        'pov_player': log.pov_player,
+        'players': [player_row(p) for p in log.players],
+        'enemies': [player_row(p) for p in log.enemies],
+    }
+
+
+# Per-process parser, reused across files so its buffers are reused too
+_worker_parser: Optional[EVTCParser] = None
+_worker_config: Optional[Tuple[str, int, str]] = None
+
+
+def _parse_source(task: Tuple[int, LogSource, str, int, str]) -> ParseResult:
+    """Parse one source in the current process, capturing any error"""
+    global _worker_parser, _worker_config
+    index, source, decode_mode, chunk_size, profile = task
+    
+    if _worker_parser is None or _worker_config != (decode_mode, chunk_size, profile):
+        _worker_parser = EVTCParser(decode_mode=decode_mode, chunk_size=chunk_size, profile=profile)
+        _worker_config = (decode_mode, chunk_size, profile)
+    
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        label = f"<blob {index}>"
+    elif isinstance(source, tuple):
+        label = source[0]
+    else:
+        label = os.fspath(source)
+    
+    try:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            log = _worker_parser.parse_bytes(bytes(source))
+        elif isinstance(source, tuple):
+            log = _worker_parser.parse_bytes(source[1], source[0])
+        else:
+            log = _worker_parser.parse_file(label)
+        return ParseResult(index=index, source=label, ok=True, summary=summarize_parsed_log(log))
+    except Exception as e:
+        return ParseResult(index=index, source=label, ok=False, error=f"{type(e).__name__}: {e}")
+
+
+def parse_many(
+    sources: Iterable[LogSource],
+    workers: Optional[int] = None,
+    decode_mode: str = "stream",
+    chunk_size: int = DEFAULT_CHUNK_EVENTS,
+    profile: str = "full"
+) -> List[ParseResult]:
+    """
+    Parse many logs across a process pool.
+    
+    Args:
+        sources: Paths, raw bytes, or (filename, bytes) pairs
+        workers: Number of processes (default: available_cpus()); 1 parses in-process.
+            Each log is aggregated by one process (EVTCParser workers=1): the
+            pool already spreads the files over the cores
+        decode_mode: EVTCParser decode mode used by the workers
+        chunk_size: Events per chunk in "stream" mode
+        profile: Parse profile (see PARSE_PROFILES); "summary" is enough for totals
+    
+    Returns one ParseResult per source, in input order. Failures are captured
+    per file (ok=False, error set) instead of aborting the batch.
+    """
+    if profile not in PARSE_PROFILES:
+        raise ValueError(f"Unknown parse profile: {profile}")
+    tasks = [(i, source, decode_mode, chunk_size, profile) for i, source in enumerate(sources)]
+    if not tasks:
+        return []
+    
+    workers = workers or available_cpus()
+    if workers <= 1 or len(tasks) == 1:
+        return [_parse_source(task) for task in tasks]
+    
+    workers = min(workers, len(tasks))
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_parse_source, tasks, chunksize=chunksize))
+
+
+# =============================================================================
+# COLUMNAR EXPORT (.npz artifacts for downstream analytics)
+# =============================================================================
+
+COLUMNAR_FORMAT = 1
+COLUMNAR_SUFFIX = ".npz"
+
+# Scalar ParsedPlayer fields, one typed column each (allies then enemies)
+PLAYER_COLUMNS = {
+    'character_name': np.str_, 'account_name': np.str_, 'profession': np.str_, 'elite_spec': np.str_,
+    'subgroup': np.int64, 'team_id': np.int64, 'is_enemy': np.bool_, 'side_confidence': np.float64,
+    'toughness': np.int64, 'concentration': np.int64, 'healing_power': np.int64, 'condition_damage': np.int64,
+    'damage_dealt': np.int64, 'damage_taken': np.int64, 'healing_done': np.int64,
+    'deaths': np.int64, 'downs': np.int64, 'kills': np.int64,
+    'boon_strips': np.int64, 'cleanses': np.int64, 'cc_out': np.int64, 'barrier_out': np.int64,
+    'resurrects': np.int64, 'down_contrib': np.int64, 'kill_participation': np.int64,
+    'estimated_role': np.str_, 'estimated_build': np.str_, 'confidence': np.float64,
+}
+
+# Per-player collections, stored ragged: <name>.offsets indexes <name>.keys (and <name>.values)
+PLAYER_LIST_COLUMNS = {'weapons_used': np.str_, 'skills_used': np.int64}
+PLAYER_MAP_COLUMNS = {
+    'boons_applied': np.int64, 'conditions_applied': np.int64,
+    'boon_uptime': np.float64, 'boon_generation': np.float64,
+}
+
+
+def columnar_path(log_path: Union[str, os.PathLike]) -> Path:
+    """Where the columnar artifact of an archived log lives: next to it"""
+    path = Path(log_path)
+    return path.with_name(path.name + COLUMNAR_SUFFIX)
+
+
+def save_columnar(log: ParsedLog, path: Union[str, os.PathLike], timeseries: bool = True):
+    """
+    Write a ParsedLog as an uncompressed .npz of typed columns.
+    
+    Player fields become one column each, collections are stored ragged
+    (offsets + flat keys/values), and with `timeseries` the timeline, skill
+    breakdown and movement tracks are stored as their arrays. Members are
+    stored uncompressed so load_columnar can map them without copying.
+    """
+    players = log.players + log.enemies
+    arrays: Dict[str, np.ndarray] = {}
+    
+    for name, dtype in PLAYER_COLUMNS.items():
+        arrays[f'player.{name}'] = np.array([getattr(p, name) for p in players], dtype=dtype)
+    for name, dtype in PLAYER_LIST_COLUMNS.items():
+        items = [sorted(value) if isinstance(value, set) else list(value)
+                 for value in (getattr(p, name) for p in players)]
+        arrays[f'{name}.offsets'] = np.cumsum([0] + [len(value) for value in items], dtype=np.int64)
+        arrays[f'{name}.keys'] = np.array([key for value in items for key in value], dtype=dtype)
+    for name, dtype in PLAYER_MAP_COLUMNS.items():
+        items = [sorted(getattr(p, name).items()) for p in players]
+        arrays[f'{name}.offsets'] = np.cumsum([0] + [len(value) for value in items], dtype=np.int64)
+        arrays[f'{name}.keys'] = np.array([key for value in items for key, _ in value], dtype=np.int64)
+        arrays[f'{name}.values'] = np.array([v for value in items for _, v in value], dtype=dtype)
+    
+    arrays['skills.ids'] = np.array(list(log.skills), dtype=np.int64)
+    arrays['skills.names'] = np.array(list(log.skills.values()), dtype=np.str_)
+    
+    meta: Dict[str, Any] = {
+        'format': COLUMNAR_FORMAT,
+        'parser_version': PARSER_VERSION,
+        'header': asdict(log.header),
+        'map_id': log.map_id,
+        'duration_ms': log.duration_ms,
+        'start_time': log.start_time,
+        'end_time': log.end_time,
+        'pov_player': log.pov_player,
+    }
+    
+    # Time series share one row order: every player in agent table order
+    series_rows = None
+    if timeseries and log.timeline is not None:
+        series_rows = log.timeline
+        meta['timeline_start'] = log.timeline.start_time
+        arrays['timeline.values'] = log.timeline.values
+    if timeseries and log.skill_breakdown is not None:
+        series_rows = series_rows or log.skill_breakdown
+        arrays['breakdown.slots'] = log.skill_breakdown.slots
+        arrays['breakdown.skill_ids'] = log.skill_breakdown.skill_ids
+        arrays['breakdown.values'] = log.skill_breakdown.values
+    if timeseries and log.movement is not None:
+        series_rows = series_rows or log.movement
+        meta['movement_start'] = log.movement.start_time
+        meta['movement_resolution_ms'] = log.movement.resolution_ms
+        arrays['movement.positions'] = log.movement.positions
+        arrays['movement.speeds'] = log.movement.speeds
+    if series_rows is not None:
+        arrays['rows.players'] = np.array(series_rows.players, dtype=np.str_)
+        arrays['rows.is_enemy'] = np.asarray(series_rows.is_enemy, dtype=np.bool_)
+    
+    arrays['meta'] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+    
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class _MappedArrays(dict):
+    """
+    Arrays of an .npz file by name, with the memory map their views read from.
+    
+    close() (or leaving a with block) unmaps the file; views still alive at
+    that point keep the map until the last of them is released.
+    """
+    
+    def __init__(self, arrays: Dict[str, np.ndarray], mapped: Optional[mmap.mmap]):
+        super().__init__(arrays)
+        self.mapped = mapped
+    
+    def close(self):
+        self.clear()
+        if self.mapped is not None:
+            try:
+                self.mapped.close()
+            except BufferError:
+                pass  # views still exported: the map goes away with them
+            self.mapped = None
+    
+    def __enter__(self) -> "_MappedArrays":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _map_npz(path: Union[str, os.PathLike]) -> _MappedArrays:
+    """
+    Arrays of an .npz file; uncompressed members are read-only views of a
+    memory map of the file, compressed ones are read normally. The file
+    itself is closed on return, the map by closing the result.
+    """
+    arrays: Dict[str, np.ndarray] = {}
+    with open(path, 'rb') as f, zipfile.ZipFile(f) as zf:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else None
+        for info in zf.infolist():
+            name = info.filename[:-len('.npy')]
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+            
+            # Member data starts after its local header (30 bytes + name + extra field)
+            name_length, extra_length = struct.unpack_from('<HH', mapped, info.header_offset + 26)
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"Object array {name} in columnar file")
+            
+            count = int(np.prod(shape))
+            array = np.frombuffer(mapped, dtype=dtype, count=count, offset=f.tell())
+            arrays[name] = array.reshape(shape, order='F' if fortran_order else 'C')
+    return _MappedArrays(arrays, mapped)
+
+
+def load_columnar(path: Union[str, os.PathLike], any_version: bool = False, in_memory: bool = False) -> ParsedLog:
+    """
+    Load a ParsedLog written by save_columnar.
+    
+    Numeric arrays (timeline, breakdown, movement) are zero-copy, read-only
+    views of the file, which stays mapped until they are all released; with
+    in_memory they are copied and the file is unmapped before returning.
+    Engagements are rebuilt from the timeline.
+    
+    Raises:
+        ValueError: Unknown format, or written by another PARSER_VERSION
+            (unless any_version), so the caller can reparse the log
+    """
+    with _map_npz(path) as arrays:
+        return _columnar_log(arrays, any_version, in_memory)
+
+
+def _columnar_log(arrays: Dict[str, np.ndarray], any_version: bool, in_memory: bool) -> ParsedLog:
+    """ParsedLog from the arrays of a columnar file (load_columnar)"""
+    def kept(name: str) -> np.ndarray:
+        return arrays[name].copy() if in_memory else arrays[name]
+    
+    meta = json.loads(arrays['meta'].tobytes().decode('utf-8'))
+    if meta.get('format') != COLUMNAR_FORMAT:
+        raise ValueError(f"Unknown columnar format: {meta.get('format')}")
+    if not any_version and meta['parser_version'] != PARSER_VERSION:
+        raise ValueError(f"Columnar file from parser version {meta['parser_version']}, current is {PARSER_VERSION}")
+    
+    columns = {name: arrays[f'player.{name}'].tolist() for name in PLAYER_COLUMNS}
+    n_players = len(columns['character_name'])
+    
+    def ragged(name: str, values: bool) -> List[Any]:
+        offsets = arrays[f'{name}.offsets'].tolist()
+        keys = arrays[f'{name}.keys'].tolist()
+        if not values:
+            return [keys[offsets[i]:offsets[i + 1]] for i in range(n_players)]
+        items = arrays[f'{name}.values'].tolist()
+        return [dict(zip(keys[offsets[i]:offsets[i + 1]], items[offsets[i]:offsets[i + 1]])) for i in range(n_players)]
+    
+    collections = {name: ragged(name, False) for name in PLAYER_LIST_COLUMNS}
+    collections.update({name: ragged(name, True) for name in PLAYER_MAP_COLUMNS})
+    
+    players, enemies = [], []
+    for i in range(n_players):
+        player = ParsedPlayer(**{name: column[i] for name, column in columns.items()})
+        player.weapons_used = collections['weapons_used'][i]
+        player.skills_used = set(collections['skills_used'][i])
+        for name in PLAYER_MAP_COLUMNS:
+            setattr(player, name, collections[name][i])
+        (enemies if player.is_enemy else players).append(player)
+    
+    log = ParsedLog(
+        header=EVTCHeader(**meta['header']),
+        players=players,
+        enemies=enemies,
+        skills=dict(zip(arrays['skills.ids'].tolist(), arrays['skills.names'].tolist())),
+        map_id=meta['map_id'],
+        duration_ms=meta['duration_ms'],
+        start_time=meta['start_time'],
+        end_time=meta['end_time'],
+        pov_player=meta['pov_player'],
+    )
+    
+    if 'rows.players' in arrays:
+        row_players = arrays['rows.players'].tolist()
+        is_enemy = kept('rows.is_enemy')
+    if 'timeline.values' in arrays:
+        log.timeline = CombatTimeline(start_time=meta['timeline_start'], players=row_players,
+                                      is_enemy=is_enemy, values=kept('timeline.values'))
+        spec_by_name = {p.character_name: p.elite_spec or p.profession for p in players + enemies}
+        log.engagements = segment_engagements(log.timeline, [spec_by_name.get(name, "") for name in row_players])
+    if 'breakdown.values' in arrays:
+        log.skill_breakdown = SkillBreakdown(
+            players=row_players,
+            is_enemy=is_enemy,
+            slots=kept('breakdown.slots'),
+            skill_ids=kept('breakdown.skill_ids'),
+            values=kept('breakdown.values'),
+            skill_names=log.skills,
+        )
+    if 'movement.positions' in arrays:
+        log.movement = MovementTracks(
+            start_time=meta['movement_start'],
+            resolution_ms=meta['movement_resolution_ms'],
+            players=row_players,
+            is_enemy=is_enemy,
+            positions=kept('movement.positions'),
+            speeds=kept('movement.speeds'),
+        )
+    return log
+
+
 # =============================================================================
 # REAL PARSER INTEGRATION (replaces mock_parser.py)
 # =============================================================================
@@ -1147,8 +3623,11 @@ class RealEVTCParser:
     Provides the same interface but with real parsing
     """
     
-    def __init__(self):
-        self.parser = EVTCParser()
+    def __init__(self, decode_mode: str = "stream", chunk_size: int = DEFAULT_CHUNK_EVENTS,
+                 profile: str = "full", workers: Optional[int] = 1):
+        # Stream mode: uploads are inflated and decoded chunk by chunk
+        self.parser = EVTCParser(decode_mode=decode_mode, chunk_size=chunk_size, profile=profile, workers=workers)
+        self._profile_parsers: Dict[str, EVTCParser] = {profile: self.parser}
         
         # WvW map IDs
         self.WVW_MAPS = {
@@ -1159,13 +3638,41 @@ class RealEVTCParser:
             968: "Edge of the Mists",
         }
     
-    def parse_evtc_file(self, filepath: str) -> ParsedLog:
-        """Parse a single EVTC file and return full data"""
-        return self.parser.parse_file(filepath)
+    def _parser_for(self, profile: Optional[str]) -> EVTCParser:
+        """Parser for a profile, sharing this parser's decode settings"""
+        if profile is None:
+            return self.parser
+        if profile not in self._profile_parsers:
+            self._profile_parsers[profile] = EVTCParser(
+                decode_mode=self.parser.decode_mode, chunk_size=self.parser.chunk_size,
+                profile=profile, workers=self.parser.workers
+            )
+        return self._profile_parsers[profile]
+    
+    def parse_evtc_file(self, filepath: str, profile: Optional[str] = None) -> ParsedLog:
+        """Parse a single EVTC file and return full data (or what `profile` asks for)"""
+        return self._parser_for(profile).parse_file(filepath)
     
-    def parse_evtc_bytes(self, data: bytes, filename: str = "") -> ParsedLog:
+    def parse_evtc_bytes(self, data: bytes, filename: str = "", profile: Optional[str] = None) -> ParsedLog:
         """Parse EVTC from bytes"""
-        return self.parser.parse_bytes(data, filename)
+        return self._parser_for(profile).parse_bytes(data, filename)
+    
+    def peek_evtc_file(self, filepath: str) -> LogRoster:
+        """Header and roster only (fast is_wvw / dedup / composition checks)"""
+        return self.parser.peek_file(filepath)
+    
+    def peek_evtc_bytes(self, data: bytes, filename: str = "") -> LogRoster:
+        """Header and roster only, from bytes"""
+        return self.parser.peek_bytes(data, filename)
+    
+    def parse_many(self, sources: Iterable[LogSource], workers: Optional[int] = None,
+                   profile: Optional[str] = None) -> List[ParseResult]:
+        """Parse many logs across a process pool with this parser's settings"""
+        return parse_many(
+            sources, workers=workers,
+            decode_mode=self.parser.decode_mode, chunk_size=self.parser.chunk_size,
+            profile=profile or self.parser.profile.name
+        )
     
     def parse_dps_report_url(self, url: str) -> AnalysisResult:
         """
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Time one log parsed in one process against the same log split across processes
+(EVTCParser workers). Run it on the target machine with a large log before
+enabling workers there: with a single CPU the parallel path is skipped.
+
+Usage: python scripts/benchmark_parallel_parse.py <log.evtc|log.zevtc> [workers] [repeats]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from parser import EVENT_SIZE, PARALLEL_MIN_EVENTS, EVTCParser, available_cpus
+
+
+def best_time(parser: EVTCParser, path: str, repeats: int) -> float:
+    """Fastest of `repeats` parses, in seconds"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        parser.parse_file(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    
+    path = sys.argv[1]
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else available_cpus()
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    
+    used = EVTCParser(workers=workers)._parallel_workers()
+    print(f"Available CPUs: {available_cpus()}, workers used: {used}")
+    if Path(path).suffix == ".evtc" and Path(path).stat().st_size < PARALLEL_MIN_EVENTS * EVENT_SIZE:
+        print(f"Note: fewer than {PARALLEL_MIN_EVENTS} events, both runs stay in one process")
+    
+    for mode in ("numpy", "stream"):
+        serial = best_time(EVTCParser(decode_mode=mode), path, repeats)
+        split = best_time(EVTCParser(decode_mode=mode, workers=workers), path, repeats)
+        print(f"{mode:>6}: 1 process {serial:.2f}s, {used} workers {split:.2f}s, speedup x{serial / split:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,16 @@ Export fight data from local database to JSON for deployment
 """
 
 import json
+import sys
 from pathlib import Path
-from tinydb import TinyDB
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.fight_store import open_fight_store
 
 def export_fights_to_json():
     """Export all fights with enemy_composition to JSON"""
-    db = TinyDB('data/fights.db')
+    db = open_fight_store(Path('data/fights.db'))
     fights = db.table('fights')
     
     # Filter fights with enemy_composition
@@ -17,6 +21,7 @@ def export_fights_to_json():
         fight for fight in fights.all() 
         if 'enemy_composition' in fight and fight['enemy_composition']
     ]
+    db.close()
     
     # Create export directory
     export_dir = Path('data/export')
@@ -35,8 +40,12 @@ Import fight data from JSON to database
 \"\"\"
 
 import json
+import sys
 from pathlib import Path
-from tinydb import TinyDB
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from services.fight_store import open_fight_store
 
 def import_fights_from_json():
     \"\"\"Import fights from JSON to database\"\"\"
@@ -51,19 +60,20 @@ def import_fights_from_json():
         fights = json.load(f)
     
     # Import to database
-    db = TinyDB('data/fights.db')
+    db = open_fight_store(Path('data/fights.db'))
     fights_table = db.table('fights')
     
     # Clear existing data and import
     fights_table.truncate()
     fights_table.insert_multiple(fights)
+    db.close()
     
     print(f"Imported {len(fights)} fights to database")
 
 if __name__ == "__main__":
     import_fights_from_json()
 """
-    
+
     with open(export_dir / 'import_fights.py', 'w') as f:
         f.write(import_script)
     
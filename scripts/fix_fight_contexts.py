@@ -13,7 +13,7 @@ from collections import Counter
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from tinydb import TinyDB
+from services.fight_store import open_fight_store
 
 FIGHTS_DB_PATH = Path("data/fights.db")
 
@@ -54,13 +54,13 @@ def main():
     print("Fix Fight Contexts - Auto-detection")
     print("=" * 60)
     
-    if not FIGHTS_DB_PATH.exists():
-        print(f"Error: {FIGHTS_DB_PATH} not found")
-        return
-    
-    db = TinyDB(str(FIGHTS_DB_PATH))
+    db = open_fight_store(FIGHTS_DB_PATH)
     fights_table = db.table('fights')
     fights = fights_table.all()
+    if not fights:
+        print(f"Error: no fights in {FIGHTS_DB_PATH}")
+        db.close()
+        return
     
     print(f"\nLoaded {len(fights)} fights")
     
@@ -111,6 +111,8 @@ def main():
             print(f"\n{ctx.upper()} example:")
             print(f"  Allies: {ally_count}, Enemies: {enemy_count}")
             print(f"  Enemy comp: {dict(list(enemy_comp.items())[:5])}")
+    
+    db.close()
 
 
 if __name__ == "__main__":
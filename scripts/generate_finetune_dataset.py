@@ -32,7 +32,7 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from tinydb import TinyDB
+from services.fight_store import open_fight_store
 
 # Configuration
 FIGHTS_DB_PATH = Path("data/fights.db")
@@ -317,7 +317,7 @@ TACTIQUE: One tactical advice"""
         prompt = f"[INST] {base_content} [/INST]"
     else:
         prompt = base_content
-
+    
     # Output response - use counter data from API if available
     counter_specs = get_counter_specs(enemy_comp, context)
     focus_targets = get_focus_targets(enemy_comp)
@@ -387,13 +387,12 @@ def get_smart_tactic(enemy_comp: dict, context: str) -> str:
 
 def load_fights() -> list:
     """Load fights from database"""
-    if not FIGHTS_DB_PATH.exists():
-        print(f"Error: {FIGHTS_DB_PATH} not found")
-        return []
-    
-    db = TinyDB(str(FIGHTS_DB_PATH))
-    fights_table = db.table('fights')
-    return fights_table.all()
+    db = open_fight_store(FIGHTS_DB_PATH)
+    fights = db.table('fights').all()
+    db.close()
+    if not fights:
+        print(f"Error: no fights in {FIGHTS_DB_PATH}")
+    return fights
 
 
 def main():
@@ -620,7 +619,7 @@ MODEL_NAME = "gw2-mistral"
 - Axolotl: https://github.com/OpenAccess-AI-Collective/axolotl
 - Ollama: https://ollama.ai
 """
-    
+
     with open(instructions_path, 'w', encoding='utf-8') as f:
         f.write(instructions)
     
@@ -25,6 +25,8 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 # Configuration
 MIN_NEW_FIGHTS = 200  # Minimum de nouveaux combats pour déclencher un fine-tuning
 DATA_DIR = Path("data")
@@ -51,15 +53,12 @@ def save_finetune_state(state: dict):
 
 def get_current_fight_count() -> int:
     """Compter le nombre de combats dans la base"""
-    from tinydb import TinyDB
-    
-    fights_db = DATA_DIR / "fights.db"
-    if not fights_db.exists():
-        return 0
+    from services.fight_store import open_fight_store
     
-    db = TinyDB(str(fights_db))
-    fights_table = db.table('fights')
-    return len(fights_table.all())
+    db = open_fight_store(DATA_DIR / "fights.db")
+    count = len(db.table('fights'))
+    db.close()
+    return count
 
 
 def run_script(script_path: str, description: str) -> bool:
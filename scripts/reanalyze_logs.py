@@ -11,7 +11,7 @@ from datetime import datetime
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from parser import RealEVTCParser
+from parser import EVTCParser, ParseResult, parse_many
 
 LOGS_DIR = Path("/home/roddy/Téléchargements/Logs WvW")
 DATA_DIR = Path("data")
@@ -25,37 +25,34 @@ def collect_log_files():
                 files.append(Path(root) / f)
     return sorted(files, key=lambda x: x.stat().st_mtime)
 
-def analyze_file(filepath: Path, parser: RealEVTCParser):
-    """Analyze a single file and extract stats"""
-    try:
-        with open(filepath, 'rb') as f:
-            data = f.read()
-        
-        parsed = parser.parse_evtc_bytes(data, filepath.name)
-        
-        # Extract stats from players
-        stats = []
-        for player in parsed.players:
-            stats.append({
-                'name': player.character_name,
-                'account': player.account_name,
-                'profession': player.elite_spec or player.profession,
-                'kills': player.kills or 0,
-                'deaths': player.deaths or 0,
-                'damage': player.damage_dealt or 0,
-                'healing': player.healing_done or 0,
-                'role': player.estimated_role.lower() if player.estimated_role else 'dps',
-            })
-        
-        return {
-            'success': True,
-            'duration': parsed.duration_seconds,
-            'players': stats,
-            'enemies': len(parsed.enemies),
-            'timestamp': filepath.stat().st_mtime,
-        }
-    except Exception as e:
-        return {'success': False, 'error': str(e)}
+def analyze_result(filepath: Path, result: ParseResult):
+    """Extract stats from a compact parse result"""
+    if not result.ok:
+        return {'success': False, 'error': result.error}
+    
+    summary = result.summary
+    
+    # Extract stats from players
+    stats = []
+    for player in summary['players']:
+        stats.append({
+            'name': player['character_name'],
+            'account': player['account_name'],
+            'profession': player['elite_spec'] or player['profession'],
+            'kills': player['kills'] or 0,
+            'deaths': player['deaths'] or 0,
+            'damage': player['damage_dealt'] or 0,
+            'healing': player['healing_done'] or 0,
+            'role': player['estimated_role'].lower() if player['estimated_role'] else 'dps',
+        })
+    
+    return {
+        'success': True,
+        'duration': summary['duration_ms'] // 1000,
+        'players': stats,
+        'enemies': len(summary['enemies']),
+        'timestamp': filepath.stat().st_mtime,
+    }
 
 def main():
     print("=== Re-analyze WvW Logs ===\n")
@@ -68,8 +65,23 @@ def main():
         print("No files found!")
         return
     
-    # Initialize parser
-    parser = RealEVTCParser()
+    # Drop non-WvW logs from the header alone, before the full event pass
+    peeker = EVTCParser()
+    wvw_files = []
+    for filepath in files:
+        try:
+            if peeker.peek_file(str(filepath)).is_wvw:
+                wvw_files.append(filepath)
+        except Exception:
+            # Let the full parse report the error
+            wvw_files.append(filepath)
+    print(f"Skipping {len(files) - len(wvw_files)} non-WvW logs")
+    files = wvw_files
+    
+    # Parse every file across all cores (results come back in input order)
+    workers = os.cpu_count() or 1
+    print(f"Parsing with {workers} worker processes...")
+    parse_results = parse_many(files, workers=workers, profile="summary")
     
     # Process files
     success_count = 0
@@ -82,7 +94,7 @@ def main():
         if i % 100 == 0:
             print(f"Processing {i}/{len(files)}...")
         
-        result = analyze_file(filepath, parser)
+        result = analyze_result(filepath, parse_results[i])
         
         if result['success']:
             success_count += 1
@@ -3,9 +3,18 @@ Script to recalculate ally_composition from ally_builds for existing fights.
 Note: enemy_composition cannot be reconstructed without original logs.
 """
 
-from counter_ai import fights_table, fights_db
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 from tinydb import Query
 
+from services.fight_store import open_fight_store
+
+fights_db = open_fight_store(Path("data/fights.db"))
+fights_table = fights_db.table('fights')
+
 
 def recalculate_compositions():
     """Recalculate ally_composition from ally_builds"""
@@ -42,3 +51,4 @@ def recalculate_compositions():
 
 if __name__ == "__main__":
     recalculate_compositions()
+    fights_db.close()
@@ -3,9 +3,18 @@ Script to recalculate fight outcomes based on the new kill/death ratio logic.
 Run this once after updating the outcome calculation.
 """
 
-from counter_ai import fights_table, fights_db
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 from tinydb import Query
 
+from services.fight_store import open_fight_store
+
+fights_db = open_fight_store(Path("data/fights.db"))
+fights_table = fights_db.table('fights')
+
 
 def recalculate_outcomes():
     """Recalculate outcomes for all existing fights"""
@@ -100,3 +109,4 @@ def recalculate_outcomes():
 
 if __name__ == "__main__":
     recalculate_outcomes()
+    fights_db.close()
@@ -11,20 +11,22 @@ from pathlib import Path
 from datetime import datetime
 
 # Add project root to path
-sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from tinydb import TinyDB
 
+from services.fight_store import open_fight_store
+
 # Direct DB access for speed (bypass services)
-PERF_DB_PATH = Path(__file__).parent / "data" / "performance_stats.json"
-FIGHTS_DB_PATH = Path(__file__).parent / "data" / "fights.db"
+PERF_DB_PATH = Path(__file__).parent.parent / "data" / "performance_stats.json"
+FIGHTS_DB_PATH = Path(__file__).parent.parent / "data" / "fights.db"
 
 
 def calculate_stats_fast(max_fights=300):
     """Fast calculation of performance stats using direct DB access"""
     
     print("Loading fights database...")
-    fights_db = TinyDB(str(FIGHTS_DB_PATH))
+    fights_db = open_fight_store(FIGHTS_DB_PATH)
     fights_table = fights_db.table('fights')
     
     all_fights = fights_table.all()
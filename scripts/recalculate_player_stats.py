@@ -3,14 +3,19 @@
 Script to recalculate player stats from fights database.
 This fixes the kills=0 issue by recalculating from recent fights that have kills data.
 """
+import sys
 from tinydb import TinyDB, Query
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.fight_store import open_fight_store
+
 def recalculate_player_stats():
     """Recalculate player stats from fights database"""
     # Load fights from AI database
-    fights_db = TinyDB('data/fights.db')
+    fights_db = open_fight_store(Path('data/fights.db'))
     fights_table = fights_db.table('fights')
     
     # Load player stats database
@@ -18,6 +23,7 @@ def recalculate_player_stats():
     player_fights_table = player_db.table('fights')
     
     all_fights = fights_table.all()
+    fights_db.close()
     print(f"Total fights in AI database: {len(all_fights)}")
     
     # Count fights with kills data
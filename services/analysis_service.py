@@ -8,8 +8,9 @@ from typing import Dict, List, Tuple
 import httpx
 import uuid
 
-from parser import RealEVTCParser
+from parser import RealEVTCParser, named_boon_stats
 from services.counter_service import get_counter_service
+from services.parse_cache import content_key, get_parse_cache
 from role_detector import estimate_role_from_profession
 from translations import get_all_translations
 from logger import get_logger
@@ -80,7 +81,11 @@ def convert_parsed_log_to_players_data(parsed_log) -> dict:
             'resurrects': 0,
             'boon_strips': 0,
             'role': player.estimated_role.lower() if player.estimated_role else 'dps',
+            'boon_gen': named_boon_stats(player.boon_generation),
+            'boon_uptime': named_boon_stats(player.boon_uptime),
+            'down_contrib': player.down_contrib,
             'kills': player.kills,
+            'kill_participation': player.kill_participation,
             'deaths': player.deaths,
             'is_afk': is_player_afk(player),
             'in_squad': player.subgroup > 0,
@@ -244,9 +249,16 @@ async def analyze_single_file(filename: str, data: bytes, filesize: int, lang: s
     
     # Strategy 2: OFFLINE FALLBACK - Use local parser
     logger.info("Using OFFLINE mode with local parser")
-    parsed_log = real_parser.parse_evtc_bytes(data, filename)
-    
-    players_data = convert_parsed_log_to_players_data(parsed_log)
+    cache = get_parse_cache()
+    cache_key = content_key(data)
+    players_data = cache.get(cache_key)
+    
+    if players_data is None:
+        parsed_log = real_parser.parse_evtc_bytes(data, filename)
+        players_data = convert_parsed_log_to_players_data(parsed_log)
+        cache.put(cache_key, players_data)
+    else:
+        logger.info(f"Parse cache hit for {filename}")
     
     players_data['source'] = 'evtc'
     players_data['source_name'] = filename
@@ -255,11 +267,12 @@ async def analyze_single_file(filename: str, data: bytes, filesize: int, lang: s
     enemy_spec_counts = players_data.get('enemy_composition', {}).get('spec_counts', {})
     ai_counter = await get_counter_service().generate_counter(enemy_spec_counts)
     
-    logger.info(f"Offline parse success: {len(parsed_log.players)} allies, {len(parsed_log.enemies)} enemies")
+    ally_count = len(players_data['allies']) + len(players_data['allies_afk'])
+    logger.info(f"Offline parse success: {ally_count} allies, {len(players_data['enemies'])} enemies")
     
     return {
         "request": None,
-        "data": {"fightName": f"Offline: {filename}", "duration": f"{parsed_log.duration_seconds}s"},
+        "data": {"fightName": f"Offline: {filename}", "duration": f"{players_data['duration_sec']}s"},
         "players": players_data,
         "ai_counter": ai_counter,
         "permalink": "",
@@ -0,0 +1,145 @@
+"""
+Build aggregates - Per-build performance totals materialized as fights are recorded
+Build rows are summed per (spec, role) inside groups keyed by context and enemy-composition
+signature, so a recommendation merges the groups of matching signatures instead of
+walking every stored build row
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from services.composition_index import BuildSpecIndex
+
+# Build row fields summed (and squared) per aggregate
+AGGREGATE_FIELDS = ('performance_score', 'dps', 'healing', 'boon_strips', 'cleanses')
+
+
+def composition_signature(enemy_comp: Mapping) -> str:
+    """
+    Canonical signature of an enemy composition: its sorted spec set.
+    Matching compares spec sets only (Jaccard), so counts are left out and every
+    composition with the same specs shares one group.
+    """
+    return "|".join(sorted(enemy_comp))
+
+
+@dataclass
+class BuildAggregate:
+    """
+    Totals of every build row of one (spec, role), in one or more signature groups
+    
+    All rows of a fight share its context and enemy composition, so they are in
+    one group: distinct fights counted per group add up across groups.
+    """
+    count: int = 0
+    wins: int = 0
+    sums: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(AGGREGATE_FIELDS, 0))
+    sums_sq: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(AGGREGATE_FIELDS, 0))
+    # Distinct victorious fights (by fight_id) this build was in, and its build rows in them
+    win_fights: int = 0
+    win_fight_builds: int = 0
+    win_fight_ids: Set[str] = field(default_factory=set)
+    # Position of the first row, so merged aggregates keep table order
+    first_row: int = 0
+    
+    def add(self, build: Mapping, row: int):
+        """Fold one build row in"""
+        if self.count == 0:
+            self.first_row = row
+        self.count += 1
+        for name in AGGREGATE_FIELDS:
+            value = build.get(name, 0)
+            self.sums[name] += value
+            self.sums_sq[name] += value * value
+        if build.get('outcome') == 'victory':
+            self.wins += 1
+            fight_id = build.get('fight_id', '')
+            if fight_id:
+                if fight_id not in self.win_fight_ids:
+                    self.win_fight_ids.add(fight_id)
+                    self.win_fights += 1
+                self.win_fight_builds += 1
+    
+    def merge(self, other: 'BuildAggregate'):
+        """Fold another aggregate of the same (spec, role), from another group, in"""
+        if other.count == 0:
+            return
+        if self.count == 0 or other.first_row < self.first_row:
+            self.first_row = other.first_row
+        self.count += other.count
+        self.wins += other.wins
+        for name in AGGREGATE_FIELDS:
+            self.sums[name] += other.sums[name]
+            self.sums_sq[name] += other.sums_sq[name]
+        self.win_fights += other.win_fights
+        self.win_fight_builds += other.win_fight_builds
+    
+    def mean(self, name: str) -> float:
+        return self.sums[name] / self.count if self.count else 0
+    
+    def stddev(self, name: str) -> float:
+        """Population standard deviation of a summed field"""
+        if not self.count:
+            return 0.0
+        mean = self.sums[name] / self.count
+        return math.sqrt(max(0.0, self.sums_sq[name] / self.count - mean * mean))
+
+
+class BuildAggregateTable:
+    """
+    Build aggregates grouped by (context, signature)
+    
+    Groups are rows of a BuildSpecIndex, so the groups whose spec set is close
+    enough to a query are found from the index's posting lists.
+    """
+    
+    def __init__(self):
+        self.groups: List[Dict[Tuple[str, str], BuildAggregate]] = []
+        self.group_ids: Dict[Tuple[Optional[str], str], int] = {}
+        self.index = BuildSpecIndex()
+        self.rows = 0
+    
+    @classmethod
+    def from_documents(cls, builds: Iterable[Mapping]) -> 'BuildAggregateTable':
+        """Aggregate stored build rows, in table order"""
+        table = cls()
+        table.add_rows(builds)
+        return table
+    
+    def __len__(self) -> int:
+        return self.rows
+    
+    def _group(self, build: Mapping) -> Dict[Tuple[str, str], BuildAggregate]:
+        enemy_comp = build.get('enemy_comp') or {}
+        key = (build.get('context'), composition_signature(enemy_comp))
+        group_id = self.group_ids.get(key)
+        if group_id is None:
+            group_id = len(self.groups)
+            self.group_ids[key] = group_id
+            self.groups.append({})
+            self.index.add(group_id, {'enemy_comp': enemy_comp, 'context': key[0]})
+        return self.groups[group_id]
+    
+    def add_rows(self, builds: Iterable[Mapping]):
+        """Fold new build rows in"""
+        for build in builds:
+            key = (build.get('spec', 'Unknown'), build.get('role', 'dps'))
+            group = self._group(build)
+            if key not in group:
+                group[key] = BuildAggregate()
+            group[key].add(build, self.rows)
+            self.rows += 1
+    
+    def matching(self, enemy_specs: Iterable[str], context: Optional[str] = None) -> Dict[Tuple[str, str], BuildAggregate]:
+        """
+        Merged (spec, role) aggregates over the build rows whose enemy spec set has
+        a Jaccard similarity of at least 0.3 with enemy_specs, in first-row order
+        """
+        merged: Dict[Tuple[str, str], BuildAggregate] = {}
+        for group_id in self.index.matching(enemy_specs, context):
+            for key, aggregate in self.groups[group_id].items():
+                if key not in merged:
+                    merged[key] = BuildAggregate()
+                merged[key].merge(aggregate)
+        return dict(sorted(merged.items(), key=lambda item: item[1].first_row))
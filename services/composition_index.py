@@ -0,0 +1,334 @@
+"""
+Composition index - Enemy compositions of recorded fights and builds kept in memory
+One row per fight and one spec-major column block per spec, so similar-fight lookups
+are a handful of NumPy operations over the specs of the query instead of a Python loop;
+build rows are reached through an inverted index from enemy spec to row
+"""
+
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+from role_detector import BOON_SPECS, HEALER_SPECS, STAB_SPECS, STRIP_DPS_SPECS
+
+# Strategic weight per role (stab/heal > boon > strip > dps)
+ROLE_WEIGHTS = {
+    'stab': 2.0,
+    'healer': 1.8,
+    'boon': 1.5,
+    'strip': 1.3,
+    'dps': 1.0,
+}
+
+# Fights below this similarity are never returned
+MIN_SIMILARITY = 0.3
+
+# Build rows below this Jaccard similarity of enemy spec sets are never returned
+MIN_SPEC_JACCARD = 0.3
+
+# Time decay: (maximum age in days, weight); older fights get TIME_WEIGHT_OLD
+TIME_WEIGHT_BUCKETS = ((7, 1.0), (30, 0.9), (60, 0.7), (90, 0.5))
+TIME_WEIGHT_OLD = 0.3
+TIME_WEIGHT_UNKNOWN = 0.8  # timestamp present but unparseable
+
+INITIAL_FIGHTS = 1024
+INITIAL_SPECS = 64
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def spec_weight(spec: str) -> float:
+    """Strategic weight of a spec in composition similarity"""
+    if spec in STAB_SPECS:
+        return ROLE_WEIGHTS['stab']
+    if spec in HEALER_SPECS:
+        return ROLE_WEIGHTS['healer']
+    if spec in BOON_SPECS:
+        return ROLE_WEIGHTS['boon']
+    if spec in STRIP_DPS_SPECS:
+        return ROLE_WEIGHTS['strip']
+    return ROLE_WEIGHTS['dps']
+
+
+def fight_context(fight: Mapping) -> str:
+    """Confirmed context of a stored fight, falling back to the detected one"""
+    return fight.get('context_confirmed') or fight.get('context_detected') or fight.get('context', 'unknown')
+
+
+def _grown(array: np.ndarray, used: int) -> np.ndarray:
+    """Copy of a 1-D array with twice the capacity, keeping its first `used` items"""
+    grown = np.zeros(max(2 * len(array), 16), dtype=array.dtype)
+    grown[:used] = array[:used]
+    return grown
+
+
+def _timestamp_seconds(fight: Mapping) -> float:
+    """
+    Naive seconds since the epoch of a fight's timestamp.
+    +inf for a missing timestamp (counts as recorded now), NaN when it can't be
+    compared with a naive datetime.now()
+    """
+    if 'timestamp' not in fight:
+        return np.inf
+    try:
+        return (datetime.fromisoformat(fight['timestamp']) - _EPOCH).total_seconds()
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class CompositionMatrix:
+    """
+    Dense fights x specs matrix of enemy compositions
+    
+    counts[spec, row] holds how many of a spec the fight's enemies had; rows follow
+    insertion order, which is the fights table order when built from it.
+    row_weight caches sum(weight * count) per fight, so a query only reads the
+    columns of the specs it contains.
+    """
+    
+    def __init__(self):
+        self.columns: Dict[str, int] = {}
+        self.weights = np.zeros(INITIAL_SPECS, dtype=np.float64)
+        self.counts = np.zeros((INITIAL_SPECS, INITIAL_FIGHTS), dtype=np.float32)
+        self.row_weight = np.zeros(INITIAL_FIGHTS, dtype=np.float64)
+        self.timestamps = np.zeros(INITIAL_FIGHTS, dtype=np.float64)
+        self.contexts = np.zeros(INITIAL_FIGHTS, dtype=np.int32)
+        self.doc_ids = np.zeros(INITIAL_FIGHTS, dtype=np.int64)
+        self.context_codes: Dict[str, int] = {}
+        self.rows_by_doc_id: Dict[int, int] = {}
+        self.rows = 0
+    
+    @classmethod
+    def from_documents(cls, documents: Iterable[Mapping]) -> 'CompositionMatrix':
+        """Build the matrix from stored fight documents (each with a doc_id)"""
+        matrix = cls()
+        for document in documents:
+            matrix.add(document.doc_id, document)
+        return matrix
+    
+    def __len__(self) -> int:
+        return self.rows
+    
+    def _column(self, spec: str) -> int:
+        """Column of a spec, adding it (and growing the spec axis) if new"""
+        column = self.columns.get(spec)
+        if column is None:
+            column = len(self.columns)
+            if column == len(self.weights):
+                self.weights = np.concatenate([self.weights, np.zeros_like(self.weights)])
+                self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)])
+            self.columns[spec] = column
+            self.weights[column] = spec_weight(spec)
+        return column
+    
+    def _context_code(self, context: str) -> int:
+        return self.context_codes.setdefault(context, len(self.context_codes))
+    
+    def _grow(self):
+        """Double the fight capacity"""
+        capacity = 2 * len(self.row_weight)
+        counts = np.zeros((len(self.weights), capacity), dtype=np.float32)
+        counts[:, :self.rows] = self.counts[:, :self.rows]
+        self.counts = counts
+        for name in ('row_weight', 'timestamps', 'contexts', 'doc_ids'):
+            setattr(self, name, _grown(getattr(self, name), self.rows))
+    
+    def add(self, doc_id: int, fight: Mapping):
+        """Append a stored fight document"""
+        if self.rows == len(self.row_weight):
+            self._grow()
+        row = self.rows
+        composition = fight.get('enemy_composition') or {}
+        for spec, count in composition.items():
+            column = self._column(spec)
+            self.counts[column, row] = count
+        self.row_weight[row] = sum(
+            self.weights[self.columns[spec]] * count for spec, count in composition.items()
+        )
+        self.timestamps[row] = _timestamp_seconds(fight)
+        self.contexts[row] = self._context_code(fight_context(fight))
+        self.doc_ids[row] = doc_id
+        self.rows_by_doc_id[doc_id] = row
+        self.rows += 1
+    
+    def set_context(self, doc_id: int, context: str):
+        """Follow a context change of an already indexed fight"""
+        row = self.rows_by_doc_id.get(doc_id)
+        if row is not None:
+            self.contexts[row] = self._context_code(context)
+    
+    def similarities(self, enemy_comp: Dict[str, int]) -> np.ndarray:
+        """
+        Role-weighted Manhattan similarity of every fight to a composition, in [0, 1].
+        
+        With D = sum(w * |a - q|) and max(a, q) = (a + q + |a - q|) / 2, the similarity
+        1 - D / (2 * sum(w * max(a, q))) becomes 1 - D / (W_a + W_q + D), where W_a is the
+        cached row weight. Specs the query lacks contribute w * a to D, so D starts at
+        W_a and only the query's own columns are corrected.
+        """
+        rows = self.rows
+        distance = self.row_weight[:rows].copy()
+        query_weight = 0.0
+        for spec, count in enemy_comp.items():
+            column = self.columns.get(spec)
+            weight = self.weights[column] if column is not None else spec_weight(spec)
+            query_weight += weight * count
+            if column is None:
+                distance += weight * count
+            else:
+                counts = self.counts[column, :rows].astype(np.float64)
+                distance += weight * (np.abs(counts - count) - counts)
+        total = self.row_weight[:rows] + query_weight + distance
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similarity = np.where(total > 0, 1.0 - distance / total, 0.0)
+        return np.clip(similarity, 0.0, 1.0)
+    
+    def time_weights(self, now: Optional[datetime] = None) -> np.ndarray:
+        """Recency weight of every fight, from its age in whole days"""
+        now = now or datetime.now()
+        days_old = np.floor(((now - _EPOCH).total_seconds() - self.timestamps[:self.rows]) / 86400)
+        weights = np.select(
+            [days_old <= max_days for max_days, _ in TIME_WEIGHT_BUCKETS],
+            [weight for _, weight in TIME_WEIGHT_BUCKETS],
+            TIME_WEIGHT_OLD,
+        )
+        return np.where(np.isnan(days_old), TIME_WEIGHT_UNKNOWN, weights)
+    
+    def most_similar(
+        self,
+        enemy_comp: Dict[str, int],
+        limit: int = 30,
+        context: Optional[str] = None,
+        time_decay: bool = True,
+        now: Optional[datetime] = None
+    ) -> List[int]:
+        """
+        Doc ids of the best fights by similarity x time weight, best first.
+        Fights below MIN_SIMILARITY or in another context are skipped; ties keep
+        insertion order.
+        """
+        if limit <= 0 or self.rows == 0:
+            return []
+        similarity = self.similarities(enemy_comp)
+        keep = similarity >= MIN_SIMILARITY
+        if context:
+            code = self.context_codes.get(context)
+            if code is None:
+                return []
+            keep &= self.contexts[:self.rows] == code
+        
+        rows = np.flatnonzero(keep)
+        scores = similarity[rows]
+        if time_decay:
+            scores = scores * self.time_weights(now)[rows]
+        
+        if len(rows) > limit:
+            # Everything above the limit-th score, then its ties in insertion order
+            kth = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+            selected = scores > kth
+            ties = np.flatnonzero(scores == kth)[:limit - int(selected.sum())]
+            selected[ties] = True
+            rows, scores = rows[selected], scores[selected]
+        
+        order = np.lexsort((rows, -scores))
+        return self.doc_ids[rows[order]].tolist()
+
+
+class BuildSpecIndex:
+    """
+    Inverted index from enemy spec to the build rows recorded against it
+    
+    postings[spec] holds the rows (in insertion order, so sorted) whose enemy
+    composition had that spec; spec_counts holds each row's number of enemy specs.
+    A row needs at least ceil(MIN_SPEC_JACCARD * |query|) of the query's specs to pass,
+    so it must appear in one of the shortest |query| - that + 1 posting lists: only
+    those are read to find candidates, the others are binary-searched for them.
+    """
+    
+    def __init__(self):
+        self.postings: Dict[str, np.ndarray] = {}
+        self.posting_sizes: Dict[str, int] = {}
+        self.spec_counts = np.zeros(INITIAL_FIGHTS, dtype=np.int32)
+        self.contexts = np.zeros(INITIAL_FIGHTS, dtype=np.int32)
+        self.doc_ids = np.zeros(INITIAL_FIGHTS, dtype=np.int64)
+        self.context_codes: Dict[str, int] = {}
+        self.rows = 0
+    
+    @classmethod
+    def from_documents(cls, documents: Iterable[Mapping]) -> 'BuildSpecIndex':
+        """Build the index from stored build rows (each with a doc_id)"""
+        index = cls()
+        for document in documents:
+            index.add(document.doc_id, document)
+        return index
+    
+    def __len__(self) -> int:
+        return self.rows
+    
+    def _posting(self, spec: str) -> np.ndarray:
+        """Filled part of a spec's posting list"""
+        return self.postings[spec][:self.posting_sizes[spec]]
+    
+    def add(self, doc_id: int, build: Mapping):
+        """Append a stored build row"""
+        if self.rows == len(self.doc_ids):
+            for name in ('spec_counts', 'contexts', 'doc_ids'):
+                setattr(self, name, _grown(getattr(self, name), self.rows))
+        row = self.rows
+        specs = (build.get('enemy_comp') or {}).keys()
+        for spec in specs:
+            size = self.posting_sizes.get(spec, 0)
+            if size == 0:
+                self.postings.setdefault(spec, np.zeros(16, dtype=np.int64))
+            elif size == len(self.postings[spec]):
+                self.postings[spec] = _grown(self.postings[spec], size)
+            self.postings[spec][size] = row
+            self.posting_sizes[spec] = size + 1
+        self.spec_counts[row] = len(specs)
+        self.contexts[row] = self.context_codes.setdefault(
+            build.get('context'), len(self.context_codes)
+        )
+        self.doc_ids[row] = doc_id
+        self.rows += 1
+    
+    def matching(self, enemy_specs: Iterable[str], context: Optional[str] = None) -> List[int]:
+        """
+        Doc ids, in insertion order, of the build rows whose enemy spec set has a
+        Jaccard similarity of at least MIN_SPEC_JACCARD with enemy_specs
+        (and whose context matches, when given)
+        """
+        query = set(enemy_specs)
+        if context:
+            code = self.context_codes.get(context)
+            if code is None:
+                return []
+        lists = sorted(
+            (self._posting(spec) for spec in query if self.posting_sizes.get(spec)), key=len
+        )
+        # Rows sharing no spec have a similarity of 0, so at least one shared spec is needed
+        min_shared = max(1, math.ceil(MIN_SPEC_JACCARD * len(query) - 1e-9))
+        if len(lists) < min_shared:
+            return []
+        
+        # A row is in each posting list at most once, so counts over the prefix lists are exact
+        prefix = len(lists) - min_shared + 1
+        candidates, shared = np.unique(np.concatenate(lists[:prefix]), return_counts=True)
+        if context:
+            in_context = self.contexts[candidates] == code
+            candidates, shared = candidates[in_context], shared[in_context]
+        
+        # Drop rows that can't pass even if they are in every remaining list
+        rest = lists[prefix:]
+        if rest:
+            best_shared = np.minimum(shared + len(rest), self.spec_counts[candidates])
+            possible = best_shared / (len(query) + self.spec_counts[candidates] - best_shared) >= MIN_SPEC_JACCARD
+            candidates, shared = candidates[possible], shared[possible]
+        for posting in rest:
+            positions = np.minimum(np.searchsorted(posting, candidates), len(posting) - 1)
+            shared += posting[positions] == candidates
+        
+        union = len(query) + self.spec_counts[candidates] - shared
+        keep = shared / union >= MIN_SPEC_JACCARD
+        return self.doc_ids[candidates[keep]].tolist()
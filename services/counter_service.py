@@ -13,10 +13,13 @@ from enum import Enum
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from tinydb import Query, TinyDB
+from tinydb import Query
 
 from counter_engine import CounterPickEngine
 from logger import get_logger
+from services.build_aggregates import BuildAggregateTable
+from services.composition_index import CompositionMatrix
+from services.fight_store import TableCache, open_fight_store
 
 logger = get_logger('counter_service')
 
@@ -141,11 +144,17 @@ class CounterService:
     Uses historical fight data and rule-based engine
     """
     
-    def __init__(self, db_path: Path = Path("data/fights.db")):
-        """Initialize counter service with TinyDB storage"""
-        db_path.parent.mkdir(parents=True, exist_ok=True)
+    def __init__(self, db_path: Path = Path("data/fights.db"), backend: str = "sqlite"):
+        """
+        Initialize counter service storage
         
-        self.db = TinyDB(str(db_path))
+        Args:
+            db_path: TinyDB file; the SQLite backend lives next to it (.sqlite3)
+                and imports it on first start
+            backend: "sqlite" (indexed, WAL), "log" (append-only record log)
+                or "tinydb" (single JSON file)
+        """
+        self.db = open_fight_store(db_path, backend)
         self.fights_table = self.db.table('fights')
         self.stats_table = self.db.table('stats')
         self.builds_table = self.db.table('builds')
@@ -154,15 +163,24 @@ class CounterService:
         self.feedback_table = self.db.table('feedback')
         self.settings_table = self.db.table('settings')
         
+        # Enemy compositions of all fights, built on first lookup, updated by this
+        # service's writes and rebuilt after any other write to the fights table
+        self._composition_matrix: TableCache[CompositionMatrix] = TableCache(
+            self.fights_table, CompositionMatrix.from_documents
+        )
+        # Per-build aggregates of all build rows, kept the same way against the builds table
+        self._build_aggregates: TableCache[BuildAggregateTable] = TableCache(
+            self.builds_table, BuildAggregateTable.from_documents
+        )
+        
         self.counter_engine = CounterPickEngine()
     
     def is_file_already_analyzed(self, filename: str, filesize: int) -> bool:
         """Check if a file with the same name and size has already been analyzed"""
         FileQuery = Query()
-        existing = self.analyzed_files_table.search(
+        return self.analyzed_files_table.contains(
             (FileQuery.filename == filename) & (FileQuery.filesize == filesize)
         )
-        return len(existing) > 0
     
     def mark_file_as_analyzed(self, filename: str, filesize: int, fight_id: str) -> None:
         """Mark a file as analyzed to prevent duplicate processing"""
@@ -201,8 +219,7 @@ class CounterService:
     def is_fight_duplicate(self, fingerprint: str) -> bool:
         """Check if a fight with this fingerprint already exists"""
         FpQuery = Query()
-        existing = self.fingerprints_table.search(FpQuery.fingerprint == fingerprint)
-        return len(existing) > 0
+        return self.fingerprints_table.contains(FpQuery.fingerprint == fingerprint)
     
     def mark_fight_fingerprint(self, fingerprint: str, fight_id: str) -> None:
         """Store a fight fingerprint to prevent duplicates"""
@@ -368,9 +385,13 @@ class CounterService:
             context_confirmed=context_confirmed
         )
         
-        self.fights_table.insert(record.to_dict())
+        document = record.to_dict()
+        with self._composition_matrix.writing() as matrix:
+            doc_id = self.fights_table.insert(document)
+            if matrix is not None:
+                matrix.add(doc_id, document)
         self._update_stats()
-        self._store_build_performance(ally_builds, enemy_comp, outcome, record.context)
+        self._store_build_performance(ally_builds, enemy_comp, outcome, record.context, fight_id)
         
         logger.info(f"Recorded fight {fight_id}: {outcome} [{record.context}] vs {list(enemy_comp.keys())[:3]}... ({len(ally_builds)} builds)")
         
@@ -386,9 +407,11 @@ class CounterService:
         ally_builds: List[dict],
         enemy_comp: Dict[str, int],
         outcome: str,
-        context: str = "unknown"
+        context: str = "unknown",
+        fight_id: Optional[str] = None
     ) -> None:
         """Store individual build performance against specific enemy compositions"""
+        rows = []
         for build in ally_builds:
             spec = build.get('elite_spec', build.get('profession', 'Unknown'))
             role = build.get('role', 'dps')
@@ -409,7 +432,8 @@ class CounterService:
             
             score = max(0, score - (deaths * 5000))
             
-            self.builds_table.insert({
+            rows.append({
+                'fight_id': fight_id,
                 'spec': spec,
                 'role': role,
                 'context': context,
@@ -426,6 +450,12 @@ class CounterService:
                 'boon_gen': build.get('boon_gen', {}),
                 'timestamp': datetime.now().isoformat()
             })
+        
+        # One write for the whole squad instead of one per build
+        with self._build_aggregates.writing() as aggregates:
+            self.builds_table.insert_multiple(rows)
+            if aggregates is not None:
+                aggregates.add_rows(rows)
     
     def _hash_composition(self, comp: Dict[str, int]) -> str:
         """Create a hash for an enemy composition for quick lookups"""
@@ -435,7 +465,7 @@ class CounterService:
     def _update_stats(self) -> None:
         """Update global stats"""
         total_fights = len(self.fights_table)
-        victories = len(self.fights_table.search(Query().outcome == 'victory'))
+        victories = self.fights_table.count(Query().outcome == 'victory')
         
         self.stats_table.truncate()
         self.stats_table.insert({
@@ -457,74 +487,6 @@ class CounterService:
             'last_updated': None
         }
     
-    def _calculate_composition_similarity(
-        self, 
-        comp1: Dict[str, int], 
-        comp2: Dict[str, int],
-        weight_by_role: bool = True
-    ) -> float:
-        """
-        Calcule la similarité entre deux compositions avec pondération optionnelle par rôle.
-        Utilise une distance de Manhattan pondérée, plus robuste que cosinus pour vecteurs creux.
-        
-        Args:
-            comp1: Première composition {spec: count}
-            comp2: Deuxième composition {spec: count}
-            weight_by_role: Appliquer les poids par importance stratégique
-        
-        Returns:
-            Score de similarité entre 0.0 (totalement différent) et 1.0 (identique)
-        """
-        from role_detector import STAB_SPECS, HEALER_SPECS, BOON_SPECS, STRIP_DPS_SPECS
-        
-        # Poids par importance stratégique (stab/heal > boon > strip > dps)
-        ROLE_WEIGHTS = {
-            'stab': 2.0,      # Stab providers sont critiques
-            'healer': 1.8,    # Healers aussi
-            'boon': 1.5,      # Boon providers importants
-            'strip': 1.3,     # Strip utile
-            'dps': 1.0        # DPS baseline
-        }
-        
-        def get_spec_weight(spec: str) -> float:
-            """Retourne le poids stratégique d'une spec"""
-            if not weight_by_role:
-                return 1.0
-            if spec in STAB_SPECS:
-                return ROLE_WEIGHTS['stab']
-            if spec in HEALER_SPECS:
-                return ROLE_WEIGHTS['healer']
-            if spec in BOON_SPECS:
-                return ROLE_WEIGHTS['boon']
-            if spec in STRIP_DPS_SPECS:
-                return ROLE_WEIGHTS['strip']
-            return ROLE_WEIGHTS['dps']
-        
-        # Toutes les specs présentes dans au moins une compo
-        all_specs = set(comp1.keys()) | set(comp2.keys())
-        
-        if not all_specs:
-            return 0.0
-        
-        # Distance Manhattan pondérée
-        total_distance = 0.0
-        total_weight = 0.0
-        
-        for spec in all_specs:
-            count1 = comp1.get(spec, 0)
-            count2 = comp2.get(spec, 0)
-            weight = get_spec_weight(spec)
-            
-            total_distance += abs(count1 - count2) * weight
-            total_weight += max(count1, count2) * weight
-        
-        # Normaliser : 1.0 = identique, 0.0 = totalement différent
-        if total_weight == 0:
-            return 0.0
-        
-        similarity = 1.0 - (total_distance / (2 * total_weight))
-        return max(0.0, min(1.0, similarity))
-    
     def _find_similar_fights(
         self,
         enemy_comp: Dict[str, int],
@@ -544,59 +506,29 @@ class CounterService:
         Returns:
             List of similar fights, sorted by relevance
         """
-        all_fights = self.fights_table.all()
-        
-        scored_fights = []
-        now = datetime.now()
-        
-        for fight in all_fights:
-            if context:
-                fight_context = fight.get('context_confirmed') or fight.get('context_detected') or fight.get('context', 'unknown')
-                if fight_context != context:
-                    continue
-            
-            fight_enemy_comp = fight.get('enemy_composition', {})
-            
-            # Utiliser la nouvelle méthode de similarité pondérée par rôle
-            similarity = self._calculate_composition_similarity(enemy_comp, fight_enemy_comp, weight_by_role=True)
-            
-            if similarity < 0.3:
-                continue
-            
-            # Facteur temporel : fights récents = plus de poids
-            time_weight = 1.0
-            if time_decay:
-                try:
-                    fight_time = datetime.fromisoformat(fight.get('timestamp', now.isoformat()))
-                    days_old = (now - fight_time).days
-                    
-                    # Décroissance exponentielle douce
-                    if days_old <= 7:
-                        time_weight = 1.0
-                    elif days_old <= 30:
-                        time_weight = 0.9
-                    elif days_old <= 60:
-                        time_weight = 0.7
-                    elif days_old <= 90:
-                        time_weight = 0.5
-                    else:
-                        time_weight = 0.3
-                except:
-                    time_weight = 0.8  # Fallback si pas de timestamp
-            
-            # Score final combiné
-            final_score = similarity * time_weight
-            
-            scored_fights.append({
-                'fight': fight,
-                'similarity': similarity,
-                'time_weight': time_weight,
-                'final_score': final_score
-            })
-        
-        # Trier par score final (similarité × temps)
-        scored_fights.sort(key=lambda x: x['final_score'], reverse=True)
-        return [sf['fight'] for sf in scored_fights[:limit]]
+        doc_ids = self._get_composition_matrix().most_similar(
+            enemy_comp, limit=limit, context=context, time_decay=time_decay
+        )
+        fights = {fight.doc_id: fight for fight in self.fights_table.get(doc_ids=doc_ids)}
+        return [fights[doc_id] for doc_id in doc_ids if doc_id in fights]
+    
+    def _get_composition_matrix(self) -> CompositionMatrix:
+        """In-memory enemy composition matrix of the fights table"""
+        return self._composition_matrix.get()
+    
+    def _get_build_aggregates(self) -> BuildAggregateTable:
+        """Per-build aggregates of the builds table"""
+        return self._build_aggregates.get()
+    
+    def confirm_fight_context(self, fight_id: str, context: str) -> None:
+        """Store the user-confirmed context of a recorded fight"""
+        with self._composition_matrix.writing() as matrix:
+            doc_ids = self.fights_table.update({'context_confirmed': context}, Query().fight_id == fight_id)
+            if matrix is not None:
+                for doc_id in doc_ids:
+                    matrix.set_context(doc_id, context)
+        # The fight's build rows move to the confirmed context; aggregates are rebuilt on next use
+        self.builds_table.update({'context': context}, Query().fight_id == fight_id)
     
     def _analyze_enemy_needs(self, enemy_comp: Dict[str, int]) -> Dict[str, float]:
         """
@@ -920,13 +852,11 @@ class CounterService:
         Find the best performing builds against a similar enemy composition
         Returns dict of {role: best_build_info} for each role
         """
-        all_builds = self.builds_table.all()
-        
-        if not all_builds:
+        # Aggregates of the rows sharing enough enemy specs to reach the 0.3 Jaccard threshold
+        build_stats = self._get_build_aggregates().matching(enemy_comp.keys(), context)
+        if not build_stats:
             return {}
         
-        enemy_specs = set(enemy_comp.keys())
-        
         enemy_hash = self._hash_composition(enemy_comp)
         Fq = Query()
         fb_rows = self.feedback_table.search(Fq.enemy_comp_hash == enemy_hash)
@@ -937,80 +867,23 @@ class CounterService:
         cfg = self.settings_table.all()
         feedback_weight = (cfg[0].get('feedback_weight', 0.0) if cfg else 0.0) or 0.0
         
-        build_stats = {}
-        winning_fight_comps = {}
-        
-        for build in all_builds:
-            if context and build.get('context') != context:
-                continue
-            
-            build_enemy_specs = set(build.get('enemy_comp', {}).keys())
-            
-            intersection = len(enemy_specs & build_enemy_specs)
-            union = len(enemy_specs | build_enemy_specs)
-            similarity = intersection / union if union > 0 else 0
-            
-            if similarity < 0.3:
-                continue
-            
-            spec = build.get('spec', 'Unknown')
-            role = build.get('role', 'dps')
-            key = (spec, role)
-            fight_id = build.get('fight_id', '')
-            
-            if key not in build_stats:
-                build_stats[key] = {
-                    'spec': spec,
-                    'role': role,
-                    'wins': 0,
-                    'total': 0,
-                    'scores': [],
-                    'avg_dps': [],
-                    'avg_healing': [],
-                    'avg_strips': [],
-                    'avg_cleanses': [],
-                    'counts_in_wins': []
-                }
-            
-            build_stats[key]['total'] += 1
-            build_stats[key]['scores'].append(build.get('performance_score', 0))
-            build_stats[key]['avg_dps'].append(build.get('dps', 0))
-            build_stats[key]['avg_healing'].append(build.get('healing', 0))
-            build_stats[key]['avg_strips'].append(build.get('boon_strips', 0))
-            build_stats[key]['avg_cleanses'].append(build.get('cleanses', 0))
-            
-            if build.get('outcome') == 'victory':
-                build_stats[key]['wins'] += 1
-                if fight_id:
-                    if fight_id not in winning_fight_comps:
-                        winning_fight_comps[fight_id] = {}
-                    if key not in winning_fight_comps[fight_id]:
-                        winning_fight_comps[fight_id][key] = 0
-                    winning_fight_comps[fight_id][key] += 1
-        
-        for fight_id, comp in winning_fight_comps.items():
-            for key, count in comp.items():
-                if key in build_stats:
-                    build_stats[key]['counts_in_wins'].append(count)
-        
         best_by_role = {}
         
         for key, stats in build_stats.items():
             spec, role = key
-            total = stats['total']
+            total = stats.count
             
             if total < 2:
                 continue
             
-            win_rate = round((stats['wins'] / total) * 100, 1)
-            avg_score = sum(stats['scores']) / len(stats['scores']) if stats['scores'] else 0
+            win_rate = round((stats.wins / total) * 100, 1)
+            avg_score = stats.mean('performance_score')
             
             if fb_rate is not None and feedback_weight > 0:
                 factor = 1 + feedback_weight * (fb_rate - 0.5)
                 win_rate = round(max(0, min(100, win_rate * factor)), 1)
             
-            counts = stats.get('counts_in_wins', [])
-            recommended_count = round(sum(counts) / len(counts)) if counts else 1
+            recommended_count = round(stats.win_fight_builds / stats.win_fights) if stats.win_fights else 1
             recommended_count = max(1, recommended_count)
             
             build_info = {
@@ -1019,10 +892,10 @@ class CounterService:
                 'win_rate': win_rate,
                 'fights_played': total,
                 'avg_score': round(avg_score, 0),
-                'avg_dps': round(sum(stats['avg_dps']) / len(stats['avg_dps']), 0) if stats['avg_dps'] else 0,
-                'avg_healing': round(sum(stats['avg_healing']) / len(stats['avg_healing']), 0) if stats['avg_healing'] else 0,
-                'avg_strips': round(sum(stats['avg_strips']) / len(stats['avg_strips']), 1) if stats['avg_strips'] else 0,
-                'avg_cleanses': round(sum(stats['avg_cleanses']) / len(stats['avg_cleanses']), 1) if stats['avg_cleanses'] else 0,
+                'avg_dps': round(stats.mean('dps'), 0),
+                'avg_healing': round(stats.mean('healing'), 0),
+                'avg_strips': round(stats.mean('boon_strips'), 1),
+                'avg_cleanses': round(stats.mean('cleanses'), 1),
                 'recommended_count': recommended_count
             }
             
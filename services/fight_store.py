@@ -0,0 +1,800 @@
+"""
+Fight store - Storage backends behind CounterService
+TinyDB keeps every table in one JSON file; SQLite (WAL) keeps one indexed table per record kind;
+the record log appends every write to JSONL segments compacted in the background
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, Iterable, Iterator, List, Mapping, Optional, Tuple, TypeVar, Union
+
+from tinydb import TinyDB
+from tinydb.queries import QueryLike
+from tinydb.table import Document, Table
+
+from logger import get_logger
+
+logger = get_logger('fight_store')
+
+# Document fields copied into real columns, so conditions on them run on an index
+TABLE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    'fights': ('fight_id', 'timestamp', 'outcome', 'context_detected', 'context_confirmed'),
+    'builds': ('spec', 'role', 'context', 'enemy_comp_hash', 'outcome', 'timestamp'),
+    'analyzed_files': ('filename', 'filesize'),
+    'fight_fingerprints': ('fingerprint', 'created_at'),
+    'feedback': ('enemy_comp_hash', 'context'),
+}
+
+TABLE_INDEXES: Dict[str, Tuple[Tuple[str, ...], ...]] = {
+    'fights': (('fight_id',), ('timestamp',), ('outcome',), ('context_detected',), ('context_confirmed',)),
+    'builds': (('spec', 'role'), ('context',), ('enemy_comp_hash',), ('timestamp',)),
+    'analyzed_files': (('filename', 'filesize'),),
+    'fight_fingerprints': (('fingerprint',), ('created_at',)),
+    'feedback': (('enemy_comp_hash',),),
+}
+
+# TinyDB query operators with a direct SQL equivalent
+SQL_OPERATORS = {'==': '=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+# Column values SQLite can compare like Python does
+SQL_SCALARS = (str, int, float, type(None))
+
+# Record log layout and batching
+LOG_SEGMENT_SUFFIX = ".seg.jsonl"
+LOG_SNAPSHOT_SUFFIX = ".snapshot.jsonl"
+LOG_SEGMENT_BYTES = 4 * 1024 * 1024
+LOG_COMPACT_AFTER = 4  # sealed segments before a snapshot is written
+LOG_SYNC_INTERVAL = 0.05  # seconds between batched fsyncs
+
+
+def read_tinydb_tables(path: Path) -> Optional[Dict[str, List[Document]]]:
+    """Every table of a TinyDB file (empty if missing, None if unreadable)"""
+    if not path.exists():
+        return {}
+    try:
+        legacy = TinyDB(str(path), access_mode='r')
+        tables = {name: legacy.table(name).all() for name in legacy.tables()}
+        legacy.close()
+    except (ValueError, OSError) as e:
+        logger.error(f"Could not read {path} for migration: {e}")
+        return None
+    return tables
+
+
+class SQLiteTable:
+    """
+    TinyDB-compatible table stored in SQLite: one row per document, the JSON
+    body plus a copy of the fields in TABLE_COLUMNS as indexed columns.
+    
+    Conditions are TinyDB queries. Comparisons on indexed fields (and `&` of
+    them) become a WHERE clause; the query itself is still applied to the rows
+    found, so any other condition gives the same result as TinyDB, just
+    without the index.
+    """
+    
+    def __init__(self, store: "SQLiteStore", name: str):
+        self.store = store
+        self.name = name
+        self.columns = TABLE_COLUMNS.get(name, ())
+        self._sql_name = '"' + name.replace('"', '""') + '"'
+        
+        columns = "".join(f', "{column}"' for column in self.columns)
+        with store.lock, store.conn:
+            store.conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {self._sql_name} '
+                f'(doc_id INTEGER PRIMARY KEY AUTOINCREMENT, doc TEXT NOT NULL{columns})'
+            )
+            for index in TABLE_INDEXES.get(name, ()):
+                index_name = '"' + f"ix_{name}_{'_'.join(index)}".replace('"', '""') + '"'
+                fields = ", ".join(f'"{column}"' for column in index)
+                store.conn.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {self._sql_name} ({fields})')
+    
+    def _row_values(self, document: Mapping) -> List[Any]:
+        """JSON body and indexed column values of a document"""
+        values = [json.dumps(document, ensure_ascii=False)]
+        for column in self.columns:
+            value = document.get(column)
+            values.append(value if isinstance(value, SQL_SCALARS) else None)
+        return values
+    
+    def _where(self, cond: Optional[QueryLike]) -> Tuple[str, List[Any], bool]:
+        """
+        SQL filter for a TinyDB query: (clause, parameters, exact). `exact` is
+        True when the clause alone selects exactly the matching documents.
+        """
+        if cond is None:
+            return "", [], True
+        
+        def translate(query_hash) -> Optional[Tuple[str, Any]]:
+            if (isinstance(query_hash, tuple) and len(query_hash) == 3 and query_hash[0] in SQL_OPERATORS
+                    and isinstance(query_hash[1], tuple) and len(query_hash[1]) == 1
+                    and query_hash[1][0] in self.columns
+                    and isinstance(query_hash[2], SQL_SCALARS) and query_hash[2] is not None):
+                return f'"{query_hash[1][0]}" {SQL_OPERATORS[query_hash[0]]} ?', query_hash[2]
+            return None
+        
+        def conjuncts(query_hash) -> List[Any]:
+            if isinstance(query_hash, tuple) and query_hash[:1] == ('and',):
+                return [part for nested in query_hash[1] for part in conjuncts(nested)]
+            return [query_hash]
+        
+        clauses, params, exact = [], [], True
+        for part in conjuncts(getattr(cond, '_hash', None)):
+            translated = translate(part)
+            if translated is None:
+                exact = False
+            else:
+                clauses.append(translated[0])
+                params.append(translated[1])
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params, exact
+    
+    def _select(self, cond: Optional[QueryLike] = None, doc_ids: Optional[Iterable[int]] = None) -> List[Document]:
+        """Documents matching a condition and/or in a list of ids"""
+        where, params, exact = self._where(cond)
+        if doc_ids is not None:
+            # One JSON parameter instead of one per id, so long id lists stay under SQLite's variable limit
+            id_clause = "doc_id IN (SELECT value FROM json_each(?))"
+            where = (where + " AND " if where else " WHERE ") + id_clause
+            params = params + [json.dumps([int(doc_id) for doc_id in doc_ids])]
+        
+        with self.store.lock:
+            rows = self.store.conn.execute(
+                f'SELECT doc_id, doc FROM {self._sql_name}{where} ORDER BY doc_id', params
+            ).fetchall()
+        documents = [Document(json.loads(doc), doc_id) for doc_id, doc in rows]
+        if not exact:
+            documents = [document for document in documents if cond(document)]
+        return documents
+    
+    def all(self) -> List[Document]:
+        return self._select()
+    
+    def search(self, cond: QueryLike) -> List[Document]:
+        return self._select(cond)
+    
+    def get(self, cond: Optional[QueryLike] = None, doc_id: Optional[int] = None,
+            doc_ids: Optional[List[int]] = None) -> Union[Document, List[Document], None]:
+        if doc_ids is not None:
+            return self._select(cond, doc_ids)
+        documents = self._select(cond, None if doc_id is None else [doc_id])
+        return documents[0] if documents else None
+    
+    def contains(self, cond: QueryLike) -> bool:
+        return self.get(cond) is not None
+    
+    def count(self, cond: QueryLike) -> int:
+        where, params, exact = self._where(cond)
+        if not exact:
+            return len(self._select(cond))
+        with self.store.lock:
+            return self.store.conn.execute(f'SELECT COUNT(*) FROM {self._sql_name}{where}', params).fetchone()[0]
+    
+    def insert(self, document: Mapping) -> int:
+        return self.insert_multiple([document])[0]
+    
+    def insert_multiple(self, documents: Iterable[Mapping]) -> List[int]:
+        """Insert documents in one transaction; Documents keep their doc_id"""
+        with self.store.lock, self.store.conn:
+            return self._insert_rows(documents)
+    
+    def _insert_rows(self, documents: Iterable[Mapping]) -> List[int]:
+        """Insert documents in the caller's transaction"""
+        placeholders = ", ".join("?" * (len(self.columns) + 2))
+        columns = "".join(f', "{column}"' for column in self.columns)
+        doc_ids = []
+        for document in documents:
+            cursor = self.store.conn.execute(
+                f'INSERT INTO {self._sql_name} (doc_id, doc{columns}) VALUES ({placeholders})',
+                [getattr(document, 'doc_id', None)] + self._row_values(document),
+            )
+            doc_ids.append(cursor.lastrowid)
+        if doc_ids:
+            self.store.wrote(self.name)
+        return doc_ids
+    
+    def update(self, fields: Union[Mapping, Callable[[Dict], None]], cond: Optional[QueryLike] = None,
+               doc_ids: Optional[Iterable[int]] = None) -> List[int]:
+        """Update matching documents (every document without cond or doc_ids) with a dict or a callable"""
+        assignments = ", ".join(["doc = ?"] + [f'"{column}" = ?' for column in self.columns])
+        updated = []
+        # Select under the write lock too, so a concurrent update can't slip in between
+        with self.store.lock, self.store.conn:
+            for document in self._select(cond, doc_ids):
+                if callable(fields):
+                    fields(document)
+                else:
+                    document.update(fields)
+                self.store.conn.execute(
+                    f'UPDATE {self._sql_name} SET {assignments} WHERE doc_id = ?',
+                    self._row_values(document) + [document.doc_id],
+                )
+                updated.append(document.doc_id)
+            if updated:
+                self.store.wrote(self.name)
+        return updated
+    
+    def remove(self, cond: Optional[QueryLike] = None, doc_ids: Optional[Iterable[int]] = None) -> List[int]:
+        """Remove matching documents and return their ids"""
+        if cond is None and doc_ids is None:
+            raise RuntimeError("Use truncate() to remove all documents")
+        with self.store.lock, self.store.conn:
+            removed = [document.doc_id for document in self._select(cond, doc_ids)]
+            if removed:
+                self.store.conn.executemany(f'DELETE FROM {self._sql_name} WHERE doc_id = ?',
+                                            [(doc_id,) for doc_id in removed])
+                self.store.wrote(self.name)
+        return removed
+    
+    def truncate(self) -> None:
+        with self.store.lock, self.store.conn:
+            self.store.conn.execute(f'DELETE FROM {self._sql_name}')
+            self.store.wrote(self.name)
+    
+    def version(self) -> Tuple[int, int]:
+        """
+        (commits by other connections, writes to this table through this store):
+        any change to the table changes it
+        """
+        with self.store.lock:
+            data_version = self.store.conn.execute("PRAGMA data_version").fetchone()[0]
+            return data_version, self.store.writes.get(self.name, 0)
+    
+    def __len__(self) -> int:
+        with self.store.lock:
+            return self.store.conn.execute(f'SELECT COUNT(*) FROM {self._sql_name}').fetchone()[0]
+    
+    def __iter__(self) -> Iterator[Document]:
+        return iter(self.all())
+
+
+class SQLiteStore:
+    """
+    SQLite database in WAL mode: readers don't block the writer and each insert
+    appends to the log instead of rewriting a JSON file. One connection is
+    shared by all threads behind a lock.
+    """
+    
+    def __init__(self, path: Path, migrate_from: Optional[Path] = None):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._tables: Dict[str, SQLiteTable] = {}
+        self.writes: Dict[str, int] = {}
+        
+        if migrate_from is not None:
+            self.migrate_from_tinydb(Path(migrate_from))
+    
+    def table(self, name: str) -> SQLiteTable:
+        if name not in self._tables:
+            self._tables[name] = SQLiteTable(self, name)
+        return self._tables[name]
+    
+    def wrote(self, name: str) -> None:
+        """Count a write to a table (caller holds the lock)"""
+        self.writes[name] = self.writes.get(name, 0) + 1
+    
+    def _meta(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def migrate_from_tinydb(self, path: Path) -> int:
+        """
+        Copy every table of a TinyDB file into this store, once: the first call
+        records the import even when there is nothing to copy, so later calls
+        (and restarts) are no-ops. The TinyDB file is left untouched.
+        
+        Raises RuntimeError rather than mixing documents into a table that
+        already has some. Returns the number of documents copied.
+        """
+        if self._meta('migrated_from') is not None:
+            return 0
+        
+        tables = read_tinydb_tables(path)
+        if tables is None:
+            # Unreadable: leave the marker unset so the next open retries
+            return 0
+        
+        targets = {name: self.table(name) for name, documents in tables.items() if documents}
+        occupied = sorted(name for name, table in targets.items() if len(table))
+        if occupied:
+            raise RuntimeError(
+                f"Refusing to import {path} into non-empty tables of {self.path}: {', '.join(occupied)}"
+            )
+        
+        copied = 0
+        with self.lock, self.conn:
+            for name, table in targets.items():
+                copied += len(table._insert_rows(tables[name]))
+            self.conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('migrated_from', ?)",
+                              (str(path),))
+        if copied:
+            logger.info(f"Migrated {copied} documents from {path} to {self.path}")
+        return copied
+    
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+class RecordLogTable:
+    """
+    TinyDB-compatible table of a RecordLogStore. Documents live in memory as
+    their JSON text (reads decode a fresh copy, like TinyDB); every write is
+    one appended record.
+    """
+    
+    def __init__(self, store: "RecordLogStore", name: str):
+        self.store = store
+        self.name = name
+    
+    @property
+    def _docs(self) -> Dict[int, str]:
+        return self.store.tables.setdefault(self.name, {})
+    
+    def _select(self, cond: Optional[QueryLike] = None, doc_ids: Optional[Iterable[int]] = None) -> List[Document]:
+        """Documents matching a condition and/or in a list of ids, in id order"""
+        with self.store.lock:
+            docs = self._docs
+            if doc_ids is None:
+                items = list(docs.items())
+            else:
+                items = [(doc_id, docs[doc_id]) for doc_id in sorted(set(doc_ids)) if doc_id in docs]
+        documents = [Document(json.loads(doc), doc_id) for doc_id, doc in items]
+        if cond is not None:
+            documents = [document for document in documents if cond(document)]
+        return documents
+    
+    def all(self) -> List[Document]:
+        return self._select()
+    
+    def search(self, cond: QueryLike) -> List[Document]:
+        return self._select(cond)
+    
+    def get(self, cond: Optional[QueryLike] = None, doc_id: Optional[int] = None,
+            doc_ids: Optional[List[int]] = None) -> Union[Document, List[Document], None]:
+        if doc_ids is not None:
+            return self._select(cond, doc_ids)
+        documents = self._select(cond, None if doc_id is None else [doc_id])
+        return documents[0] if documents else None
+    
+    def contains(self, cond: QueryLike) -> bool:
+        return self.get(cond) is not None
+    
+    def count(self, cond: QueryLike) -> int:
+        return len(self._select(cond))
+    
+    def insert(self, document: Mapping) -> int:
+        return self.insert_multiple([document])[0]
+    
+    def insert_multiple(self, documents: Iterable[Mapping]) -> List[int]:
+        """Append documents as one batch of records; Documents keep their doc_id"""
+        with self.store.lock:
+            next_id = self.store.next_ids.get(self.name, 1)
+            records, doc_ids = [], []
+            for document in documents:
+                doc_id = getattr(document, 'doc_id', None) or next_id
+                next_id = max(next_id, doc_id + 1)
+                records.append((doc_id, json.dumps(document, ensure_ascii=False)))
+                doc_ids.append(doc_id)
+            self.store.append([self.store.put_record(self.name, doc_id, doc) for doc_id, doc in records])
+            self._docs.update(records)
+            self.store.next_ids[self.name] = next_id
+            if records:
+                self.store.wrote(self.name)
+        return doc_ids
+    
+    def update(self, fields: Union[Mapping, Callable[[Dict], None]], cond: Optional[QueryLike] = None,
+               doc_ids: Optional[Iterable[int]] = None) -> List[int]:
+        """Update matching documents (every document without cond or doc_ids) with a dict or a callable"""
+        with self.store.lock:
+            records = []
+            for document in self._select(cond, doc_ids):
+                if callable(fields):
+                    fields(document)
+                else:
+                    document.update(fields)
+                records.append((document.doc_id, json.dumps(document, ensure_ascii=False)))
+            self.store.append([self.store.put_record(self.name, doc_id, doc) for doc_id, doc in records])
+            self._docs.update(records)
+            if records:
+                self.store.wrote(self.name)
+        return [doc_id for doc_id, _ in records]
+    
+    def remove(self, cond: Optional[QueryLike] = None, doc_ids: Optional[Iterable[int]] = None) -> List[int]:
+        """Remove matching documents and return their ids"""
+        if cond is None and doc_ids is None:
+            raise RuntimeError("Use truncate() to remove all documents")
+        with self.store.lock:
+            removed = [document.doc_id for document in self._select(cond, doc_ids)]
+            self.store.append([json.dumps({'t': self.name, 'op': 'del', 'id': doc_id}) for doc_id in removed])
+            for doc_id in removed:
+                del self._docs[doc_id]
+            if removed:
+                self.store.wrote(self.name)
+        return removed
+    
+    def truncate(self) -> None:
+        with self.store.lock:
+            self.store.append([json.dumps({'t': self.name, 'op': 'truncate'})])
+            self._docs.clear()
+            self.store.next_ids.pop(self.name, None)
+            self.store.wrote(self.name)
+    
+    def version(self) -> Tuple[int, int]:
+        """(0, writes to this table): the log has a single writer, this store"""
+        with self.store.lock:
+            return 0, self.store.writes.get(self.name, 0)
+    
+    def __len__(self) -> int:
+        with self.store.lock:
+            return len(self._docs)
+    
+    def __iter__(self) -> Iterator[Document]:
+        return iter(self.all())
+
+
+class RecordLogStore:
+    """
+    Append-only record log: every write appends JSON lines to the current
+    segment, so ingest cost doesn't depend on the database size.
+    
+    - Segments (<seq>.seg.jsonl) roll over at segment_bytes.
+    - Appends are flushed to the OS at once and fsynced in batches by a
+      background thread every sync_interval seconds (group commit); flush()
+      forces it. A torn last line after a crash is ignored on load.
+    - Once compact_after segments are sealed, a background thread writes the
+      state as of the last sealed segment to <seq>.snapshot.jsonl and drops
+      the segments and snapshots it covers. Loading replays the newest
+      snapshot, then the segments after it.
+    """
+    
+    def __init__(self, path: Path, migrate_from: Optional[Path] = None, segment_bytes: int = LOG_SEGMENT_BYTES,
+                 compact_after: int = LOG_COMPACT_AFTER, sync_interval: float = LOG_SYNC_INTERVAL):
+        self.path = Path(path)
+        new_store = not self.path.exists()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.compact_after = compact_after
+        self.sync_interval = sync_interval
+        self.lock = threading.RLock()
+        self.tables: Dict[str, Dict[int, str]] = {}
+        self._tables: Dict[str, RecordLogTable] = {}
+        # Next doc id per table (like TinyDB: ids of removed documents aren't reused until reopened)
+        self.next_ids: Dict[str, int] = {}
+        self.writes: Dict[str, int] = {}
+        
+        self.seq = self._load()
+        self._sealed = len(self._files(LOG_SEGMENT_SUFFIX))
+        self._segment = self._open_segment(self.seq + 1)
+        self._dirty = False
+        self._closed = False
+        self._compactor: Optional[threading.Thread] = None
+        
+        self._sync_event = threading.Event()
+        self._syncer = threading.Thread(target=self._sync_loop, name="fight-log-sync", daemon=True)
+        self._syncer.start()
+        
+        if new_store and migrate_from is not None:
+            self.migrate_from_tinydb(Path(migrate_from))
+    
+    def table(self, name: str) -> RecordLogTable:
+        if name not in self._tables:
+            self._tables[name] = RecordLogTable(self, name)
+        return self._tables[name]
+    
+    def wrote(self, name: str) -> None:
+        """Count a write to a table (caller holds the lock)"""
+        self.writes[name] = self.writes.get(name, 0) + 1
+    
+    @staticmethod
+    def put_record(table: str, doc_id: int, doc: str) -> str:
+        """Record line storing a document (its JSON text is embedded as is)"""
+        return f'{{"t": {json.dumps(table)}, "op": "put", "id": {doc_id}, "doc": {doc}}}'
+    
+    # -- files --------------------------------------------------------------
+    
+    def _files(self, suffix: str) -> List[Tuple[int, Path]]:
+        """(seq, path) of the segment or snapshot files, oldest first"""
+        files = []
+        for path in self.path.glob(f"*{suffix}"):
+            try:
+                files.append((int(path.name[:-len(suffix)]), path))
+            except ValueError:
+                continue
+        return sorted(files)
+    
+    def _open_segment(self, seq: int):
+        self.seq = seq
+        return open(self.path / f"{seq:08d}{LOG_SEGMENT_SUFFIX}", 'a', encoding='utf-8')
+    
+    def _load(self) -> int:
+        """Replay the newest snapshot and later segments, return the last seq seen"""
+        snapshots = self._files(LOG_SNAPSHOT_SUFFIX)
+        last = 0
+        if snapshots:
+            last, snapshot = snapshots[-1]
+            self._replay(snapshot, tolerate_torn_tail=False)
+        segments = [(seq, path) for seq, path in self._files(LOG_SEGMENT_SUFFIX) if seq > last]
+        for seq, path in segments:
+            self._replay(path, tolerate_torn_tail=True)
+            last = seq
+        self.next_ids = {name: max(docs, default=0) + 1 for name, docs in self.tables.items()}
+        return last
+    
+    def _replay(self, path: Path, tolerate_torn_tail: bool):
+        """Apply every record of a file to the in-memory tables"""
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().split('\n')
+        for i, line in enumerate(lines):
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                if tolerate_torn_tail and i == len(lines) - 1:
+                    logger.warning(f"Ignoring torn record at the end of {path.name}")
+                else:
+                    logger.error(f"Skipping corrupt record {i + 1} in {path.name}")
+                continue
+            docs = self.tables.setdefault(record['t'], {})
+            if record['op'] == 'put':
+                docs[record['id']] = json.dumps(record['doc'], ensure_ascii=False)
+            elif record['op'] == 'del':
+                docs.pop(record['id'], None)
+            elif record['op'] == 'truncate':
+                docs.clear()
+    
+    # -- writes -------------------------------------------------------------
+    
+    def append(self, lines: List[str]):
+        """
+        Append records (caller holds the lock and applies them to `tables` next).
+        A full segment is rolled before writing, once its records are all applied.
+        """
+        if not lines:
+            return
+        if self._closed:
+            raise RuntimeError("Record log is closed")
+        if self._segment.tell() >= self.segment_bytes:
+            self._roll()
+        self._segment.write("\n".join(lines) + "\n")
+        self._segment.flush()
+        self._dirty = True
+    
+    def _roll(self):
+        """Seal the current segment and start the next one"""
+        self._sync()
+        self._segment.close()
+        self._sealed += 1
+        sealed_seq = self.seq
+        self._segment = self._open_segment(self.seq + 1)
+        
+        if self._sealed >= self.compact_after and (self._compactor is None or not self._compactor.is_alive()):
+            # Documents are immutable strings: a shallow copy is a consistent view
+            state = {name: dict(docs) for name, docs in self.tables.items()}
+            self._compactor = threading.Thread(target=self._compact, args=(sealed_seq, state),
+                                               name="fight-log-compact", daemon=True)
+            self._compactor.start()
+    
+    def _compact(self, seq: int, state: Dict[str, Dict[int, str]]):
+        """Write a snapshot covering segments <= seq, then drop what it replaces"""
+        final = self.path / f"{seq:08d}{LOG_SNAPSHOT_SUFFIX}"
+        tmp = final.with_name(final.name + ".tmp")
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for name, docs in state.items():
+                    for doc_id in sorted(docs):
+                        f.write(self.put_record(name, doc_id, docs[doc_id]) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, final)
+            self._fsync_directory()
+        except OSError as e:
+            logger.error(f"Record log compaction failed: {e}")
+            tmp.unlink(missing_ok=True)
+            return
+        
+        with self.lock:
+            for old_seq, path in self._files(LOG_SEGMENT_SUFFIX):
+                if old_seq <= seq:
+                    path.unlink(missing_ok=True)
+                    self._sealed -= 1
+            for old_seq, path in self._files(LOG_SNAPSHOT_SUFFIX):
+                if old_seq < seq:
+                    path.unlink(missing_ok=True)
+        logger.info(f"Compacted record log into {final.name}")
+    
+    def _fsync_directory(self):
+        """Persist renames and new files in the log directory (no-op where unsupported)"""
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+    
+    def _sync(self):
+        """fsync the current segment if anything was appended since the last sync (caller holds the lock)"""
+        if self._dirty:
+            os.fsync(self._segment.fileno())
+            self._dirty = False
+    
+    def _sync_loop(self):
+        while not self._sync_event.wait(self.sync_interval):
+            with self.lock:
+                if not self._closed:
+                    self._sync()
+    
+    def flush(self):
+        """Make every append so far durable"""
+        with self.lock:
+            self._sync()
+    
+    def wait_for_compaction(self):
+        """Block until a running compaction finishes"""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+    
+    def migrate_from_tinydb(self, path: Path) -> int:
+        """Copy every table of a TinyDB file into a new log; returns the number of documents copied"""
+        tables = read_tinydb_tables(path) or {}
+        copied = sum(len(self.table(name).insert_multiple(documents)) for name, documents in tables.items())
+        self.flush()
+        if copied:
+            logger.info(f"Migrated {copied} documents from {path} to {self.path}")
+        return copied
+    
+    def close(self) -> None:
+        self._sync_event.set()
+        self._syncer.join()
+        self.wait_for_compaction()
+        with self.lock:
+            if not self._closed:
+                self._sync()
+                self._segment.close()
+                self._closed = True
+
+
+class TinyDBTable(Table):
+    """TinyDB table that reports its writes to its store (every write goes through _update_table)"""
+    
+    def __init__(self, storage, name: str, store: "TinyDBStore", **kwargs):
+        super().__init__(storage, name, **kwargs)
+        self.store = store
+    
+    def _update_table(self, updater: Callable[[Dict[int, Mapping]], None]):
+        super()._update_table(updater)
+        self.store.wrote(self.name)
+    
+    def version(self) -> Tuple[int, int]:
+        """(changes of the file by others, writes to this table through this store)"""
+        return self.store.external_version(), self.store.writes.get(self.name, 0)
+
+
+class TinyDBStore:
+    """Legacy backend: every table in one TinyDB JSON file"""
+    
+    def __init__(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.db = TinyDB(str(path))
+        self.db.table_class = TinyDBTable
+        self.writes: Dict[str, int] = {}
+        # File state after our last write; any other state means someone else wrote
+        self._own_state = self._file_state()
+        self._external = 0
+    
+    def table(self, name: str) -> TinyDBTable:
+        return self.db.table(name, store=self)
+    
+    def _file_state(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def wrote(self, name: str) -> None:
+        self.writes[name] = self.writes.get(name, 0) + 1
+        self._own_state = self._file_state()
+    
+    def external_version(self) -> int:
+        """Number of times the file was found changed by another writer"""
+        state = self._file_state()
+        if state != self._own_state:
+            self._external += 1
+            self._own_state = state
+        return self._external
+    
+    def close(self) -> None:
+        self.db.close()
+
+
+T = TypeVar('T')
+
+
+class TableCache(Generic[T]):
+    """
+    In-memory view of a store table (an index, aggregates) that follows the table
+    
+    The view is built from table.all() on first use and rebuilt whenever the
+    table's version() moved since: writes by other code, other table objects
+    or other processes. The owner's own writes go through writing(), which
+    hands out the view to update in place instead of rebuilding it.
+    """
+    
+    def __init__(self, table, build: Callable[[List[Document]], T]):
+        self.table = table
+        self.build = build
+        self.value: Optional[T] = None
+        self.version: Optional[Tuple[int, int]] = None
+    
+    def get(self) -> T:
+        """The view, rebuilt first if the table changed"""
+        # Read the version first: a write racing the rebuild only causes another rebuild
+        version = self.table.version()
+        if self.value is None or version != self.version:
+            self.value = self.build(self.table.all())
+            self.version = version
+        return self.value
+    
+    def invalidate(self) -> None:
+        self.value = None
+        self.version = None
+    
+    @contextmanager
+    def writing(self) -> Iterator[Optional[T]]:
+        """
+        Wrap one write of the owner to the table. Yields the view to apply the
+        write to, or None when there is no current view (it is rebuilt on next
+        use). If anything else wrote to the table meanwhile the view is dropped.
+        """
+        before = self.table.version()
+        current = self.value if before == self.version else None
+        if current is None:
+            self.invalidate()
+        try:
+            yield current
+        except BaseException:
+            self.invalidate()
+            raise
+        after = self.table.version()
+        if current is not None and after[0] == before[0] and after[1] - before[1] <= 1:
+            self.version = after
+        else:
+            self.invalidate()
+
+
+def open_fight_store(db_path: Path, backend: str = "sqlite") -> Union[SQLiteStore, RecordLogStore, TinyDBStore]:
+    """
+    Open the CounterService store for a TinyDB path (data/fights.db).
+    
+    "sqlite" uses the same path with a .sqlite3 suffix and "log" a .log
+    directory of record segments; both import the TinyDB file on first open.
+    "tinydb" uses the TinyDB file itself.
+    """
+    db_path = Path(db_path)
+    if backend == "sqlite":
+        return SQLiteStore(db_path.with_suffix(".sqlite3"), migrate_from=db_path)
+    if backend == "log":
+        return RecordLogStore(db_path.with_suffix(".log"), migrate_from=db_path)
+    if backend == "tinydb":
+        return TinyDBStore(db_path)
+    raise ValueError(f"Unknown fight store backend: {backend}")
@@ -0,0 +1,149 @@
+"""
+Parse cache - Content-addressed on-disk cache of offline parse results
+Re-uploads of the same log skip the EVTC decode entirely
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from parser import PARSER_VERSION
+from logger import get_logger
+
+logger = get_logger('parse_cache')
+
+CACHE_DIR = Path("data/parse_cache")
+MAX_CACHE_BYTES = 256 * 1024 * 1024  # 256MB of compressed entries
+ENTRY_SUFFIX = ".json.z"
+
+
+def content_key(data: bytes) -> str:
+    """Cache key of an upload: hash of its raw bytes (name and size don't matter)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ParseCache:
+    """
+    Size-bounded LRU cache of players_data dicts, keyed by upload content.
+    
+    Entries are zlib-compressed JSON files under <root>/<version>/, so bumping
+    PARSER_VERSION makes every older entry unreachable; those directories are
+    removed on startup. Recency is the file mtime, refreshed on every hit.
+    """
+    
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES,
+                 version: str = PARSER_VERSION):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.version = version
+        self.directory = self.root / version
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._total = 0
+        
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._drop_stale_versions()
+        self._load_index()
+    
+    def _drop_stale_versions(self):
+        """Remove entries written by other parser versions"""
+        for child in self.root.iterdir():
+            if child.is_dir() and child.name != self.version:
+                shutil.rmtree(child, ignore_errors=True)
+                logger.info(f"Dropped parse cache for parser version {child.name}")
+    
+    def _load_index(self):
+        """Rebuild the LRU order from what is on disk"""
+        files = []
+        for path in self.directory.glob(f"*{ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.name[:-len(ENTRY_SUFFIX)], stat.st_size))
+        
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total += size
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{ENTRY_SUFFIX}"
+    
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached players_data for a key, or None"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            path = self._path(key)
+            try:
+                payload = path.read_bytes()
+                os.utime(path)
+            except OSError:
+                self._forget(key)
+                return None
+            self._entries.move_to_end(key)
+        
+        try:
+            return json.loads(zlib.decompress(payload))
+        except (zlib.error, ValueError) as e:
+            logger.warning(f"Corrupt parse cache entry {key}: {e}")
+            with self._lock:
+                self._forget(key, unlink=True)
+            return None
+    
+    def put(self, key: str, players_data: dict):
+        """Store players_data for a key, evicting least recently used entries past max_bytes"""
+        payload = zlib.compress(json.dumps(players_data, separators=(',', ':')).encode('utf-8'))
+        if len(payload) > self.max_bytes:
+            return
+        
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with self._lock:
+            try:
+                tmp.write_bytes(payload)
+                os.replace(tmp, path)
+            except OSError as e:
+                logger.warning(f"Could not write parse cache entry {key}: {e}")
+                tmp.unlink(missing_ok=True)
+                return
+            
+            self._forget(key)
+            self._entries[key] = len(payload)
+            self._total += len(payload)
+            
+            while self._total > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._forget(oldest, unlink=True)
+    
+    def _forget(self, key: str, unlink: bool = False):
+        """Drop a key from the index (and optionally its file); caller holds the lock"""
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total -= size
+        if unlink:
+            self._path(key).unlink(missing_ok=True)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+
+_parse_cache: Optional[ParseCache] = None
+
+
+def get_parse_cache() -> ParseCache:
+    """Get or create the global parse cache instance"""
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = ParseCache()
+    return _parse_cache
@@ -0,0 +1,155 @@
+"""
+Tests for the materialized build aggregates
+"""
+
+import random
+
+import pytest
+
+from services.build_aggregates import BuildAggregate, BuildAggregateTable, composition_signature
+from services.counter_service import CounterService
+
+
+SPECS = ['Firebrand', 'Scrapper', 'Herald', 'Spellbreaker', 'Scourge', 'Willbender', 'Druid', 'Reaper']
+ROLES = ['dps', 'healer', 'stab', 'dps_strip']
+
+
+def reference_best_builds(builds, enemy_comp, context=None):
+    """Row-by-row definition of get_best_builds_against (without feedback)"""
+    enemy_specs = set(enemy_comp)
+    stats, winning = {}, {}
+    for build in builds:
+        if context and build.get('context') != context:
+            continue
+        build_specs = set(build.get('enemy_comp', {}))
+        union = len(enemy_specs | build_specs)
+        if (len(enemy_specs & build_specs) / union if union else 0) < 0.3:
+            continue
+        key = (build['spec'], build['role'])
+        entry = stats.setdefault(key, {'wins': 0, 'rows': [], 'counts': []})
+        entry['rows'].append(build)
+        if build['outcome'] == 'victory':
+            entry['wins'] += 1
+            if build.get('fight_id'):
+                winning.setdefault(build['fight_id'], {}).setdefault(key, 0)
+                winning[build['fight_id']][key] += 1
+    for comp in winning.values():
+        for key, count in comp.items():
+            stats[key]['counts'].append(count)
+    
+    best = {}
+    for (spec, role), entry in stats.items():
+        rows = entry['rows']
+        if len(rows) < 2:
+            continue
+        mean = lambda name: sum(row[name] for row in rows) / len(rows)
+        counts = entry['counts']
+        info = {
+            'spec': spec, 'role': role,
+            'win_rate': round(entry['wins'] / len(rows) * 100, 1),
+            'fights_played': len(rows),
+            'avg_score': round(mean('performance_score'), 0),
+            'avg_dps': round(mean('dps'), 0),
+            'avg_healing': round(mean('healing'), 0),
+            'avg_strips': round(mean('boon_strips'), 1),
+            'avg_cleanses': round(mean('cleanses'), 1),
+            'recommended_count': max(1, round(sum(counts) / len(counts)) if counts else 1),
+        }
+        if role not in best or info['win_rate'] > best[role]['win_rate']:
+            best[role] = info
+        elif info['win_rate'] == best[role]['win_rate'] and info['avg_score'] > best[role]['avg_score']:
+            best[role] = info
+    return best
+
+
+def random_builds(rng, fights=150):
+    """Build rows of random fights, a squad per fight, some with a fight_id"""
+    builds = []
+    for fight in range(fights):
+        enemy_comp = {spec: rng.randint(1, 4) for spec in rng.sample(SPECS, rng.randint(1, 5))}
+        context = rng.choice(['zerg', 'roam'])
+        outcome = rng.choice(['victory', 'defeat', 'draw'])
+        fight_id = f"fight_{fight}" if fight % 2 else None
+        for _ in range(rng.randint(1, 6)):
+            build = {
+                'spec': rng.choice(SPECS[:4]), 'role': rng.choice(ROLES), 'context': context,
+                'enemy_comp': enemy_comp, 'outcome': outcome,
+                'performance_score': rng.randint(0, 5000), 'dps': rng.randint(0, 3000),
+                'healing': rng.randint(0, 900), 'boon_strips': rng.randint(0, 40), 'cleanses': rng.randint(0, 60),
+            }
+            if fight_id:
+                build['fight_id'] = fight_id
+            builds.append(build)
+    return builds
+
+
+class TestBuildAggregate:
+    """Test a single aggregate"""
+    
+    def test_add_and_merge(self):
+        """Merging split aggregates equals aggregating every row at once"""
+        rows = [{'performance_score': score, 'dps': 10, 'outcome': 'victory' if score > 2 else 'defeat'}
+                for score in (1, 2, 3, 4)]
+        whole, first, second = BuildAggregate(), BuildAggregate(), BuildAggregate()
+        for position, row in enumerate(rows):
+            whole.add(row, position)
+            (first if position < 2 else second).add(row, position)
+        second.merge(first)
+        
+        assert (second.count, second.wins, second.first_row) == (4, 2, 0)
+        assert second.sums == whole.sums and second.sums_sq == whole.sums_sq
+        assert second.mean('performance_score') == 2.5
+        assert second.stddev('performance_score') == pytest.approx(1.118, abs=1e-3)
+        assert second.stddev('dps') == 0
+    
+    def test_win_fights_are_distinct(self):
+        """A fight's rows count it once, even when other fights' rows come between them"""
+        aggregate = BuildAggregate()
+        for position, fight_id in enumerate(['a', 'b', 'a', 'b', 'a']):
+            aggregate.add({'outcome': 'victory', 'fight_id': fight_id}, position)
+        aggregate.add({'outcome': 'defeat', 'fight_id': 'c'}, 5)
+        
+        assert (aggregate.win_fights, aggregate.win_fight_builds) == (2, 5)
+    
+    def test_signature_ignores_counts_and_order(self):
+        """Compositions with the same specs share a signature"""
+        assert composition_signature({'Herald': 3, 'Firebrand': 1}) == composition_signature({'Firebrand': 5, 'Herald': 1})
+        assert composition_signature({'Herald': 1}) != composition_signature({'Herald': 1, 'Druid': 1})
+
+
+class TestBuildAggregateTable:
+    """Test merged aggregates against the row-by-row definition"""
+    
+    def test_groups_by_context_and_signature(self):
+        """One group per (context, spec set), one aggregate per (spec, role) in it"""
+        table = BuildAggregateTable.from_documents([
+            {'spec': 'Firebrand', 'role': 'stab', 'context': 'zerg', 'enemy_comp': {'Herald': 2}},
+            {'spec': 'Firebrand', 'role': 'stab', 'context': 'zerg', 'enemy_comp': {'Herald': 5}},
+            {'spec': 'Druid', 'role': 'healer', 'context': 'zerg', 'enemy_comp': {'Herald': 5}},
+            {'spec': 'Firebrand', 'role': 'stab', 'context': 'roam', 'enemy_comp': {'Herald': 5}},
+        ])
+        assert len(table) == 4 and len(table.groups) == 2
+        assert table.groups[0][('Firebrand', 'stab')].count == 2
+        assert list(table.matching({'Herald'}, 'zerg')) == [('Firebrand', 'stab'), ('Druid', 'healer')]
+        assert table.matching({'Herald'})[('Firebrand', 'stab')].count == 3
+    
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_service_matches_row_scan(self, tmp_path, seed):
+        """get_best_builds_against equals the row-by-row result, before and after rows written to the table"""
+        rng = random.Random(seed)
+        service = CounterService(tmp_path / "fights.db")
+        builds = random_builds(rng)
+        service.builds_table.insert_multiple(builds[:400])
+        
+        queries = [{spec: 1 for spec in rng.sample(SPECS, rng.randint(1, 6))} for _ in range(15)]
+        for query in queries:
+            assert service.get_best_builds_against(query) == reference_best_builds(builds[:400], query)
+        
+        service.builds_table.insert_multiple(builds[400:])
+        for query in queries:
+            for context in (None, 'zerg', 'roam'):
+                assert service.get_best_builds_against(query, context) == reference_best_builds(builds, query, context)
+        
+        service.builds_table.remove(doc_ids=range(1, 101))
+        for query in queries:
+            assert service.get_best_builds_against(query) == reference_best_builds(builds[100:], query)
@@ -0,0 +1,210 @@
+"""
+Tests for the in-memory enemy composition matrix
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from tinydb import Query
+from tinydb.table import Document
+
+from services.composition_index import MIN_SIMILARITY, BuildSpecIndex, CompositionMatrix, spec_weight
+from services.counter_service import CounterService
+
+
+SPECS = ['Firebrand', 'Scrapper', 'Herald', 'Spellbreaker', 'Scourge', 'Willbender', 'Virtuoso', 'Druid']
+
+
+def stored_fight(doc_id, comp, days_old=0, context='zerg', now=None):
+    """A fights-table document as returned by the store"""
+    now = now or datetime.now()
+    return Document({
+        'fight_id': f"fight_{doc_id}",
+        'timestamp': (now - timedelta(days=days_old)).isoformat(),
+        'enemy_composition': comp,
+        'context_detected': context,
+    }, doc_id)
+
+
+def reference_similarity(comp1, comp2):
+    """Scalar role-weighted Manhattan similarity the matrix vectorizes, one pair of compositions at a time"""
+    total_distance = 0.0
+    total_weight = 0.0
+    for spec in set(comp1) | set(comp2):
+        count1 = comp1.get(spec, 0)
+        count2 = comp2.get(spec, 0)
+        weight = spec_weight(spec)
+        total_distance += abs(count1 - count2) * weight
+        total_weight += max(count1, count2) * weight
+    if total_weight == 0:
+        return 0.0
+    return max(0.0, min(1.0, 1.0 - total_distance / (2 * total_weight)))
+
+
+@pytest.fixture
+def service(tmp_path):
+    """A counter service with an empty database"""
+    return CounterService(tmp_path / "fights.db")
+
+
+class TestCompositionMatrix:
+    """Test the vectorized similarity against the per-fight reference"""
+    
+    def test_similarity_matches_reference(self):
+        """Vectorized similarities equal the scalar reference for every fight"""
+        rng = random.Random(7)
+        fights = [
+            stored_fight(i + 1, {spec: rng.randint(1, 6) for spec in rng.sample(SPECS, rng.randint(0, 5))})
+            for i in range(200)
+        ]
+        matrix = CompositionMatrix.from_documents(fights)
+        
+        for query in ({'Herald': 2, 'Firebrand': 3}, {'Mirage': 1}, {'Scourge': 4, 'Mirage': 2}, {}):
+            expected = [reference_similarity(query, f['enemy_composition']) for f in fights]
+            assert matrix.similarities(query).tolist() == pytest.approx(expected, abs=1e-12)
+    
+    def test_most_similar_matches_reference(self):
+        """Ranking, threshold, time decay and context filter match the scalar definition"""
+        rng = random.Random(11)
+        now = datetime(2026, 6, 1, 12, 0, 0)
+        fights = [
+            stored_fight(i + 1, {spec: rng.randint(1, 3) for spec in rng.sample(SPECS, 3)},
+                         days_old=rng.choice([0, 10, 40, 70, 200]), context=rng.choice(['zerg', 'roam']), now=now)
+            for i in range(300)
+        ]
+        matrix = CompositionMatrix.from_documents(fights)
+        query = {'Herald': 2, 'Scourge': 1, 'Firebrand': 1}
+        
+        def time_weight(fight):
+            days = (now - datetime.fromisoformat(fight['timestamp'])).days
+            return 1.0 if days <= 7 else 0.9 if days <= 30 else 0.7 if days <= 60 else 0.5 if days <= 90 else 0.3
+        
+        scored = []
+        for fight in fights:
+            similarity = reference_similarity(query, fight['enemy_composition'])
+            if similarity >= MIN_SIMILARITY and fight['context_detected'] == 'zerg':
+                scored.append((similarity * time_weight(fight), fight.doc_id))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        
+        assert matrix.most_similar(query, limit=25, context='zerg', now=now) == [d for _, d in scored[:25]]
+        assert matrix.most_similar(query, limit=25, context='guild_raid', now=now) == []
+    
+    def test_ties_keep_insertion_order(self):
+        """Equal scores at the cut-off keep table order"""
+        matrix = CompositionMatrix.from_documents([stored_fight(i, {'Herald': 1}) for i in range(1, 11)])
+        assert matrix.most_similar({'Herald': 1}, limit=4) == [1, 2, 3, 4]
+    
+    def test_growth_and_unknown_timestamps(self):
+        """Capacity grows past the initial size; unparseable timestamps get the fallback weight"""
+        matrix = CompositionMatrix()
+        for i in range(3000):
+            matrix.add(i + 1, {'enemy_composition': {f"Spec{i % 100}": 1}, 'timestamp': datetime.now().isoformat()})
+        matrix.add(3001, {'enemy_composition': {'Spec0': 1}, 'timestamp': 'yesterday'})
+        
+        assert len(matrix) == 3001 and len(matrix.columns) == 100
+        assert matrix.time_weights()[-1] == 0.8
+        assert matrix.most_similar({'Spec0': 1}, limit=31) == list(range(1, 3001, 100)) + [3001]
+
+
+
+class TestBuildSpecIndex:
+    """Test candidate pruning against the full Jaccard scan"""
+    
+    def test_matches_full_scan(self):
+        """Pruned candidates are exactly the rows a full scan keeps, in table order"""
+        rng = random.Random(3)
+        specs = SPECS + ['Mirage', 'Tempest', 'Reaper', 'Untamed']
+        builds = [
+            Document({'enemy_comp': {spec: 1 for spec in rng.sample(specs, rng.randint(0, 8))},
+                      'context': rng.choice(['zerg', 'roam'])}, i + 1)
+            for i in range(2000)
+        ]
+        index = BuildSpecIndex.from_documents(builds)
+        
+        for size in range(0, 11):
+            query = set(rng.sample(specs, size))
+            for context in (None, 'zerg', 'guild_raid'):
+                expected = []
+                for build in builds:
+                    build_specs = set(build['enemy_comp'])
+                    union = len(query | build_specs)
+                    similarity = len(query & build_specs) / union if union > 0 else 0
+                    if similarity >= 0.3 and (not context or build['context'] == context):
+                        expected.append(build.doc_id)
+                assert index.matching(query, context) == expected
+    
+    def test_threshold_is_inclusive(self):
+        """3 shared specs out of 10 is exactly 0.3 and passes"""
+        query = [f"Spec{i}" for i in range(10)]
+        index = BuildSpecIndex()
+        index.add(1, {'enemy_comp': {'Spec0': 1, 'Spec1': 1, 'Spec2': 1}})
+        index.add(2, {'enemy_comp': {'Spec0': 1, 'Spec1': 1, 'Spec2': 1, 'Other': 1}})
+        assert index.matching(query) == [1]
+
+
+class TestCounterServiceIndex:
+    """Test that the service keeps the matrix in step with the fights table"""
+    
+    def fight_data(self, spec, duration_sec=120):
+        """Upload data for a fight against three of one spec"""
+        return {
+            'duration_sec': duration_sec,
+            'allies': [{'name': 'P1', 'account': 'A.1234', 'profession': 'Firebrand', 'role': 'stab'}],
+            'enemy_composition': {'spec_counts': {spec: 3}},
+            'fight_outcome': 'victory',
+        }
+    
+    def test_recorded_fights_are_indexed(self, service):
+        """Fights recorded after the first lookup are found without a rebuild"""
+        service.record_fight(self.fight_data('Herald'), filename='a.evtc', filesize=1)
+        assert len(service._find_similar_fights({'Herald': 3})) == 1
+        
+        service.record_fight(self.fight_data('Herald', 150), filename='b.evtc', filesize=2)
+        service.record_fight(self.fight_data('Druid', 180), filename='c.evtc', filesize=3)
+        similar = service._find_similar_fights({'Herald': 3})
+        assert [f['enemy_composition'] for f in similar] == [{'Herald': 3}, {'Herald': 3}, {'Druid': 3}]
+        assert len(service._get_composition_matrix()) == 3
+    
+    def test_direct_fight_writes_are_followed(self, service):
+        """Fights written straight to the table (imports, scripts) show up in lookups"""
+        service.record_fight(self.fight_data('Herald'), filename='a.evtc', filesize=1)
+        assert len(service._find_similar_fights({'Herald': 3})) == 1
+        
+        service.fights_table.insert_multiple([{'fight_id': 'imported', 'enemy_composition': {'Herald': 3}}])
+        assert [f['fight_id'] for f in service._find_similar_fights({'Herald': 3})][-1] == 'imported'
+        service.fights_table.update({'enemy_composition': {'Druid': 3}}, Query().fight_id == 'imported')
+        assert [f['enemy_composition'] for f in service._find_similar_fights({'Herald': 3})] == [{'Herald': 3}, {'Druid': 3}]
+        service.fights_table.remove(Query().fight_id == 'imported')
+        assert len(service._get_composition_matrix()) == 1
+    
+    def test_build_index_follows_new_builds(self, service):
+        """Builds stored after the first recommendation count in the next one"""
+        service.record_fight(self.fight_data('Herald'), filename='a.evtc', filesize=1)
+        assert service.get_best_builds_against({'Herald': 3}) == {}
+        
+        service.record_fight(self.fight_data('Herald', 150), filename='b.evtc', filesize=2)
+        best = service.get_best_builds_against({'Herald': 3})
+        assert best['stab']['spec'] == 'Firebrand' and best['stab']['fights_played'] == 2
+        assert service.get_best_builds_against({'Herald': 3}, context='roam')['stab']['fights_played'] == 2
+        assert service.get_best_builds_against({'Herald': 3}, context='zerg') == {}
+    
+    def test_confirmed_context_is_followed(self, service):
+        """Confirming a context moves the fight to that context's lookups"""
+        fight_id = service.record_fight(self.fight_data('Herald'), filename='a.evtc', filesize=1, context='roam')
+        assert len(service._find_similar_fights({'Herald': 3}, context='roam')) == 1
+        
+        service.confirm_fight_context(fight_id, 'guild_raid')
+        assert service._find_similar_fights({'Herald': 3}, context='roam') == []
+        assert [f['fight_id'] for f in service._find_similar_fights({'Herald': 3}, context='guild_raid')] == [fight_id]
+    
+    def test_confirmed_context_moves_builds(self, service):
+        """Confirming a context moves the fight's build rows to that context's recommendations"""
+        first = service.record_fight(self.fight_data('Herald'), filename='a.evtc', filesize=1, context='roam')
+        service.record_fight(self.fight_data('Herald', 150), filename='b.evtc', filesize=2, context='roam')
+        assert service.get_best_builds_against({'Herald': 3}, context='roam')['stab']['fights_played'] == 2
+        
+        service.confirm_fight_context(first, 'guild_raid')
+        assert service.get_best_builds_against({'Herald': 3}, context='roam') == {}
+        assert service.get_best_builds_against({'Herald': 3})['stab']['fights_played'] == 2
+        assert [b['context'] for b in service.builds_table.search(Query().fight_id == first)] == ['guild_raid']
@@ -0,0 +1,335 @@
+"""
+Tests for the CounterService storage backends
+"""
+
+import threading
+import time
+
+import pytest
+from tinydb import Query, TinyDB
+
+from services.counter_service import CounterService
+from services.fight_store import (
+    LOG_SEGMENT_SUFFIX, LOG_SNAPSHOT_SUFFIX, RecordLogStore, SQLiteStore, TableCache, TinyDBStore, open_fight_store
+)
+
+
+@pytest.fixture(params=["sqlite", "log", "tinydb"])
+def store(request, tmp_path):
+    """An empty store of each backend"""
+    store = open_fight_store(tmp_path / "fights.db", request.param)
+    yield store
+    store.close()
+
+
+def fight(fight_id, outcome="victory", context="zerg", **extra):
+    """A fights-table document"""
+    return {'fight_id': fight_id, 'outcome': outcome, 'context_detected': context,
+            'enemy_composition': {'Herald': 2}, **extra}
+
+
+class TestTableCompatibility:
+    """Test that both backends behave like TinyDB tables"""
+    
+    def test_insert_search_count(self, store):
+        """Inserted documents come back with doc ids, searches and counts agree"""
+        table = store.table('fights')
+        first = table.insert(fight('a'))
+        table.insert_multiple([fight('b', outcome='defeat'), fight('c', context='roam')])
+        
+        Fight = Query()
+        assert len(table) == 3
+        assert [f['fight_id'] for f in table.all()] == ['a', 'b', 'c']
+        assert table.all()[0].doc_id == first
+        assert [f['fight_id'] for f in table.search(Fight.outcome == 'victory')] == ['a', 'c']
+        assert table.count((Fight.outcome == 'victory') & (Fight.context_detected == 'zerg')) == 1
+        assert table.get(Fight.fight_id == 'b')['outcome'] == 'defeat'
+        assert table.contains(Fight.fight_id == 'c') and not table.contains(Fight.fight_id == 'z')
+    
+    def test_unindexed_conditions(self, store):
+        """Conditions on nested or unindexed fields still match like TinyDB"""
+        table = store.table('fights')
+        table.insert_multiple([fight('a', duration_sec=90), fight('b', duration_sec=30)])
+        
+        Fight = Query()
+        assert [f['fight_id'] for f in table.search(Fight.enemy_composition.Herald == 2)] == ['a', 'b']
+        assert [f['fight_id'] for f in table.search((Fight.duration_sec > 60) & (Fight.outcome == 'victory'))] == ['a']
+        assert table.count(Fight.fight_id.test(lambda value: value != 'a')) == 1
+    
+    def test_update_and_remove(self, store):
+        """update() rewrites matching documents, remove() returns removed ids"""
+        table = store.table('fights')
+        table.insert_multiple([fight('a'), fight('b')])
+        
+        Fight = Query()
+        table.update({'context_confirmed': 'guild_raid'}, Fight.fight_id == 'a')
+        assert table.count(Fight.context_confirmed == 'guild_raid') == 1
+        assert table.get(Fight.fight_id == 'a')['context_confirmed'] == 'guild_raid'
+        
+        removed = table.remove(Fight.fight_id == 'b')
+        assert len(removed) == 1 and len(table) == 1
+        table.truncate()
+        assert table.all() == []
+    
+    def test_version_follows_writes(self, store):
+        """Every kind of write moves the table version, reads and other tables don't"""
+        table = store.table('fights')
+        versions = [table.version()]
+        table.insert(fight('a'))
+        versions.append(table.version())
+        table.update({'outcome': 'defeat'}, Query().fight_id == 'a')
+        versions.append(table.version())
+        table.remove(Query().fight_id == 'a')
+        versions.append(table.version())
+        table.truncate()
+        versions.append(table.version())
+        
+        table.all()
+        store.table('builds').insert({'spec': 'Firebrand'})
+        assert table.version() == versions[-1]
+        assert len(set(versions)) == len(versions)
+
+
+class TestSQLiteStore:
+    """Test SQLite specifics: WAL, indexes and the TinyDB migration"""
+    
+    def test_wal_and_index(self, tmp_path):
+        """The database is in WAL mode and indexed lookups use an index"""
+        store = SQLiteStore(tmp_path / "fights.sqlite3")
+        store.table('analyzed_files')
+        
+        assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        plan = store.conn.execute(
+            'EXPLAIN QUERY PLAN SELECT doc FROM "analyzed_files" WHERE "filename" = ? AND "filesize" = ?',
+            ("a.evtc", 10),
+        ).fetchall()
+        assert any('INDEX' in row[-1] for row in plan)
+    
+    def test_migration_runs_once(self, tmp_path):
+        """TinyDB tables are copied with their doc ids on first open only"""
+        legacy_path = tmp_path / "fights.db"
+        legacy = TinyDB(str(legacy_path))
+        legacy.table('fights').insert_multiple([fight('a'), fight('b')])
+        legacy.table('settings').insert({'feedback_weight': 0.5})
+        legacy.close()
+        
+        store = open_fight_store(legacy_path, "sqlite")
+        assert [f.doc_id for f in store.table('fights').all()] == [1, 2]
+        assert store.table('settings').all() == [{'feedback_weight': 0.5}]
+        store.table('fights').insert(fight('c'))
+        store.close()
+        
+        reopened = open_fight_store(legacy_path, "sqlite")
+        assert [f['fight_id'] for f in reopened.table('fights').all()] == ['a', 'b', 'c']
+        reopened.close()
+    
+    def test_migration_recorded_without_legacy_file(self, tmp_path):
+        """A first open with no TinyDB file still counts as the migration"""
+        legacy_path = tmp_path / "fights.db"
+        store = open_fight_store(legacy_path, "sqlite")
+        store.table('fights').insert(fight('new'))
+        store.close()
+        
+        legacy = TinyDB(str(legacy_path))
+        legacy.table('fights').insert(fight('old'))
+        legacy.close()
+        
+        reopened = open_fight_store(legacy_path, "sqlite")
+        assert [f['fight_id'] for f in reopened.table('fights').all()] == ['new']
+        reopened.close()
+    
+    def test_migration_refuses_non_empty_tables(self, tmp_path):
+        """Documents already in a table are never replaced by the import"""
+        legacy_path = tmp_path / "fights.db"
+        legacy = TinyDB(str(legacy_path))
+        legacy.table('fights').insert(fight('old'))
+        legacy.close()
+        
+        store = SQLiteStore(tmp_path / "fights.sqlite3")
+        store.table('fights').insert(fight('new'))
+        with pytest.raises(RuntimeError):
+            store.migrate_from_tinydb(legacy_path)
+        assert [f['fight_id'] for f in store.table('fights').all()] == ['new']
+        assert store._meta('migrated_from') is None
+        store.close()
+    
+    def test_concurrent_updates(self, tmp_path):
+        """Read-modify-write updates from several threads don't lose each other's changes"""
+        store = SQLiteStore(tmp_path / "fights.sqlite3")
+        table = store.table('fights')
+        table.insert(fight('a', hits=0))
+        
+        def bump(document):
+            time.sleep(0.001)
+            document['hits'] += 1
+        
+        def worker():
+            for _ in range(10):
+                table.update(bump, Query().fight_id == 'a')
+        
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert table.get(Query().fight_id == 'a')['hits'] == 40
+        store.close()
+    
+    def test_unknown_backend(self, tmp_path):
+        """Only the known backends can be opened"""
+        with pytest.raises(ValueError):
+            open_fight_store(tmp_path / "fights.db", "mongo")
+
+
+class TestRecordLogStore:
+    """Test the append-only record log: replay, torn writes and compaction"""
+    
+    def test_replay_after_reopen(self, tmp_path):
+        """Inserts, updates, removes and truncates are all replayed"""
+        store = RecordLogStore(tmp_path / "fights.log")
+        fights = store.table('fights')
+        fights.insert_multiple([fight('a'), fight('b'), fight('c')])
+        fights.update({'outcome': 'defeat'}, Query().fight_id == 'a')
+        fights.remove(Query().fight_id == 'b')
+        store.table('stats').insert({'total_fights': 3})
+        store.table('stats').truncate()
+        store.close()
+        
+        reopened = RecordLogStore(tmp_path / "fights.log")
+        assert [(f.doc_id, f['fight_id'], f['outcome']) for f in reopened.table('fights').all()] == \
+            [(1, 'a', 'defeat'), (3, 'c', 'victory')]
+        assert reopened.table('stats').all() == []
+        assert reopened.table('fights').insert(fight('d')) == 4
+        reopened.close()
+    
+    def test_doc_ids_follow_tinydb(self, tmp_path):
+        """Ids of removed documents aren't reused until reopened, truncate starts over at 1"""
+        legacy = TinyDB(str(tmp_path / "fights.db"))
+        store = RecordLogStore(tmp_path / "fights.log")
+        for table in (legacy.table('fights'), store.table('fights')):
+            table.insert_multiple([fight('a'), fight('b')])
+            table.remove(doc_ids=[2])
+            assert table.insert(fight('c')) == 3
+        store.close()
+        legacy.close()
+        
+        reopened = RecordLogStore(tmp_path / "fights.log")
+        fights = reopened.table('fights')
+        assert fights.insert(fight('d')) == 4
+        fights.truncate()
+        assert fights.insert(fight('e')) == 1
+        reopened.close()
+    
+    def test_torn_tail_is_ignored(self, tmp_path):
+        """A partial last record (crash mid-write) is dropped, earlier ones kept"""
+        store = RecordLogStore(tmp_path / "fights.log")
+        store.table('fights').insert(fight('a'))
+        store.close()
+        segment = sorted((tmp_path / "fights.log").glob(f"*{LOG_SEGMENT_SUFFIX}"))[0]
+        with open(segment, 'a') as f:
+            f.write('{"t": "fights", "op": "put", "id": 2, "doc": {"fight')
+        
+        reopened = RecordLogStore(tmp_path / "fights.log")
+        assert [f['fight_id'] for f in reopened.table('fights').all()] == ['a']
+        reopened.close()
+    
+    def test_background_compaction(self, tmp_path):
+        """Sealed segments are folded into a snapshot that replays to the same state"""
+        path = tmp_path / "fights.log"
+        store = RecordLogStore(path, segment_bytes=512, compact_after=2)
+        fights = store.table('fights')
+        for i in range(40):
+            fights.insert(fight(f"f{i}"))
+        fights.remove(Query().fight_id == 'f0')
+        store.wait_for_compaction()
+        expected = fights.all()
+        store.close()
+        
+        assert len(list(path.glob(f"*{LOG_SNAPSHOT_SUFFIX}"))) == 1
+        assert len(list(path.glob(f"*{LOG_SEGMENT_SUFFIX}"))) < 40
+        reopened = RecordLogStore(path)
+        assert reopened.table('fights').all() == expected
+        assert [f.doc_id for f in reopened.table('fights').all()] == list(range(2, 41))
+        reopened.close()
+    
+    def test_migration_into_new_log(self, tmp_path):
+        """A new log imports the TinyDB file with its doc ids, an existing one doesn't"""
+        legacy_path = tmp_path / "fights.db"
+        legacy = TinyDB(str(legacy_path))
+        legacy.table('fights').insert_multiple([fight('a'), fight('b')])
+        legacy.close()
+        
+        store = open_fight_store(legacy_path, "log")
+        assert [f.doc_id for f in store.table('fights').all()] == [1, 2]
+        store.close()
+        
+        reopened = open_fight_store(legacy_path, "log")
+        assert len(reopened.table('fights')) == 2
+        reopened.close()
+
+
+class TestTableCache:
+    """Test that cached views follow writes they didn't make"""
+    
+    def test_own_writes_keep_the_view(self, store):
+        """Writes applied through writing() don't cause a rebuild"""
+        builds = []
+        cache = TableCache(store.table('fights'), lambda documents: builds.append(documents) or list(documents))
+        assert cache.get() == []
+        
+        with cache.writing() as view:
+            document = fight('a')
+            store.table('fights').insert(document)
+            view.append(document)
+        assert cache.get() == [fight('a')] and len(builds) == 1
+    
+    def test_other_writes_rebuild(self, store):
+        """Direct writes, even during writing(), rebuild the view on next use"""
+        table = store.table('fights')
+        cache = TableCache(table, lambda documents: [f['fight_id'] for f in documents])
+        assert cache.get() == []
+        
+        table.insert_multiple([fight('a'), fight('b')])
+        assert cache.get() == ['a', 'b']
+        table.update({'fight_id': 'c'}, Query().fight_id == 'b')
+        assert cache.get() == ['a', 'c']
+        
+        with cache.writing() as view:
+            table.insert(fight('d'))
+            table.remove(Query().fight_id == 'a')
+            view.append('d')
+        assert cache.get() == ['c', 'd']
+    
+    @pytest.mark.parametrize("backend", ["sqlite", "tinydb"])
+    def test_other_process_writes_rebuild(self, tmp_path, backend):
+        """A write through another connection to the same database is noticed"""
+        store = open_fight_store(tmp_path / "fights.db", backend)
+        cache = TableCache(store.table('fights'), lambda documents: [f['fight_id'] for f in documents])
+        assert cache.get() == []
+        
+        other = open_fight_store(tmp_path / "fights.db", backend)
+        other.table('fights').insert(fight('a'))
+        other.close()
+        assert cache.get() == ['a']
+        store.close()
+
+
+class TestCounterServiceBackends:
+    """Test CounterService on each backend"""
+    
+    @pytest.mark.parametrize("backend", ["sqlite", "log", "tinydb"])
+    def test_dedup_and_stats(self, tmp_path, backend):
+        """Duplicate uploads are skipped and stats counted on either backend"""
+        service = CounterService(tmp_path / "fights.db", backend=backend)
+        data = {
+            'duration_sec': 120,
+            'allies': [{'name': 'P1', 'account': 'A.1234', 'profession': 'Firebrand', 'role': 'stab'}],
+            'enemy_composition': {'spec_counts': {'Herald': 2}},
+            'fight_outcome': 'victory',
+        }
+        
+        assert service.record_fight(data, filename='a.evtc', filesize=100) is not None
+        assert service.record_fight(data, filename='a.evtc', filesize=100) is None
+        assert service.get_stats()['total_fights'] == 1
+        expected = {'sqlite': SQLiteStore, 'log': RecordLogStore, 'tinydb': TinyDBStore}[backend]
+        assert isinstance(service.db, expected)
@@ -0,0 +1,132 @@
+"""
+Tests for the content-addressed parse cache
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from services import analysis_service
+from services.parse_cache import ParseCache, content_key
+from tests.test_parser import build_evtc, sample_events
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create a cache in a temporary directory"""
+    return ParseCache(root=tmp_path / "cache", max_bytes=1 << 20, version="test")
+
+
+def players_data(n=3):
+    """A players_data-shaped dict"""
+    return {
+        'allies': [{'name': f"Ally {i}", 'damage': i * 1000} for i in range(n)],
+        'allies_afk': [],
+        'enemies': [{'name': "Enemy", 'profession': "Spellbreaker"}],
+        'duration_sec': 60,
+    }
+
+
+class TestParseCache:
+    """Test storage, LRU eviction and version invalidation"""
+    
+    def test_round_trip(self, cache):
+        """Stored players_data comes back unchanged"""
+        key = content_key(b"log bytes")
+        assert cache.get(key) is None
+        
+        cache.put(key, players_data())
+        assert cache.get(key) == players_data()
+        assert len(cache) == 1
+    
+    def test_key_is_content_only(self):
+        """Same bytes give the same key, any change gives another"""
+        assert content_key(b"abc") == content_key(bytes(b"abc"))
+        assert content_key(b"abc") != content_key(b"abd")
+    
+    def test_lru_eviction(self, tmp_path):
+        """Least recently used entries are evicted past max_bytes"""
+        data = {'blob': os.urandom(3000).hex()}  # incompressible
+        cache = ParseCache(root=tmp_path, max_bytes=10000, version="test")
+        
+        cache.put("a", data)
+        cache.put("b", data)
+        cache.get("a")  # "b" is now the oldest
+        cache.put("c", data)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == data and cache.get("c") == data
+        assert cache.total_bytes <= 10000
+        assert not (tmp_path / "test" / "b.json.z").exists()
+    
+    def test_index_survives_restart(self, tmp_path):
+        """Entries on disk are picked up by a new cache instance"""
+        ParseCache(root=tmp_path, version="test").put("a", players_data())
+        
+        reopened = ParseCache(root=tmp_path, version="test")
+        assert reopened.get("a") == players_data()
+    
+    def test_version_bump_invalidates(self, tmp_path):
+        """Entries from another parser version are dropped"""
+        ParseCache(root=tmp_path, version="1").put("a", players_data())
+        
+        cache = ParseCache(root=tmp_path, version="2")
+        assert cache.get("a") is None
+        assert not (tmp_path / "1").exists()
+    
+    def test_corrupt_entry_is_a_miss(self, cache):
+        """Unreadable entries are removed instead of raising"""
+        cache.put("a", players_data())
+        (cache.directory / "a.json.z").write_bytes(b"garbage")
+        
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestOfflineAnalysisCache:
+    """Test the cache in the analyze_single_file offline fallback"""
+    
+    @pytest.fixture
+    def offline(self, tmp_path, monkeypatch):
+        """Force the offline path and count local parses"""
+        class NoNetwork:
+            def __init__(self, *args, **kwargs):
+                raise ConnectionError("offline")
+        
+        class StubCounterService:
+            def record_fight(self, *args, **kwargs):
+                return None
+            
+            async def generate_counter(self, enemy_spec_counts):
+                return {}
+        
+        parses = []
+        parse = analysis_service.real_parser.parse_evtc_bytes
+        
+        def counting_parse(data, filename=""):
+            parses.append(filename)
+            return parse(data, filename)
+        
+        cache = ParseCache(root=tmp_path / "cache", version="test")
+        monkeypatch.setattr(analysis_service.httpx, "AsyncClient", NoNetwork)
+        monkeypatch.setattr(analysis_service, "get_counter_service", StubCounterService)
+        monkeypatch.setattr(analysis_service, "get_parse_cache", lambda: cache)
+        monkeypatch.setattr(analysis_service.real_parser, "parse_evtc_bytes", counting_parse)
+        return parses
+    
+    def test_repeat_upload_skips_parse(self, offline):
+        """A re-upload under another name is served from the cache"""
+        data = build_evtc(sample_events())
+        
+        first = asyncio.run(analysis_service.analyze_single_file("a.evtc", data, len(data), "en"))
+        start = time.perf_counter()
+        second = asyncio.run(analysis_service.analyze_single_file("b.evtc", data, len(data), "en"))
+        elapsed = time.perf_counter() - start
+        
+        assert offline == ["a.evtc"]
+        assert elapsed < 0.05
+        assert second["players"]["source_name"] == "b.evtc"
+        assert second["data"]["duration"] == first["data"]["duration"]
+        assert second["players"]["enemies"] == first["players"]["enemies"]
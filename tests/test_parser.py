@@ -2,8 +2,102 @@
 Tests for EVTC parser - stats extraction
 """
 
+import gc
+import io
+import os
+import struct
+from dataclasses import asdict
+
+import numpy as np
 import pytest
-from parser import ParsedPlayer, ParsedLog, EVTCHeader
+from parser import (
+    ParsedPlayer, ParsedLog, EVTCHeader, EVTCParser, RealEVTCParser,
+    EVENT_DTYPE_REV1, StateChange, decode_event_block,
+    BUFF_RECORD_DTYPE, BOON_ID_ARRAY, BOON_MARK_END, BoonTracker, compute_boon_stats,
+    PARSE_PROFILES, COUNTER_FIELDS, parse_many, AgentIndex,
+    classify_sides, SIDE_ALLY, SIDE_ENEMY, EventAggregator,
+    attribute_downs_and_kills, AttributionTracker, HIT_RECORD_DTYPE, STATE_RECORD_DTYPE,
+    CombatTimeline, TIMELINE_SERIES, segment_engagements,
+    save_columnar, load_columnar, columnar_path
+)
+
+
+# =============================================================================
+# SYNTHETIC EVTC BUILDER
+# =============================================================================
+
+EVENT_FORMAT = '<QQQiiIIHHHHBBBBBBBBBBBBBBBB'
+EVENT_FIELDS = EVENT_DTYPE_REV1.names
+
+ALLY_A = 0x1001
+ALLY_B = 0x1002
+ENEMY = 0x2001
+NPC = 0x3001
+
+
+def pack_agent(address, prof, elite, name, toughness=0, healing=0, condition=0):
+    """Pack a 96-byte agent record"""
+    data = struct.pack('<QIIhhhHhH', address, prof, elite, toughness, 0, healing, 0, condition, 0)
+    return data + name.encode('utf-8')[:64].ljust(64, b'\x00') + b'\x00' * 4
+
+
+def pack_event(**fields):
+    """Pack a 64-byte revision 1 event, unspecified fields are zero"""
+    return struct.pack(EVENT_FORMAT, *[fields.get(name, 0) for name in EVENT_FIELDS])
+
+
+def build_evtc(events, agents=None, skills=None):
+    """Build a revision 1 WvW EVTC blob"""
+    if agents is None:
+        agents = [
+            pack_agent(ALLY_A, 1, 62, "Ally A\x00:AllyA.1234\x001", healing=1200),
+            pack_agent(ALLY_B, 8, 60, "Ally B\x00:AllyB.5678\x002", condition=900),
+            pack_agent(ENEMY, 2, 61, "Enemy\x00:Enemy.9999\x00", toughness=1000),
+            pack_agent(NPC, 0xFFFF0001, 0xFFFFFFFF, "Siege"),
+        ]
+    if skills is None:
+        skills = [(9137, "Whirling Wrath"), (1187, "Quickness")]
+    
+    data = b'EVTC' + b'20240101' + struct.pack('<BHB', 1, 1, 0)
+    data += struct.pack('<I', len(agents)) + b''.join(agents)
+    data += struct.pack('<I', len(skills))
+    for skill_id, name in skills:
+        data += struct.pack('<I', skill_id) + name.encode('utf-8').ljust(64, b'\x00')
+    return data + b''.join(events)
+
+
+def sample_events():
+    """A small fight exercising every stat the parser extracts"""
+    return [
+        pack_event(time=1000, src_agent=ALLY_A, is_statechange=StateChange.POINT_OF_VIEW),
+        pack_event(time=1000, src_agent=ALLY_A, dst_agent=1, is_statechange=StateChange.TEAM_CHANGE),
+        pack_event(time=1000, src_agent=ALLY_B, dst_agent=1, is_statechange=StateChange.TEAM_CHANGE),
+        pack_event(time=1000, src_agent=ENEMY, dst_agent=2, is_statechange=StateChange.TEAM_CHANGE),
+        pack_event(time=1000, src_agent=38, is_statechange=StateChange.MAP_ID),
+        pack_event(time=1000, is_statechange=StateChange.SQUAD_COMBAT_START),
+        # Direct damage, a crit and a killing blow
+        pack_event(time=1100, src_agent=ALLY_A, dst_agent=ENEMY, value=3000, skill_id=9137, src_instid=11),
+        pack_event(time=1200, src_agent=ALLY_A, dst_agent=ENEMY, value=5000, skill_id=9137, src_instid=11, result=1),
+        pack_event(time=1300, src_agent=ALLY_B, dst_agent=ENEMY, value=2000, skill_id=9137, src_instid=12, result=8),
+        # Condition damage tick
+        pack_event(time=1400, src_agent=ALLY_B, dst_agent=ENEMY, buff_dmg=700, skill_id=736, src_instid=12, buff=1),
+        # Boon applications
+        pack_event(time=1500, src_agent=ALLY_A, dst_agent=ALLY_B, value=2000, skill_id=1187, src_instid=11, buff=1),
+        pack_event(time=1600, src_agent=ALLY_A, dst_agent=ALLY_A, value=2000, skill_id=1187, src_instid=11, buff=1),
+        # Condition application
+        pack_event(time=1650, src_agent=ALLY_B, dst_agent=ENEMY, value=3000, skill_id=736, src_instid=12, buff=1),
+        # Strip and cleanse: src lost the buff, dst removed it
+        pack_event(time=1700, src_agent=ENEMY, dst_agent=ALLY_B, value=1000, skill_id=1187, src_instid=21, buff=1, is_buffremove=1),
+        pack_event(time=1800, src_agent=ALLY_B, dst_agent=ALLY_A, value=1000, skill_id=736, src_instid=12, buff=1, is_buffremove=2),
+        # Interrupt and barrier
+        pack_event(time=1900, src_agent=ALLY_A, dst_agent=ENEMY, value=10, skill_id=9137, src_instid=11, result=5),
+        pack_event(time=1950, src_agent=ALLY_A, dst_agent=ALLY_B, value=400, skill_id=9137, src_instid=11, is_shields=1),
+        # Enemy hits back, then goes down and dies
+        pack_event(time=2000, src_agent=ENEMY, dst_agent=ALLY_A, value=4000, skill_id=9137, src_instid=21),
+        pack_event(time=2100, src_agent=ENEMY, is_statechange=StateChange.CHANGE_DOWN),
+        pack_event(time=2200, src_agent=ENEMY, is_statechange=StateChange.CHANGE_DEAD),
+        pack_event(time=62000, is_statechange=StateChange.SQUAD_COMBAT_END),
+    ]
 
 
 class TestParsedPlayer:
@@ -171,3 +265,1145 @@ class TestDeduplication:
         assert len(unique_players) == 2
         assert unique_players[0]['name'] == "Char1"
         assert unique_players[1]['name'] == "Char3"
+
+
+class TestVectorizedDecoding:
+    """Test the NumPy event decoder against the struct reference decoder"""
+    
+    def test_decode_event_block_zero_copy(self):
+        """Revision 1 events are viewed in place, partial records ignored"""
+        raw = b''.join(sample_events()) + b'\x00' * 10
+        events = decode_event_block(raw, revision=1)
+        
+        assert events.dtype == EVENT_DTYPE_REV1
+        assert len(events) == len(sample_events())
+        assert events.base is not None
+        assert events['value'][6] == 3000
+        assert events['src_agent'][6] == ALLY_A
+    
+    def test_decode_rev0_widened(self):
+        """Revision 0 records are widened into the revision 1 layout"""
+        record = struct.pack('<QQQiiHHHHH', 5, ALLY_A, ENEMY, 123, 0, 0, 9137, 11, 0, 0)
+        record += b'\x00' * 9 + bytes([0, 0, 8, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        events = decode_event_block(record, revision=0)
+        
+        assert events.dtype == EVENT_DTYPE_REV1
+        assert events['skill_id'][0] == 9137
+        assert events['result'][0] == 8
+        assert events['dst_master_instid'][0] == 0
+    
+    def test_numpy_matches_struct(self):
+        """Both decode modes produce identical players and metadata"""
+        data = build_evtc(sample_events())
+        
+        vectorized = EVTCParser(decode_mode="numpy").parse_bytes(data, "fight.evtc")
+        reference = EVTCParser(decode_mode="struct").parse_bytes(data, "fight.evtc")
+        
+        assert [asdict(p) for p in vectorized.players] == [asdict(p) for p in reference.players]
+        assert [asdict(p) for p in vectorized.enemies] == [asdict(p) for p in reference.enemies]
+        assert vectorized.map_id == reference.map_id == 38
+        assert vectorized.duration_ms == reference.duration_ms == 61000
+        assert vectorized.pov_player == reference.pov_player == "Ally A"
+    
+    def test_numpy_player_stats(self):
+        """Column aggregation extracts the expected stats"""
+        log = RealEVTCParser().parse_evtc_bytes(build_evtc(sample_events()), "fight.evtc")
+        allies = {p.character_name: p for p in log.players + log.enemies}
+        enemy = allies["Enemy"]
+        
+        assert allies["Ally A"].damage_dealt == 8410
+        assert allies["Ally A"].boons_applied == {1187: 2}
+        assert allies["Ally A"].cleanses == 1
+        assert allies["Ally A"].cc_out == 1
+        assert allies["Ally A"].barrier_out == 400
+        assert allies["Ally B"].damage_dealt == 2700
+        assert allies["Ally B"].kills == 1
+        assert allies["Ally B"].boon_strips == 1
+        assert allies["Ally B"].conditions_applied == {736: 1}
+        assert enemy.deaths == 1 and enemy.downs == 1
+        assert enemy.damage_taken == 10710
+    
+    def test_unknown_decode_mode(self):
+        """Unknown decode modes are rejected"""
+        with pytest.raises(ValueError):
+            EVTCParser(decode_mode="fast")
+
+
+class TestCompactEntities:
+    """Test slotted parser entities"""
+    
+    def test_entities_have_no_instance_dict(self):
+        """Per-record entities are slotted"""
+        parser = EVTCParser(decode_mode="struct")
+        parser.parse_bytes(build_evtc(sample_events()))
+        
+        for obj in (parser.header, next(iter(parser.agents.values())),
+                    next(iter(parser.skills.values())), parser.events[0]):
+            assert not hasattr(obj, '__dict__')
+    
+    @pytest.mark.parametrize("mode", ["numpy", "stream", "struct"])
+    def test_skills_used_is_a_set(self, mode):
+        """Used skills are a set in every decode mode"""
+        log = EVTCParser(decode_mode=mode).parse_bytes(build_evtc(sample_events()))
+        allies = {p.character_name: p for p in log.players + log.enemies}
+        
+        assert allies["Ally A"].skills_used == {9137, 1187}
+        assert not hasattr(allies["Ally A"], '__dict__')
+
+
+class TestSinglePassAggregation:
+    """Test that per-player combat stats come from one pass over the events"""
+    
+    def test_events_walked_once(self):
+        """Every player is filled by a single iteration over the event list"""
+        class CountingList(list):
+            iterations = 0
+            
+            def __iter__(self):
+                CountingList.iterations += 1
+                return super().__iter__()
+        
+        parser = EVTCParser(decode_mode="struct")
+        log = parser.parse_bytes(build_evtc(sample_events()), "fight.evtc")
+        expected = {p.character_name: asdict(p) for p in log.players + log.enemies}
+        
+        parser.events = CountingList(parser.events)
+        parsed_by_address = {
+            agent.address: parser._new_parsed_player(agent, False, 0.0)
+            for agent in parser.agents.values()
+            if agent.is_player
+        }
+        parser._aggregate_player_combat(parsed_by_address)
+        
+        assert CountingList.iterations == 1
+        for parsed in parsed_by_address.values():
+            assert parsed.damage_dealt == expected[parsed.character_name]['damage_dealt']
+            assert parsed.damage_taken == expected[parsed.character_name]['damage_taken']
+            assert parsed.skills_used == expected[parsed.character_name]['skills_used']
+
+
+class TestStreamingParse:
+    """Test the bounded-memory chunked decode mode"""
+    
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 1024])
+    def test_stream_matches_full_decode(self, chunk_size):
+        """Chunked aggregation gives the same result whatever the chunk size"""
+        data = build_evtc(sample_events())
+        
+        full = EVTCParser(decode_mode="numpy").parse_bytes(data, "fight.evtc")
+        streamed = EVTCParser(decode_mode="stream", chunk_size=chunk_size).parse_bytes(data, "fight.evtc")
+        
+        assert [asdict(p) for p in streamed.players] == [asdict(p) for p in full.players]
+        assert [asdict(p) for p in streamed.enemies] == [asdict(p) for p in full.enemies]
+        assert streamed.duration_ms == full.duration_ms
+        assert streamed.pov_player == full.pov_player
+    
+    def test_stream_keeps_no_events(self):
+        """Streaming mode never materializes the event block"""
+        parser = EVTCParser(decode_mode="stream", chunk_size=4)
+        parser.parse_bytes(build_evtc(sample_events()), "fight.evtc")
+        
+        assert parser.event_array is None
+        assert parser.events == []
+        assert parser.agents[ALLY_A].instance_id == 11
+        assert parser.agents[ALLY_A].first_aware == 1100
+        assert parser.agents[ALLY_A].last_aware == 1950
+    
+    def test_invalid_chunk_size(self):
+        """Chunk size must be positive"""
+        with pytest.raises(ValueError):
+            EVTCParser(decode_mode="stream", chunk_size=0)
+
+
+class TestMappedParse:
+    """Test memory-mapped and reusable-buffer parsing of on-disk logs"""
+    
+    def test_mapped_evtc_matches_bytes(self, tmp_path):
+        """Uncompressed files parsed through mmap match in-memory parsing"""
+        data = build_evtc(sample_events())
+        path = tmp_path / "fight.evtc"
+        path.write_bytes(data)
+        
+        parser = EVTCParser()
+        mapped = parser.parse_file(str(path))
+        in_memory = EVTCParser().parse_bytes(data, "fight.evtc")
+        
+        assert [asdict(p) for p in mapped.players] == [asdict(p) for p in in_memory.players]
+        assert mapped.duration_ms == in_memory.duration_ms
+        assert parser.event_array is None
+    
+    def test_zip_reuses_buffer(self, tmp_path):
+        """Archives are decompressed into one buffer that is reused across files"""
+        import zipfile
+        
+        data = build_evtc(sample_events())
+        paths = []
+        for i in range(2):
+            path = tmp_path / f"fight{i}.zevtc"
+            with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr(f"fight{i}", data)
+            paths.append(path)
+        
+        parser = EVTCParser()
+        first = parser.parse_file(str(paths[0]))
+        buffer = parser._buffer
+        second = parser.parse_file(str(paths[1]))
+        
+        assert parser._buffer is buffer
+        assert len(buffer) == len(data)
+        assert [asdict(p) for p in first.players] == [asdict(p) for p in second.players]
+    
+    def test_zlib_zevtc_file(self, tmp_path):
+        """Raw zlib .zevtc files on disk are decompressed and parsed"""
+        import zlib
+        
+        path = tmp_path / "fight.zevtc"
+        path.write_bytes(zlib.compress(build_evtc(sample_events())))
+        
+        log = EVTCParser().parse_file(str(path))
+        assert log.map_id == 38
+
+
+class TestIncrementalDecompression:
+    """Test decompress-as-you-parse for compressed uploads"""
+    
+    def test_zlib_reader_exact_reads(self):
+        """The zlib reader returns exactly the requested sizes until EOF"""
+        import zlib
+        from parser import ZlibStreamReader
+        
+        payload = bytes(range(256)) * 1000
+        reader = ZlibStreamReader(zlib.compress(payload), step=97)
+        
+        assert reader.read(4) == payload[:4]
+        assert reader.read(1000) == payload[4:1004]
+        assert reader.read() == payload[1004:]
+        assert reader.read(10) == b''
+    
+    def test_zlib_reader_rejects_garbage(self):
+        """Invalid zlib data fails when the reader is created"""
+        import zlib
+        from parser import ZlibStreamReader
+        
+        with pytest.raises(zlib.error):
+            ZlibStreamReader(b'not zlib data at all')
+    
+    @pytest.mark.parametrize("container", ["zlib", "zip"])
+    def test_stream_compressed_matches_numpy(self, container):
+        """Incremental inflate + chunked decode matches the full decode"""
+        import zipfile
+        import zlib
+        
+        raw = build_evtc(sample_events())
+        if container == "zlib":
+            data = zlib.compress(raw)
+        else:
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr("fight", raw)
+            data = buffer.getvalue()
+        
+        streamed = RealEVTCParser(chunk_size=5).parse_evtc_bytes(data, "fight.zevtc")
+        full = EVTCParser(decode_mode="numpy").parse_bytes(raw, "fight.evtc")
+        
+        assert [asdict(p) for p in streamed.players] == [asdict(p) for p in full.players]
+        assert [asdict(p) for p in streamed.enemies] == [asdict(p) for p in full.enemies]
+        assert streamed.duration_ms == full.duration_ms
+
+
+class TestParseMany:
+    """Test the process-pool parse farm"""
+    
+    def test_order_and_error_capture(self, tmp_path):
+        """Results keep input order and failures are captured per file"""
+        from parser import parse_many
+        
+        data = build_evtc(sample_events())
+        path = tmp_path / "fight.evtc"
+        path.write_bytes(data)
+        
+        sources = [str(path), b"garbage", ("upload.evtc", data)]
+        results = parse_many(sources, workers=2)
+        
+        assert [r.index for r in results] == [0, 1, 2]
+        assert results[0].ok and results[0].source == str(path)
+        assert not results[1].ok and results[1].error
+        assert results[2].ok and results[2].source == "upload.evtc"
+        assert results[0].summary == results[2].summary
+    
+    def test_summary_is_compact(self):
+        """Summaries are plain picklable data without the skill table"""
+        import pickle
+        from parser import parse_many
+        
+        result = parse_many([build_evtc(sample_events())], workers=1)[0]
+        summary = pickle.loads(pickle.dumps(result)).summary
+        
+        assert summary['map_id'] == 38
+        assert 'skills' not in summary
+        names = {p['character_name'] for p in summary['players'] + summary['enemies']}
+        assert names == {"Ally A", "Ally B", "Enemy"}
+
+
+class TestPeek:
+    """Test header-and-roster peek mode"""
+    
+    def test_peek_roster(self):
+        """Peek resolves POV, map, teams and sides from the leading state changes"""
+        roster = EVTCParser().peek_bytes(build_evtc(sample_events()))
+        
+        assert roster.is_wvw
+        assert roster.map_id == 38
+        assert roster.pov_player == "Ally A"
+        assert roster.skill_count == 2
+        assert {p.character_name for p in roster.allies} == {"Ally A", "Ally B"}
+        assert roster.spec_counts() == {"Spellbreaker": 1}
+        assert roster.spec_counts(enemies=False) == {"Firebrand": 1, "Scourge": 1}
+        assert [p.character_name for p in roster.players if p.is_pov] == ["Ally A"]
+    
+    def test_peek_stops_early(self):
+        """Only the first state changes are read, not the whole event block"""
+        events = sample_events()[:6] + sample_events()[6:-1] * 5000
+        stream = io.BytesIO(build_evtc(events))
+        roster = EVTCParser()._peek_stream(stream, max_statechanges=4)
+        
+        assert roster.statechanges_read == 4
+        assert roster.map_id == 0  # MAP_ID is the fifth state change
+        assert stream.tell() < len(stream.getvalue()) // 100
+    
+    @pytest.mark.parametrize("container", ["zlib", "zip"])
+    def test_peek_compressed_file(self, tmp_path, container):
+        """Compressed logs on disk give the same roster as raw bytes"""
+        import zipfile
+        import zlib
+        
+        data = build_evtc(sample_events())
+        path = tmp_path / "fight.zevtc"
+        if container == "zip":
+            with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr("fight", data)
+        else:
+            path.write_bytes(zlib.compress(data))
+        
+        parser = EVTCParser()
+        from_file = parser.peek_file(str(path))
+        from_bytes = parser.peek_bytes(data)
+        
+        assert asdict(from_file) == asdict(from_bytes)
+        assert from_file.fingerprint == from_bytes.fingerprint
+    
+    def test_fingerprint_includes_pov(self):
+        """The same roster seen from another POV is a different log"""
+        events = sample_events()
+        other_pov = [pack_event(time=1000, src_agent=ALLY_B, is_statechange=StateChange.POINT_OF_VIEW)] + events[1:]
+        
+        parser = EVTCParser()
+        assert parser.peek_bytes(build_evtc(events)).fingerprint != parser.peek_bytes(build_evtc(other_pov)).fingerprint
+
+
+class TestTimeline:
+    """Test per-second combat series"""
+    
+    def test_series_sum_to_totals(self):
+        """Each player's series add up to their whole-fight counters"""
+        log = EVTCParser().parse_bytes(build_evtc(sample_events()))
+        timeline = log.timeline
+        
+        assert timeline.start_time == 1000
+        for player in log.players + log.enemies:
+            series = timeline.player(player.character_name)
+            assert series['damage_out'].sum() == player.damage_dealt
+            assert series['damage_in'].sum() == player.damage_taken
+            assert series['strips'].sum() == player.boon_strips
+            assert series['cleanses'].sum() == player.cleanses
+            assert series['boons_applied'].sum() == sum(player.boons_applied.values())
+            assert series['downs'].sum() == player.downs
+            assert series['deaths'].sum() == player.deaths
+    
+    @pytest.mark.parametrize("mode", ["numpy", "struct"])
+    def test_removals_credit_the_remover(self, mode):
+        """A strip or cleanse counts for dst (who removed it), not src (who lost it)"""
+        log = EVTCParser(decode_mode=mode).parse_bytes(build_evtc(sample_events()))
+        players = {p.character_name: p for p in log.players + log.enemies}
+        assert (players["Ally B"].boon_strips, players["Enemy"].boon_strips) == (1, 0)
+        assert (players["Ally A"].cleanses, players["Ally B"].cleanses) == (1, 0)
+        
+        if mode == "numpy":
+            assert log.timeline.player("Ally B")['strips'][0] == 1
+            assert log.timeline.player("Enemy")['strips'].sum() == 0
+            assert log.timeline.player("Ally A")['cleanses'][0] == 1
+            assert log.timeline.player("Ally B")['cleanses'].sum() == 0
+    
+    def test_buckets_are_seconds_from_start(self):
+        """Events land in the bucket of their second since squad combat start"""
+        log = EVTCParser().parse_bytes(build_evtc(sample_events()))
+        enemy = log.timeline.player("Enemy")
+        
+        assert enemy['damage_out'].tolist() == [0, 4000]  # hit at 2000 ms
+        assert enemy['deaths'].tolist() == [0, 1]
+        assert log.timeline.values.dtype == np.int32
+    
+    def test_stream_grows_timeline(self):
+        """Chunked decoding over a long fight gives the same series as one block"""
+        events = sample_events()[:6] + [
+            pack_event(time=1000 + 250 * i, src_agent=ALLY_A, dst_agent=ENEMY, value=100 + i, src_instid=11)
+            for i in range(400)
+        ]
+        data = build_evtc(events)
+        full = EVTCParser(decode_mode="numpy").parse_bytes(data)
+        streamed = EVTCParser(decode_mode="stream", chunk_size=7).parse_bytes(data)
+        
+        assert full.timeline.seconds == 100
+        assert np.array_equal(full.timeline.values, streamed.timeline.values)
+    
+    def test_squad_series(self):
+        """Squad series are the sum over allies (or enemies)"""
+        log = EVTCParser().parse_bytes(build_evtc(sample_events()))
+        timeline = log.timeline
+        rows = ~timeline.is_enemy
+        
+        squad = timeline.squad()
+        assert np.array_equal(squad['damage_out'], timeline.series('damage_out')[rows].sum(axis=0))
+        assert timeline.squad(enemies=True)['deaths'].sum() == sum(p.deaths for p in log.enemies)
+
+
+
+def boon_record(time, src, dst, boon_id, duration=0, remove=0):
+    """One BUFF_RECORD_DTYPE row"""
+    return (time, src, dst, int(np.searchsorted(BOON_ID_ARRAY, boon_id)), duration, remove)
+
+
+class TestBoonEngine:
+    """Test interval-based boon uptime and generation"""
+    
+    def test_duration_boons_queue_and_cut(self):
+        """Same-source applications queue; a remove-all cuts the running interval"""
+        records = np.array([
+            boon_record(2000, 0, 1, 1187, 5000),
+            boon_record(3000, 0, 1, 1187, 5000),   # queued: 7000-12000
+            boon_record(10000, -1, 1, 1187, remove=1),
+        ], dtype=BUFF_RECORD_DTYPE)
+        uptime, generated = compute_boon_stats(records, 2, 0, 20000)
+        
+        quickness = int(np.searchsorted(BOON_ID_ARRAY, 1187))
+        assert generated[0, 1, quickness] == 8000
+        assert uptime[1, quickness] == pytest.approx(40.0)
+    
+    def test_uptime_is_union_of_sources(self):
+        """Overlapping sources count once for uptime but each for generation"""
+        records = np.array([
+            boon_record(0, 0, 2, 717, 4000),
+            boon_record(2000, 1, 2, 717, 4000),
+        ], dtype=BUFF_RECORD_DTYPE)
+        uptime, generated = compute_boon_stats(records, 3, 0, 10000)
+        
+        protection = int(np.searchsorted(BOON_ID_ARRAY, 717))
+        assert uptime[2, protection] == pytest.approx(60.0)
+        assert generated[:, 2, protection].tolist() == [4000, 4000, 0]
+    
+    def test_intensity_boons_average_stacks(self):
+        """Might stacks independently and reports average stacks"""
+        records = np.array([boon_record(0, 0, 1, 740, 6000)] * 3, dtype=BUFF_RECORD_DTYPE)
+        uptime, _ = compute_boon_stats(records, 2, 0, 60000)
+        
+        might = int(np.searchsorted(BOON_ID_ARRAY, 740))
+        assert uptime[1, might] == pytest.approx(0.3)
+    
+    def test_single_stack_remove(self):
+        """A single-stack remove ends the stability stack closest to the removed duration"""
+        records = np.array([
+            boon_record(0, 0, 1, 1122, 6000),
+            boon_record(0, 0, 1, 1122, 8000),
+            boon_record(0, 0, 1, 1122, 10000),
+            boon_record(2000, 2, 1, 1122, 6000, remove=2),  # 6000 ms left: the 8000 ms stack
+            boon_record(3000, 2, 1, 717, 1000, remove=2),   # duration boons only lose every stack at once
+        ], dtype=BUFF_RECORD_DTYPE)
+        uptime, generated = compute_boon_stats(records, 3, 0, 60000)
+        
+        stability = int(np.searchsorted(BOON_ID_ARRAY, 1122))
+        assert generated[0, 1, stability] == 6000 + 2000 + 10000
+        assert uptime[1, stability] == pytest.approx(0.3)
+    
+    def test_window_ends_at_squad_combat_end(self):
+        """Boons running at squad combat end are cut there, later applications ignored"""
+        records = np.array([
+            boon_record(0, 0, 1, 717, 10000),
+            (5000, -1, -1, BOON_MARK_END, 0, 0),
+            boon_record(6000, 0, 1, 717, 10000),
+        ], dtype=BUFF_RECORD_DTYPE)
+        protection = int(np.searchsorted(BOON_ID_ARRAY, 717))
+        
+        uptime, generated = compute_boon_stats(records, 2, 0, 5000)
+        assert uptime[1, protection] == pytest.approx(100.0)
+        assert generated[0, 1, protection] == 5000
+        # Any other end (combat started again) counts the queued application too
+        assert compute_boon_stats(records, 2, 0, 30000)[1][0, 1, protection] == 20000
+    
+    def test_chunks_match_one_pass(self):
+        """Folding records chunk by chunk keeps only running boons and gives the same stats"""
+        rng = np.random.default_rng(5)
+        n = 2000
+        records = np.zeros(n, dtype=BUFF_RECORD_DTYPE)
+        records['time'] = np.sort(rng.integers(0, 120000, n))
+        records['src'] = rng.integers(-1, 4, n)
+        records['dst'] = rng.integers(0, 4, n)
+        records['boon'] = rng.integers(0, BOON_ID_ARRAY.size, n)
+        records['duration'] = rng.integers(100, 8000, n)
+        records['remove'] = rng.choice([0, 0, 0, 0, 0, 0, 0, 0, 1, 2], n)
+        whole = compute_boon_stats(records, 4, 0, 120000)
+        
+        tracker = BoonTracker(4)
+        for chunk in np.array_split(records, 37):
+            tracker.consume(chunk)
+            # At most one queue per (source, target, boon) and the stacks of the last 8 s
+            recent = np.count_nonzero((records['time'] > tracker.frontier - 8000) & (records['time'] <= tracker.frontier))
+            assert tracker.pending.size <= 5 * 4 * BOON_ID_ARRAY.size + recent
+        uptime, generated = tracker.finalize(0, 120000)
+        
+        assert np.allclose(uptime, whole[0])
+        assert np.array_equal(generated, whole[1])
+    
+    @pytest.mark.parametrize("mode", ["numpy", "stream", "struct"])
+    def test_group_generation(self, mode):
+        """Generation counts boon time given to the rest of the subgroup"""
+        other = 0x1003
+        agents = [
+            pack_agent(ALLY_A, 1, 62, "A\x00:A.1\x001"),
+            pack_agent(ALLY_B, 8, 60, "B\x00:B.1\x001"),
+            pack_agent(other, 2, 61, "C\x00:C.1\x002"),
+        ]
+        events = [
+            pack_event(time=1000, src_agent=ALLY_A, is_statechange=StateChange.POINT_OF_VIEW),
+            pack_event(time=1000, is_statechange=StateChange.SQUAD_COMBAT_START),
+            pack_event(time=2000, src_agent=ALLY_A, dst_agent=ALLY_B, value=6000, skill_id=1187, buff=1),
+            pack_event(time=2000, src_agent=other, dst_agent=ALLY_B, value=6000, skill_id=1187, buff=1),
+            pack_event(time=61000, is_statechange=StateChange.SQUAD_COMBAT_END),
+        ]
+        log = EVTCParser(decode_mode=mode).parse_bytes(build_evtc(events, agents=agents))
+        players = {p.character_name: p for p in log.players + log.enemies}
+        
+        assert players["A"].boon_generation == {1187: 10.0}
+        assert players["C"].boon_generation == {}  # B is not in C's subgroup
+        assert players["B"].boon_uptime == {1187: 10.0}
+    
+    @pytest.mark.parametrize("mode", ["numpy", "stream", "struct"])
+    def test_enemy_strip(self, mode):
+        """An enemy stripping an ally cuts the ally's boon (arcdps: src_agent lost it)"""
+        events = [
+            pack_event(time=1000, src_agent=ALLY_A, is_statechange=StateChange.POINT_OF_VIEW),
+            pack_event(time=1000, src_agent=ALLY_A, dst_agent=1, is_statechange=StateChange.TEAM_CHANGE),
+            pack_event(time=1000, src_agent=ENEMY, dst_agent=2, is_statechange=StateChange.TEAM_CHANGE),
+            pack_event(time=1000, is_statechange=StateChange.SQUAD_COMBAT_START),
+            pack_event(time=2000, src_agent=ALLY_A, dst_agent=ALLY_B, value=6000, skill_id=1187, buff=1),
+            pack_event(time=2000, src_agent=ENEMY, dst_agent=ENEMY, value=6000, skill_id=1187, buff=1),
+            pack_event(time=3000, src_agent=ENEMY, dst_agent=ALLY_A, value=500, skill_id=9137),
+            pack_event(time=5000, src_agent=ALLY_B, dst_agent=ENEMY, value=5000, skill_id=1187, buff=1,
+                       is_buffremove=1),
+            pack_event(time=61000, is_statechange=StateChange.SQUAD_COMBAT_END),
+        ]
+        log = EVTCParser(decode_mode=mode, chunk_size=3).parse_bytes(build_evtc(events))
+        players = {p.character_name: p for p in log.players + log.enemies}
+        
+        assert players["Ally B"].boon_uptime == {1187: 5.0}
+        assert players["Enemy"].boon_uptime == {1187: 10.0}  # the remover keeps its own quickness
+
+
+class TestParseProfiles:
+    """Test decode-time event filtering by parse profile"""
+    
+    @pytest.mark.parametrize("mode", ["numpy", "stream"])
+    def test_summary_matches_full_totals(self, mode):
+        """The summary profile keeps every whole-fight total and drops the extras"""
+        data = build_evtc(sample_events())
+        full = EVTCParser(decode_mode=mode).parse_bytes(data)
+        summary = EVTCParser(decode_mode=mode, chunk_size=3, profile="summary").parse_bytes(data)
+        
+        assert summary.timeline is None
+        assert summary.duration_ms == full.duration_ms
+        for got, expected in zip(summary.players + summary.enemies, full.players + full.enemies):
+            assert got.character_name == expected.character_name
+            for name in COUNTER_FIELDS:
+                assert getattr(got, name) == getattr(expected, name), name
+            assert got.skills_used == expected.skills_used
+            assert got.boons_applied == expected.boons_applied
+            assert got.boon_uptime == {}
+    
+    def test_composition_keeps_sides_and_roles(self):
+        """The composition profile gives the same roster split, totals, roles and builds as a full parse"""
+        events = sample_events()
+        events[-1:-1] = [
+            pack_event(time=3000 + i, src_agent=ALLY_A, dst_agent=ALLY_B, value=2000, skill_id=1187,
+                       src_instid=11, buff=1)
+            for i in range(60)
+        ]
+        data = build_evtc(events)
+        full = RealEVTCParser(decode_mode="numpy").parse_evtc_bytes(data)
+        composition = RealEVTCParser(decode_mode="numpy", chunk_size=5, profile="composition").parse_evtc_bytes(data)
+        
+        assert composition.map_id == full.map_id
+        for got, expected in zip(composition.players + composition.enemies, full.players + full.enemies):
+            assert (got.character_name, got.elite_spec) == (expected.character_name, expected.elite_spec)
+            assert (got.estimated_role, got.estimated_build) == (expected.estimated_role, expected.estimated_build)
+            assert got.boons_applied == expected.boons_applied
+            assert got.conditions_applied == expected.conditions_applied
+            for name in ('damage_dealt', 'damage_taken', 'deaths', 'downs', 'kills'):
+                assert getattr(got, name) == getattr(expected, name), name
+        assert composition.players[0].estimated_build == "Quickbrand"
+        
+        parser = RealEVTCParser()
+        for enemies in (True, False):
+            assert (parser._parsed_log_to_composition(composition, enemies)
+                    == parser._parsed_log_to_composition(full, enemies))
+    
+    def test_event_mask(self):
+        """Dropped classes: activations, buff removals, other buffs and untracked state changes"""
+        events = decode_event_block(b''.join([
+            pack_event(time=1, src_agent=ALLY_A, dst_agent=ENEMY, value=100),
+            pack_event(time=2, src_agent=ALLY_A, value=500, is_activation=1),
+            pack_event(time=3, src_agent=ALLY_A, dst_agent=ALLY_B, value=2000, buff=1),
+            pack_event(time=4, src_agent=ALLY_B, dst_agent=ENEMY, buff_dmg=700, buff=1),
+            pack_event(time=5, src_agent=ALLY_A, is_statechange=StateChange.POSITION),
+            pack_event(time=6, src_agent=ENEMY, is_statechange=StateChange.CHANGE_DEAD),
+            pack_event(time=7, src_agent=ALLY_A, dst_agent=ALLY_B, value=2000, skill_id=1187, buff=1),
+            pack_event(time=8, src_agent=ENEMY, dst_agent=ALLY_B, value=1000, skill_id=1187, buff=1, is_buffremove=1),
+        ]), 1)
+        
+        assert PARSE_PROFILES['full'].event_mask(events) is None
+        assert PARSE_PROFILES['summary'].event_mask(events) is None  # skips outputs, not events
+        assert PARSE_PROFILES['composition'].event_mask(events).tolist() == [True, False, False, True, False, True,
+                                                                              True, False]
+    
+    def test_boons_between_allies_are_not_damage(self):
+        """Boon applications don't link squad members as opponents"""
+        events = sample_events()
+        del events[1:4]  # no team information
+        log = EVTCParser(profile="composition").parse_bytes(build_evtc(events))
+        
+        assert sorted(p.character_name for p in log.players) == ["Ally A", "Ally B"]
+    
+    def test_unknown_profile(self):
+        """Unknown profiles are rejected up front"""
+        with pytest.raises(ValueError):
+            EVTCParser(profile="everything")
+        with pytest.raises(ValueError):
+            parse_many([b''], profile="everything")
+        
+        parser = RealEVTCParser(profile="summary")
+        assert parser.parse_evtc_bytes(build_evtc(sample_events()), profile="composition").players
+
+
+class TestAgentIndex:
+    """Test sorted-array address and instance-id joins"""
+    
+    def reused_instid_events(self):
+        """Ally A holds instance id 11 early, the enemy gets it after A leaves"""
+        return sample_events()[:6] + [
+            pack_event(time=1100, src_agent=ALLY_A, dst_agent=ENEMY, value=100, src_instid=11),
+            pack_event(time=1900, src_agent=ALLY_A, dst_agent=ENEMY, value=100, src_instid=11),
+            pack_event(time=1500, src_agent=ALLY_B, dst_agent=ENEMY, value=100, src_instid=12),
+            pack_event(time=3000, src_agent=ENEMY, dst_agent=ALLY_B, value=100, src_instid=11),
+            pack_event(time=4000, src_agent=ENEMY, dst_agent=ALLY_B, value=100, src_instid=11),
+        ]
+    
+    @pytest.mark.parametrize("mode", ["numpy", "stream", "struct"])
+    def test_instid_reuse(self, mode):
+        """A reused instance id resolves to whoever was aware at the time"""
+        parser = EVTCParser(decode_mode=mode)
+        parser.parse_bytes(build_evtc(self.reused_instid_events()))
+        index = parser.agent_index
+        
+        assert index.agent_at(11, 1500).address == ALLY_A
+        assert index.agent_at(11, 3500).address == ENEMY
+        assert index.agent_at(11, 2500) is None  # nobody holds it in between
+        assert index.agent_at(12, 1500).address == ALLY_B
+        assert index.agent_at(13, 1500) is None
+    
+    def test_column_joins(self):
+        """Whole columns join in one call, unknown keys give -1"""
+        parser = EVTCParser()
+        parser.parse_bytes(build_evtc(self.reused_instid_events()))
+        index = parser.agent_index
+        rows = {agent.address: row for row, agent in enumerate(index.agents)}
+        
+        addresses = np.array([ENEMY, ALLY_A, 0xDEAD, NPC], dtype=np.uint64)
+        assert index.rows(addresses).tolist() == [rows[ENEMY], rows[ALLY_A], -1, rows[NPC]]
+        
+        instids = np.array([11, 11, 12, 0], dtype=np.uint16)
+        times = np.array([1100, 4000, 1500, 1500], dtype=np.uint64)
+        assert index.rows_by_instid(instids, times).tolist() == [rows[ALLY_A], rows[ENEMY], rows[ALLY_B], -1]
+    
+    def test_empty_index(self):
+        """An index without agents or awareness maps everything to -1"""
+        index = AgentIndex([])
+        assert index.rows(np.array([1, 2], dtype=np.uint64)).tolist() == [-1, -1]
+        assert index.rows_by_instid(np.array([1], dtype=np.uint16), np.array([5], dtype=np.uint64)).tolist() == [-1]
+
+
+class TestSideClassification:
+    """Test the damage-graph ally/enemy split"""
+    
+    def test_propagates_from_seeds(self):
+        """Unseeded players land opposite to whoever they fight"""
+        damage = np.zeros((5, 5), dtype=np.int64)
+        damage[0, 2] = 3   # ally 0 hits 2
+        damage[3, 1] = 1   # 3 hits 1
+        damage[2, 4] = 2   # 2 hits 4 (4 never meets a seed directly)
+        seeds = np.array([SIDE_ALLY, SIDE_ALLY, 0, 0, 0])
+        
+        is_enemy, confidence = classify_sides(damage, seeds)
+        assert is_enemy.tolist() == [False, False, True, True, False]
+        assert confidence.tolist() == [1.0, 1.0, 1.0, 1.0, 1.0]
+    
+    def test_confidence_reflects_conflicts(self):
+        """Contradicting links lower confidence; players without links or seeds get none"""
+        damage = np.zeros((4, 4), dtype=np.int64)
+        damage[0, 2] = 3   # 2 is hit by the ally seed...
+        damage[1, 2] = 1   # ...and by the enemy seed
+        seeds = np.array([SIDE_ALLY, SIDE_ENEMY, 0, 0])
+        
+        is_enemy, confidence = classify_sides(damage, seeds)
+        assert is_enemy.tolist() == [False, True, True, False]
+        assert confidence[2] == pytest.approx(0.5)   # 3 hits say enemy, 1 says ally
+        assert confidence[1] == 0.0                   # its only link points at its own side
+        assert confidence[3] == 0.0                   # isolated: ally by default, no evidence
+    
+    def test_large_fight(self):
+        """An 80v80 fight splits correctly from the squad alone"""
+        rng = np.random.default_rng(7)
+        n = 80
+        damage = np.zeros((2 * n, 2 * n), dtype=np.int64)
+        src = rng.integers(0, n, 4000)
+        dst = rng.integers(n, 2 * n, 4000)
+        np.add.at(damage, (src, dst), 1)
+        np.add.at(damage, (dst[:2000], src[:2000]), 1)
+        seeds = np.zeros(2 * n, dtype=np.int8)
+        seeds[:10] = SIDE_ALLY
+        
+        is_enemy, confidence = classify_sides(damage, seeds)
+        assert not is_enemy[:n].any() and is_enemy[n:].all()
+        assert (confidence > 0.99).all()
+    
+    @pytest.mark.parametrize("mode", ["numpy", "struct"])
+    def test_parse_without_team_data(self, mode):
+        """Without team changes, the squad seeds the split and damage decides the rest"""
+        events = sample_events()
+        del events[1:4]
+        log = EVTCParser(decode_mode=mode).parse_bytes(build_evtc(events))
+        
+        assert sorted(p.character_name for p in log.players) == ["Ally A", "Ally B"]
+        assert [p.character_name for p in log.enemies] == ["Enemy"]
+        assert log.enemies[0].side_confidence == 1.0
+
+
+def long_fight_events(n=600):
+    """sample_events() stretched over a few minutes of extra hits and boons"""
+    events = sample_events()[:-1]
+    for i in range(n):
+        src, dst = (ALLY_A, ENEMY) if i % 3 else (ENEMY, ALLY_B)
+        events.append(pack_event(time=2300 + 300 * i, src_agent=src, dst_agent=dst, value=100 + i,
+                                 skill_id=9137, src_instid=11))
+        events.append(pack_event(time=2300 + 300 * i, src_agent=ALLY_B, dst_agent=ALLY_A, value=1000,
+                                 skill_id=1187, src_instid=12, buff=1))
+    return events + [pack_event(time=2300 + 300 * n, is_statechange=StateChange.SQUAD_COMBAT_END)]
+
+
+class TestSkillBreakdown:
+    """Test the per-player, per-skill breakdown"""
+    
+    @pytest.mark.parametrize("chunk_size", [3, 65536])
+    def test_sums_match_player_totals(self, chunk_size):
+        """Per-skill rows add up to each player's counters, however the events are chunked"""
+        log = EVTCParser(decode_mode="stream", chunk_size=chunk_size).parse_bytes(build_evtc(sample_events()))
+        breakdown = log.skill_breakdown
+        
+        for player in log.players + log.enemies:
+            rows = breakdown.player(player.character_name)
+            assert sum(row['damage'] for row in rows) == player.damage_dealt
+            assert sum(row['cc'] for row in rows) == player.cc_out
+    
+    def test_rows_and_names(self):
+        """Rows carry skill-table names, crits, and are sorted by damage"""
+        log = EVTCParser().parse_bytes(build_evtc(sample_events()))
+        ally_b = log.skill_breakdown.player("Ally B")
+        
+        assert [row['name'] for row in ally_b] == ["Whirling Wrath", "Bleeding"]
+        assert ally_b[1] == {'skill_id': 736, 'name': "Bleeding", 'hits': 1, 'damage': 700,
+                             'crits': 0, 'cc': 0}
+        
+        whirl = log.skill_breakdown.squad()[0]
+        assert (whirl['name'], whirl['hits'], whirl['crits']) == ("Whirling Wrath", 5, 1)
+        assert log.skill_breakdown.squad(enemies=True)[0]['damage'] == 4000
+    
+    def test_removes_are_not_broken_down(self):
+        """A boon strip adds no row, neither for the stripped player nor for the remover"""
+        events = sample_events()[:6] + [
+            pack_event(time=1100, src_agent=ENEMY, dst_agent=ALLY_B, value=1000, skill_id=1187,
+                       src_instid=21, buff=1, is_buffremove=1),
+        ]
+        breakdown = EVTCParser().parse_bytes(build_evtc(events)).skill_breakdown
+        assert breakdown.player("Enemy") == [] and breakdown.player("Ally B") == []
+    
+    def test_only_with_player_stats(self):
+        """No breakdown when the profile skips player stats or with the struct decoder"""
+        data = build_evtc(sample_events())
+        assert EVTCParser(profile="summary").parse_bytes(data).skill_breakdown is not None
+        assert EVTCParser(profile="composition").parse_bytes(data).skill_breakdown is None
+        assert EVTCParser(decode_mode="struct").parse_bytes(data).skill_breakdown is None
+
+
+class TestAttribution:
+    """Test time-windowed kill/down attribution"""
+    
+    def test_window_bounds(self):
+        """Only opponent damage inside [time - window, time] on the victim counts"""
+        hits = np.array([
+            (1000, 0, 2, 100),   # exactly window_ms before the down
+            (999, 1, 2, 50),     # just outside
+            (5000, 1, 2, 70),    # after the down
+            (1500, 1, 3, 40),    # another target
+            (1800, 3, 2, 999),   # same side as the victim
+        ], dtype=HIT_RECORD_DTYPE)
+        states = np.array([(2000, 2, False)], dtype=STATE_RECORD_DTYPE)
+        is_enemy = np.array([False, False, True, True])
+        
+        down_contrib, kills = attribute_downs_and_kills(hits, states, is_enemy, window_ms=1000)
+        assert down_contrib.tolist() == [100, 0, 0, 0]
+        assert kills.tolist() == [0, 0, 0, 0]
+    
+    def test_kill_participation_once_per_death(self):
+        """Several hits on one victim count one participation; every death counts"""
+        hits = np.array([(t, 0, 2, 10) for t in (100, 200, 300)] + [(3000, 1, 2, 10), (3100, 0, 3, 10)],
+                        dtype=HIT_RECORD_DTYPE)
+        states = np.array([(400, 2, True), (3200, 2, True), (3200, 3, True)], dtype=STATE_RECORD_DTYPE)
+        is_enemy = np.array([False, False, True, True])
+        
+        down_contrib, kills = attribute_downs_and_kills(hits, states, is_enemy, window_ms=1000)
+        assert kills.tolist() == [2, 1, 0, 0]
+        assert down_contrib.tolist() == [0, 0, 0, 0]
+    
+    def test_chunks_match_one_pass(self):
+        """Folding records chunk by chunk only holds recent hits and credits the same"""
+        rng = np.random.default_rng(9)
+        hits = np.zeros(5000, dtype=HIT_RECORD_DTYPE)
+        hits['time'] = np.sort(rng.integers(0, 100000, hits.size))
+        hits['src'] = rng.integers(0, 6, hits.size)
+        hits['dst'] = rng.integers(0, 6, hits.size)
+        hits['damage'] = rng.integers(1, 5000, hits.size)
+        states = np.zeros(300, dtype=STATE_RECORD_DTYPE)
+        states['time'] = np.sort(rng.choice(hits['time'], states.size))  # some at the time of a later hit
+        states['slot'] = rng.integers(0, 6, states.size)
+        states['dead'] = rng.random(states.size) < 0.5
+        is_enemy = np.array([False, False, False, True, True, True])
+        
+        tracker = AttributionTracker(6, window_ms=2000)
+        bounds = np.linspace(0, 100000, 41).astype(np.int64)
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            in_chunk = lambda records: records[(records['time'] >= low) & (records['time'] < high)]
+            tracker.consume(in_chunk(hits), in_chunk(states))
+            assert tracker.hits['time'].min() >= low - 2500 - 2000
+        
+        expected = attribute_downs_and_kills(hits, states, is_enemy, window_ms=2000)
+        for got, want in zip(tracker.finalize(is_enemy), expected):
+            assert np.array_equal(got, want)
+    
+    @pytest.mark.parametrize("mode", ["numpy", "stream", "struct"])
+    def test_parsed_players(self, mode):
+        """Everyone who hit the enemy before it went down and died is credited"""
+        log = EVTCParser(decode_mode=mode).parse_bytes(build_evtc(sample_events()))
+        players = {p.character_name: p for p in log.players + log.enemies}
+        
+        assert players["Ally A"].down_contrib == 8010
+        assert players["Ally B"].down_contrib == 2700
+        assert players["Ally A"].kill_participation == players["Ally B"].kill_participation == 1
+        assert players["Enemy"].down_contrib == 0
+    
+    def test_window_is_configurable(self):
+        """A shorter window drops older hits"""
+        log = EVTCParser(attribution_window_ms=950).parse_bytes(build_evtc(sample_events()))
+        players = {p.character_name: p for p in log.players}
+        
+        assert players["Ally A"].down_contrib == 5010  # the 1100 ms hit is out
+        assert players["Ally B"].down_contrib == 2700
+        
+        with pytest.raises(ValueError):
+            EVTCParser(attribution_window_ms=-1)
+
+
+class TestEngagements:
+    """Test splitting a log into engagements at combat lulls"""
+    
+    @staticmethod
+    def timeline(active):
+        """Three players (two allies, one enemy); damage_out on the given (row, second) pairs"""
+        values = np.zeros((len(TIMELINE_SERIES), 3, 120), dtype=np.int64)
+        for row, second in active:
+            values[TIMELINE_SERIES.index('damage_out'), row, second] += 100
+        return CombatTimeline(start_time=5000, players=["A", "B", "E"],
+                              is_enemy=np.array([False, False, True]), values=values)
+    
+    def test_split_at_lull(self):
+        """A gap longer than the lull starts a new engagement with its own roster"""
+        active = [(0, s) for s in range(0, 15)] + [(2, 3)] + [(1, s) for s in range(60, 80)] + [(2, 79)]
+        engagements = segment_engagements(self.timeline(active), ["Firebrand", "Scrapper", "Reaper"],
+                                          lull_seconds=20, min_seconds=10)
+        
+        assert [(e.start_second, e.end_second) for e in engagements] == [(0, 15), (60, 80)]
+        first, second = engagements
+        assert first.players == ["A", "E"] and second.players == ["B", "E"]
+        assert first.start_time == 5000 and first.duration_ms == 15000 and second.end_time == 85000
+        assert second.composition() == {'Reaper': 1}
+        assert second.composition(enemies=False) == {'Scrapper': 1}
+        assert first.player("A")['damage_out'] == 1500
+        assert second.squad()['damage_out'] == 2000
+    
+    def test_short_gaps_and_bursts(self):
+        """Gaps within the lull don't split; bursts shorter than min_seconds are dropped"""
+        active = [(0, s) for s in range(0, 30) if s % 7] + [(0, 100), (0, 103)]
+        engagements = segment_engagements(self.timeline(active), ["Firebrand"] * 3,
+                                          lull_seconds=20, min_seconds=10)
+        
+        assert [(e.start_second, e.end_second) for e in engagements] == [(1, 30)]
+        assert segment_engagements(self.timeline([]), ["Firebrand"] * 3) == []
+    
+    def test_parsed_log_engagements(self):
+        """The full profile attaches engagements covering the fight"""
+        log = EVTCParser().parse_bytes(build_evtc(long_fight_events()))
+        
+        assert len(log.engagements) == 1
+        engagement = log.engagements[0]
+        assert engagement.squad()['damage_out'] == sum(p.damage_dealt for p in log.players)
+        assert engagement.composition() == {'Spellbreaker': 1}
+
+
+def movement_event(time, agent, x, y, z, kind=StateChange.POSITION):
+    """Pack a position/velocity state change: x/y floats in dst_agent, z float in value"""
+    xy, = struct.unpack('<Q', struct.pack('<ff', x, y))
+    z, = struct.unpack('<i', struct.pack('<f', z))
+    return pack_event(time=time, src_agent=agent, dst_agent=xy, value=z, is_statechange=kind)
+
+
+def movement_events():
+    """sample_events() with a few seconds of position and velocity samples"""
+    return sample_events()[:-1] + [
+        movement_event(1100, ALLY_A, 0, 0, 0),
+        movement_event(1500, ALLY_A, 3, 4, 0, kind=StateChange.VELOCITY),
+        movement_event(1500, ENEMY, 100, 100, 0),
+        movement_event(1900, ALLY_A, 10, 0, 0),  # same bucket, last sample wins
+        movement_event(2500, ALLY_B, 0, 30, 0),
+        movement_event(3500, ALLY_A, 20, 0, 5),
+        pack_event(time=5000, is_statechange=StateChange.SQUAD_COMBAT_END),
+    ]
+
+
+class TestMovementTracks:
+    """Test downsampled position tracks, centroid and spread"""
+    
+    @pytest.mark.parametrize("mode,chunk_size", [("numpy", 65536), ("stream", 3)])
+    def test_tracks(self, mode, chunk_size):
+        """Last sample per bucket, carried forward, NaN before a player's first sample"""
+        parser = EVTCParser(decode_mode=mode, chunk_size=chunk_size, position_resolution_ms=1000)
+        movement = parser.parse_bytes(build_evtc(movement_events())).movement
+        
+        assert movement.start_time == 1000 and movement.buckets == 3
+        assert movement.positions.dtype == np.float32
+        assert movement.player("Ally A").tolist() == [[10, 0, 0], [10, 0, 0], [20, 0, 5]]
+        assert np.isnan(movement.player("Ally B")[0]).all()
+        assert movement.player("Ally B")[1:].tolist() == [[0, 30, 0], [0, 30, 0]]
+        assert movement.speeds[movement.players.index("Ally A")].tolist() == [5, 5, 5]
+    
+    def test_centroid_and_spread(self):
+        """Centroid and spread only count the side's players with a sample"""
+        parser = EVTCParser(position_resolution_ms=1000)
+        movement = parser.parse_bytes(build_evtc(movement_events())).movement
+        
+        assert movement.centroid().tolist() == [[10, 0, 0], [5, 15, 0], [10, 15, 2.5]]
+        assert movement.centroid(enemies=True)[0].tolist() == [100, 100, 0]
+        spread = movement.spread()
+        assert spread[0] == 0
+        assert spread[1] == pytest.approx(np.sqrt(250))
+    
+    def test_optional(self):
+        """Positions are skipped by default and kept by any profile that asks for them"""
+        data = build_evtc(movement_events())
+        assert EVTCParser().parse_bytes(data).movement is None
+        
+        movement = EVTCParser(profile="composition", position_resolution_ms=500).parse_bytes(data).movement
+        assert movement.resolution_ms == 500 and movement.buckets == 6
+        
+        with pytest.raises(ValueError):
+            EVTCParser(position_resolution_ms=0)
+    
+    def test_merge(self):
+        """Merged partial aggregates keep the later range's samples"""
+        parser = EVTCParser(position_resolution_ms=1000)
+        parser.parse_bytes(build_evtc(movement_events()))
+        agents = list(parser.agents.values())
+        events = decode_event_block(b''.join(movement_events()), 1)
+        
+        whole = EventAggregator(agents, profile=parser.profile)
+        whole.consume(events)
+        merged = EventAggregator(agents, profile=parser.profile, timeline_origin=1000)
+        for start, stop in [(0, 24), (24, events.size)]:
+            part = EventAggregator(agents, start_index=start, profile=parser.profile, timeline_origin=1000,
+                                   deferred=True)
+            part.consume(events[start:stop])
+            merged.merge(part)
+        
+        for got, expected in zip(merged.movement_values(), whole.movement_values()):
+            assert np.array_equal(got, expected, equal_nan=True)
+
+
+class TestColumnarExport:
+    """Test the .npz columnar ParsedLog format"""
+    
+    def test_round_trip(self, tmp_path):
+        """Players, skill table and every time series come back unchanged"""
+        log = EVTCParser(position_resolution_ms=1000).parse_bytes(build_evtc(long_fight_events()))
+        path = tmp_path / "fight.evtc.npz"
+        save_columnar(log, path)
+        loaded = load_columnar(path)
+        
+        assert [asdict(p) for p in loaded.players] == [asdict(p) for p in log.players]
+        assert [asdict(p) for p in loaded.enemies] == [asdict(p) for p in log.enemies]
+        assert loaded.header == log.header and loaded.skills == log.skills
+        assert (loaded.duration_ms, loaded.pov_player) == (log.duration_ms, log.pov_player)
+        assert np.array_equal(loaded.timeline.values, log.timeline.values)
+        assert loaded.timeline.players == log.timeline.players
+        assert loaded.skill_breakdown.player("Ally A") == log.skill_breakdown.player("Ally A")
+        assert np.array_equal(loaded.movement.positions, log.movement.positions, equal_nan=True)
+        assert [(e.start_second, e.end_second, e.players) for e in loaded.engagements] == \
+            [(e.start_second, e.end_second, e.players) for e in log.engagements]
+    
+    def test_zero_copy(self, tmp_path):
+        """Numeric arrays are read-only views of the file, not copies"""
+        path = tmp_path / "fight.npz"
+        save_columnar(EVTCParser().parse_bytes(build_evtc(long_fight_events())), path)
+        values = load_columnar(path).timeline.values
+        
+        assert not values.flags.owndata and not values.flags.writeable
+    
+    @pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs /proc/self/maps")
+    def test_file_is_unmapped(self, tmp_path):
+        """The map goes with the last view, or before returning when loaded in memory"""
+        def mapped():
+            with open("/proc/self/maps") as f:
+                return str(path) in f.read()
+        
+        path = tmp_path / "fight.npz"
+        save_columnar(EVTCParser().parse_bytes(build_evtc(long_fight_events())), path)
+        
+        loaded = load_columnar(path, in_memory=True)
+        assert loaded.timeline.values.flags.owndata and not mapped()
+        
+        loaded = load_columnar(path)
+        assert mapped()
+        del loaded
+        gc.collect()
+        assert not mapped()
+    
+    def test_without_timeseries(self, tmp_path):
+        """timeseries=False keeps the player columns only"""
+        path = tmp_path / "fight.npz"
+        save_columnar(EVTCParser().parse_bytes(build_evtc(sample_events())), path, timeseries=False)
+        loaded = load_columnar(path)
+        
+        assert loaded.timeline is None and loaded.skill_breakdown is None and loaded.movement is None
+        assert loaded.players[0].boons_applied == {1187: 2}
+    
+    def test_version_check(self, tmp_path, monkeypatch):
+        """Artifacts from another parser version are refused unless asked for"""
+        import parser as parser_module
+        path = tmp_path / "fight.npz"
+        save_columnar(EVTCParser().parse_bytes(build_evtc(sample_events())), path)
+        monkeypatch.setattr(parser_module, "PARSER_VERSION", "old")
+        
+        with pytest.raises(ValueError):
+            load_columnar(path)
+        assert load_columnar(path, any_version=True).players
+    
+    def test_columnar_path(self):
+        """The artifact sits next to the log it was parsed from"""
+        assert columnar_path("/logs/20240101.zevtc").as_posix() == "/logs/20240101.zevtc.npz"
+
+
+class TestParallelAggregation:
+    """Test merging partial aggregates and shared-memory parallel parsing"""
+    
+    def test_merge_matches_single_pass(self):
+        """Aggregating consecutive ranges apart then merging equals one pass"""
+        parser = EVTCParser()
+        parser.parse_bytes(build_evtc(long_fight_events()))
+        agents = list(parser.agents.values())
+        events = decode_event_block(b''.join(long_fight_events()), 1)
+        origin = EventAggregator.find_timeline_origin(events)
+        
+        whole = EventAggregator(agents)
+        whole.consume(events)
+        merged = EventAggregator(agents, timeline_origin=origin)
+        for start, stop in [(0, 5), (5, 400), (400, events.size)]:
+            part = EventAggregator(agents, start_index=start, timeline_origin=origin, deferred=True)
+            part.consume(events[start:stop])
+            merged.merge(part)
+        
+        for name in ('first_index', 'first_time', 'last_index', 'last_time', 'team_index',
+                     'boons_applied', 'skill_keys', 'damage_hits', 'skill_stat_keys', 'skill_stats'):
+            assert np.array_equal(getattr(merged, name), getattr(whole, name)), name
+        for name in COUNTER_FIELDS:
+            assert np.array_equal(merged.counters[name], whole.counters[name]), name
+        assert merged.statechanges == whole.statechanges
+        assert (merged.combat_min_time, merged.combat_max_time) == (whole.combat_min_time, whole.combat_max_time)
+        assert np.array_equal(merged.timeline_values(), whole.timeline_values())
+        for got, expected in zip(merged.boon_stats(1000, 182300), whole.boon_stats(1000, 182300)):
+            assert np.array_equal(got, expected)
+        is_enemy = np.array([False, False, True])
+        for got, expected in zip(merged.attribution.finalize(is_enemy), whole.attribution.finalize(is_enemy)):
+            assert np.array_equal(got, expected)
+    
+    def test_merge_rejects_other_origin(self):
+        """Partial timelines binned from different origins can't be added"""
+        with pytest.raises(ValueError):
+            EventAggregator([], timeline_origin=0).merge(EventAggregator([], timeline_origin=1000))
+        with pytest.raises(ValueError):
+            EventAggregator([]).merge(EventAggregator([]))
+    
+    @pytest.mark.parametrize("mode", ["numpy", "stream"])
+    def test_parallel_parse_matches_serial(self, mode, monkeypatch):
+        """Worker processes over shared memory give the same log as one process"""
+        import parser as parser_module
+        monkeypatch.setattr(parser_module, "PARALLEL_MIN_EVENTS", 0)
+        monkeypatch.setattr(parser_module, "available_cpus", lambda: 3)
+        data = build_evtc(long_fight_events())
+        
+        serial = EVTCParser(decode_mode=mode).parse_bytes(data)
+        parallel_parser = EVTCParser(decode_mode=mode, chunk_size=50, workers=3)
+        parallel = parallel_parser.parse_bytes(data)
+        
+        assert [asdict(p) for p in parallel.players + parallel.enemies] == \
+            [asdict(p) for p in serial.players + serial.enemies]
+        assert np.array_equal(parallel.timeline.values, serial.timeline.values)
+        assert parallel_parser.agents[ALLY_A].first_aware == 1100
+    
+    def test_small_logs_stay_in_process(self, monkeypatch):
+        """Below the size threshold no pool is started"""
+        import parser as parser_module
+        monkeypatch.setattr(parser_module, "available_cpus", lambda: 4)
+        parser = EVTCParser(decode_mode="numpy", workers=4)
+        parser.parse_bytes(build_evtc(sample_events()))
+        assert parser.event_array is not None  # decoded in this process
+        
+        with pytest.raises(ValueError):
+            EVTCParser(workers=0)
+    
+    def test_workers_follow_available_cpus(self, monkeypatch):
+        """Workers are capped at the available CPUs, so one CPU never starts a pool"""
+        import parser as parser_module
+        monkeypatch.setattr(parser_module, "PARALLEL_MIN_EVENTS", 0)
+        monkeypatch.setattr(parser_module, "available_cpus", lambda: 1)
+        parser = EVTCParser(decode_mode="numpy", workers=4)
+        parser.parse_bytes(build_evtc(long_fight_events()))
+        assert parser._parallel_workers() == 1
+        assert parser.event_array is not None  # decoded in this process
+        
+        monkeypatch.setattr(parser_module, "available_cpus", lambda: 6)
+        assert parser._parallel_workers() == 4
+        assert EVTCParser(workers=None)._parallel_workers() == 6